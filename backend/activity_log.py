@@ -0,0 +1,184 @@
+"""
+Activity Log
+`record_activity` appends an event to an in-process buffer and returns at
+once. A writer thread inserts the buffer into `activity_events` as multi-row
+INSERTs every ACTIVITY_FLUSH_INTERVAL_MS, or as soon as ACTIVITY_FLUSH_SIZE
+events are waiting. Activity is analytics data: while the database is
+unreachable events are held up to ACTIVITY_BUFFER_MAX and the oldest are
+dropped beyond that, rather than slowing requests down.
+
+`maintain_partitions` keeps the monthly partitions of `activity_events` ahead
+of the calendar and drops the ones past ACTIVITY_RETENTION_MONTHS.
+"""
+
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import date, datetime
+from typing import Dict, List
+
+from sqlalchemy import insert, text
+
+from config import settings
+from database import engine
+from live_counters import track_active_teacher
+from models import ActivityEvent, ACTIVITY_EVENTS_PARTITION_DDL
+
+# Event types
+LOGIN = "login"
+LESSON_COMPLETED = "lesson_completed"
+SCHEME_GENERATED = "scheme_generated"
+LESSON_PLANS_GENERATED = "lesson_plans_generated"
+PDF_DOWNLOADED = "pdf_downloaded"
+
+
+class ActivityBuffer:
+    def __init__(self, flush_size: int, flush_interval_ms: int, max_size: int):
+        self.flush_size = max(flush_size, 1)
+        self.flush_interval = max(flush_interval_ms, 10) / 1000
+        self.max_size = max(max_size, self.flush_size)
+        self.dropped = 0
+
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def _ensure_writer(self):
+        if self._pid == os.getpid():
+            return
+        # First event in this process, or in a worker forked after the parent
+        # started its writer; threads do not survive fork, so start a new one
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._events = deque()
+            self._lock = threading.Lock()
+            self._wake = threading.Event()
+            threading.Thread(target=self._run, name="activity-writer", daemon=True).start()
+            self._pid = os.getpid()
+
+    def add(self, event: Dict):
+        self._ensure_writer()
+        with self._lock:
+            if len(self._events) >= self.max_size:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append(event)
+            full = len(self._events) >= self.flush_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _requeue(self, events: List[Dict]):
+        """Put unwritten events back in front, keeping the newest within max_size."""
+        with self._lock:
+            self._events.extendleft(reversed(events))
+            while len(self._events) > self.max_size:
+                self._events.popleft()
+                self.dropped += 1
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of events written."""
+        if self._pid != os.getpid():
+            return 0
+        with self._lock:
+            if not self._events:
+                return 0
+            batch = list(self._events)
+            self._events.clear()
+
+        written = 0
+        for start in range(0, len(batch), self.flush_size):
+            chunk = batch[start:start + self.flush_size]
+            try:
+                with engine.begin() as conn:
+                    # One INSERT ... VALUES (...), (...) statement per chunk
+                    conn.execute(insert(ActivityEvent.__table__).values(chunk))
+                written += len(chunk)
+            except Exception as e:
+                print(f"[WARN] Could not write {len(batch) - written} activity events, will retry: {e}")
+                self._requeue(batch[start:])
+                break
+        return written
+
+
+activity_buffer = ActivityBuffer(
+    settings.ACTIVITY_FLUSH_SIZE,
+    settings.ACTIVITY_FLUSH_INTERVAL_MS,
+    settings.ACTIVITY_BUFFER_MAX,
+)
+atexit.register(activity_buffer.flush)
+
+
+def record_activity(user, event_type: str, **data):
+    """
+    Log an event for `user` (a User row) and count them in the live active
+    teacher sketches. Never raises and never touches the request's session;
+    read the user's attributes before a commit expires them.
+    """
+    try:
+        activity_buffer.add({
+            "created_at": datetime.utcnow(),
+            "user_id": user.id,
+            "school_id": user.school_id,
+            "event_type": event_type,
+            "event_data": data or None,
+        })
+        track_active_teacher(user.id, user.role)
+    except Exception as e:
+        print(f"[WARN] Could not record {event_type} activity: {e}")
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def maintain_partitions(months_ahead: int = 2) -> Dict:
+    """
+    Create monthly partitions through `months_ahead` months from now by
+    splitting p_future, and drop partitions older than the retention window.
+    """
+    if engine.dialect.name != "mysql":
+        return {}
+
+    today = datetime.utcnow().date()
+    added, dropped = [], []
+    with engine.begin() as conn:
+        names = {
+            row[0] for row in conn.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'activity_events'"
+            )).all() if row[0]
+        }
+        if not names:
+            # Table predates partitioning
+            conn.execute(text(ACTIVITY_EVENTS_PARTITION_DDL))
+            names = {"p_future"}
+
+        for offset in range(months_ahead + 1):
+            name = f"p{_month_start(today, offset):%Y%m}"
+            if name in names:
+                continue
+            conn.execute(text(
+                f"ALTER TABLE activity_events REORGANIZE PARTITION p_future INTO ("
+                f"PARTITION {name} VALUES LESS THAN ('{_month_start(today, offset + 1)}'), "
+                f"PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+            ))
+            added.append(name)
+
+        # A partition named for month M holds rows before M+1
+        cutoff = f"p{_month_start(today, -settings.ACTIVITY_RETENTION_MONTHS):%Y%m}"
+        dropped = sorted(name for name in names if name != "p_future" and name < cutoff)
+        if dropped:
+            conn.execute(text(f"ALTER TABLE activity_events DROP PARTITION {', '.join(dropped)}"))
+
+    return {"added": added, "dropped": dropped}
@@ -0,0 +1,95 @@
+"""
+Admin Listings
+Shared pieces for the admin user, payment and school lists:
+- keyset pagination on (created_at, id), newest first. The `next_cursor` of a
+  page is passed back as `cursor` and becomes an index range seek, so deep
+  pages cost the same as the first one.
+- search through the n-gram FULLTEXT indexes (migration 009) instead of
+  leading-wildcard LIKE, which scans the table. Terms shorter than an n-gram,
+  and non-MySQL databases, still use LIKE. The indexes must be built with
+  stopwords off (migration 011, database.py); check_admin_search.py compares
+  the results with LIKE.
+- totals counted once per filter combination and cached for
+  ADMIN_LIST_COUNT_TTL_SECONDS.
+"""
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Query
+
+from cache_manager import cache, build_cache_key
+from config import settings
+
+NGRAM_TOKEN_SIZE = 2  # MySQL's ngram_token_size default
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> Optional[str]:
+    if created_at is None:
+        return None
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query: Query, created_col, id_col, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """
+    One page of `query` ordered newest first, after `cursor` when given.
+    Returns (rows, next_cursor); next_cursor is None on the last page. Rows
+    may be entities or tuples whose first element is the entity.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # The leading range keeps MySQL on the (created_at, id) index
+        query = query.filter(
+            created_col <= created_at,
+            or_(created_col < created_at, and_(created_col == created_at, id_col < row_id)),
+        )
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0] if isinstance(rows[-1], tuple) else rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def cursor_for(rows: List, limit: int) -> Optional[str]:
+    """Cursor continuing after an offset page, so page-based clients can switch to keyset."""
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1][0] if isinstance(rows[-1], tuple) else rows[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def search_clause(db, term: str, *columns):
+    """Match `term` against `columns` (which share one FULLTEXT index)."""
+    term = term.strip()
+    if db.bind.dialect.name != "mysql" or len(term) < NGRAM_TOKEN_SIZE:
+        return or_(*(column.ilike(f"%{term}%") for column in columns))
+    # Quoted, so boolean-mode operators in the input are not interpreted
+    phrase = '"' + term.replace('"', " ") + '"'
+    return match(*columns, against=phrase).in_boolean_mode()
+
+
+def cached_total(query: Query, prefix: str, **filters) -> int:
+    """`query.count()`, cached per filter combination."""
+    key = build_cache_key(f"admin_list_total:{prefix}", **filters)
+    total = cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache.set(key, total, settings.ADMIN_LIST_COUNT_TTL_SECONDS)
+    return total
@@ -4,11 +4,13 @@ Uses OpenRouter LLMs to expand brief curriculum points into detailed lesson plan
 """
 
 import os
+import re
 import json
 import time
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterator, List, Optional
 from openai import OpenAI
 from dotenv import load_dotenv
+from lesson_content import NON_TEACHING_STRANDS
 
 load_dotenv()
 
@@ -24,6 +26,12 @@ class AILessonPlanner:
         "qwen/qwen-2.5-72b-instruct:free"             # Qwen 2.5
     ]
 
+    # Sections a generated plan must contain to be accepted
+    REQUIRED_PLAN_KEYS = ("introduction", "development", "conclusion")
+
+    # Upper bound on lessons sent in one batched prompt
+    MAX_BATCH_SIZE = 10
+
     def __init__(self, debug: bool = True):
         self.debug = debug
         self.api_key = os.getenv("OPENROUTER_API_KEY")
@@ -112,6 +120,167 @@ Step 1: Explaining the Meaning...
 Return ONLY the JSON.
 """
 
+    def stream_detailed_plan(self, lesson_data: Dict) -> Iterator[str]:
+        """
+        Stream the completion for a single lesson plan as raw text chunks.
+
+        Models are tried in order until one starts streaming; once text has been
+        yielded a failure is raised instead of silently switching models.
+        """
+        if not self.client:
+            raise RuntimeError("AI service not configured")
+
+        prompt = self._build_lesson_prompt(lesson_data)
+
+        for model in self.FREE_MODELS:
+            started = False
+            try:
+                stream = self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.7,
+                    max_tokens=2000,
+                    stream=True,
+                )
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        started = True
+                        yield delta
+                return
+            except Exception as e:
+                if started:
+                    raise
+                print(f"[ERROR] Streaming model {model} failed: {e}")
+                continue
+
+        raise RuntimeError("Failed to generate lesson plan")
+
+    def parse_streamed_plan(self, response_text: str) -> Optional[Dict]:
+        """Parse and validate the full text of a streamed completion."""
+        parsed = self._parse_ai_response(response_text)
+        if not isinstance(parsed, dict):
+            return None
+        return self._validate_plan(parsed)
+
+    def generate_batch_plans(self, context: Dict, lessons: List[Dict]) -> Dict[str, Dict]:
+        """
+        Generate detailed plans for several lessons in a single completion.
+
+        `context` carries the fields shared by every lesson in the batch (grade,
+        subject, strand) so they are sent once instead of once per lesson.
+        Each entry in `lessons` must have a unique "key". Returns a mapping of
+        key -> validated plan; lessons missing from the mapping failed and
+        should be retried individually by the caller.
+        """
+        if not self.client or not lessons:
+            return {}
+
+        prompt = self._build_batch_prompt(context, lessons)
+        expected_keys = {str(lesson["key"]) for lesson in lessons}
+
+        for model in self.FREE_MODELS:
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.7,
+                    max_tokens=min(900 * len(lessons), 8000),
+                )
+
+                result_text = response.choices[0].message.content
+                parsed = self._parse_ai_response(result_text)
+                if isinstance(parsed, dict):
+                    parsed = parsed.get("plans")
+                if not isinstance(parsed, list):
+                    continue
+
+                plans = {}
+                for item in parsed:
+                    if not isinstance(item, dict):
+                        continue
+                    key = str(item.get("key", ""))
+                    plan = self._validate_plan(item)
+                    if key in expected_keys and plan:
+                        plans[key] = plan
+
+                if plans:
+                    return plans
+
+            except Exception as e:
+                print(f"[ERROR] Batch model {model} failed: {e}")
+                continue
+
+        return {}
+
+    def _build_batch_prompt(self, context: Dict, lessons: List[Dict]) -> str:
+        lesson_blocks = []
+        for lesson in lessons:
+            lesson_blocks.append("\n".join([
+                f"- key: \"{lesson['key']}\"",
+                *([f"  Strand: {lesson.get('strand')}"] if lesson.get('strand') != context.get('strand') else []),
+                f"  Sub-strand: {lesson.get('sub_strand')}",
+                f"  Lesson: {lesson.get('position')}",
+                f"  Learning Outcomes: {lesson.get('outcomes')}",
+                f"  Core Competencies: {lesson.get('competencies')}",
+                f"  Values: {lesson.get('values')}",
+                f"  Current Brief Experience: \"{lesson.get('learning_experiences')}\"",
+            ]))
+        lessons_text = "\n".join(lesson_blocks)
+
+        return f"""You are an expert Kenyan CBC teacher. Create a detailed "Organization of Learning" for EACH of the lessons below.
+
+**Shared Details**:
+- Grade: {context.get('grade')}
+- Subject: {context.get('learning_area')}
+- Strand: {context.get('strand')}
+
+**Lessons**:
+{lessons_text}
+
+**Task**:
+For every lesson, expand the brief "Learning Experiences" into a detailed step-by-step lesson flow.
+Consecutive lessons of the same sub-strand must build on each other rather than repeat the same activities.
+
+**Required Output Format (JSON)**:
+Return ONLY a valid JSON array with one object per lesson, using these exact keys:
+[
+  {{
+    "key": "<the lesson key given above>",
+    "introduction": "Detailed introduction (5 mins)...",
+    "development": "Step 1: ...\\nStep 2: ...\\nStep 3: ...",
+    "conclusion": "Detailed conclusion (5 mins)...",
+    "summary": "Brief summary of the lesson...",
+    "reflection_prompt": "A specific question for self-evaluation..."
+  }}
+]
+
+**Content Guidelines**:
+1. **Introduction (5 mins)**: Include a recap of previous knowledge and introduction of new concepts.
+2. **Development (30-35 mins)**: Break down into 3-4 clear steps. Use "Step 1:", "Step 2:" format. Include learner activities (e.g., "In pairs...", "Groups discuss...").
+3. **Conclusion (5 mins)**: Summarize key points and include a quick assessment activity.
+4. **Tone**: Professional, instructional, and learner-centered (CBC style).
+
+Return ONLY the JSON array.
+"""
+
+    def _validate_plan(self, item: Dict) -> Optional[Dict]:
+        """Normalize one generated plan; returns None if a required section is missing."""
+        plan = {}
+        for key in ("introduction", "development", "conclusion", "summary", "reflection_prompt"):
+            value = item.get(key)
+            if isinstance(value, list):
+                value = "\n".join(str(v) for v in value)
+            if value is not None:
+                plan[key] = str(value).strip()
+
+        for key in self.REQUIRED_PLAN_KEYS:
+            if not plan.get(key):
+                return None
+        return plan
+
     def _parse_ai_response(self, response_text: str) -> Optional[Dict]:
         if not response_text:
             return None
@@ -126,21 +295,19 @@ Return ONLY the JSON.
             print(f"[ERROR] Failed to parse JSON: {cleaned[:100]}...")
             return None
 
-async def generate_scheme_of_work(data, current_user, db):
+def plan_scheme_of_work(data, current_user, db):
     """
-    Generate a scheme of work using the original logic (CurriculumTemplate based).
+    Plan a scheme of work using the original logic (CurriculumTemplate based)
+    without writing anything.
+
+    Returns `(scheme_values, weeks)`: the scheme columns and the week/lesson
+    layout from `scheme_layout`, ready for `scheme_store.persist_scheme`.
     """
     from fastapi import HTTPException
     from sqlalchemy import func
-    from datetime import datetime, timedelta
-    import re
-    
-    # Import models
-    from models import (
-        User, UserRole, SchemeOfWork, SchemeWeek, SchemeLesson, 
-        CurriculumTemplate, TemplateStrand, TemplateSubstrand,
-        SchoolSettings, SchoolTerm, SubscriptionType, SystemTerm
-    )
+    from models import CurriculumTemplate, SubscriptionType
+    from scheme_layout import flatten_curriculum, layout_weeks, count_lessons
+    from scheme_store import load_template_snapshot, resolve_term_calendar
 
     # Enforce Free Plan Limits
     # If user is on FREE plan AND not linked to a school, limit to 1 week
@@ -165,459 +332,66 @@ async def generate_scheme_of_work(data, current_user, db):
     ).first()
 
     if not template:
-        # Fallback: Try to match by subject_id if provided and valid
-        # But CurriculumTemplate doesn't have subject_id link usually, it's text based.
-        # So we just fail if not found.
+        # CurriculumTemplate has no subject_id link, it's text based, so we just fail if not found.
         raise HTTPException(
             status_code=404,
             detail=f"No curriculum template found for {data.subject} {data.grade}. Please ensure the curriculum exists in the system."
         )
 
-    # 2. Create Scheme Shell
-    scheme = SchemeOfWork(
-        user_id=current_user.id,
-        subject_id=data.subject_id,
-        teacher_name=data.teacher_name,
-        school=data.school,
-        term=data.term,
-        year=data.year,
-        subject=data.subject,
-        grade=data.grade,
-        stream=getattr(data, 'stream', None),
-        roll=getattr(data, 'roll', None),
-        lesson_duration_minutes=getattr(data, 'lesson_duration_minutes', None),
-        total_weeks=data.total_weeks,
-        total_lessons=0, # Will update later
-        status="active"
-    )
-    db.add(scheme)
-    db.flush() # Get scheme.id
-
-    # NEW: Fetch School Term Data for Mid Term Break Calculation
-    term_start_date = None
-    mid_term_start = None
-    mid_term_end = None
-    term_number = 1 # Default to Term 1
-
-    try:
-        # Extract term number from string "Term X"
-        # Handle "Term 2", "Term 2 (2025)", "2"
-        term_match = re.search(r'(\d+)', data.term)
-        
-        print(f"[DEBUG] Generating scheme for Term: {data.term}, Year: {data.year}")
-
-        if term_match:
-            term_number = int(term_match.group(1))
-            print(f"[DEBUG] Extracted term number: {term_number}")
-
-            # Try to find SchoolTerm
-            # Logic:
-            # 1. If user belongs to a school, try to find that school's specific terms.
-            # 2. If not found or user is independent, fall back to Default Settings (ID 1).
-
-            school_term = None
-
-            # Attempt 1: Specific School Settings (if user has school_id)
-            if current_user.school_id:
-                # Assuming SchoolSettings might be linked or we use a convention.
-                # For now, we'll check if there's a SchoolSettings entry with the same name as the user's school
-                # This is a heuristic since the models aren't perfectly linked yet.
-                if current_user.school_rel:
-                     settings_match = db.query(SchoolSettings).filter(
-                         SchoolSettings.school_name == current_user.school_rel.name
-                     ).first()
-
-                     if settings_match:
-                         school_term = db.query(SchoolTerm).filter(
-                            SchoolTerm.school_settings_id == settings_match.id,
-                            SchoolTerm.year == data.year,
-                            SchoolTerm.term_number == term_number
-                        ).first()
-
-            # Attempt 2: Fallback to Default/Global Settings (ID 1)
-            if not school_term:
-                school_term = db.query(SchoolTerm).filter(
-                    SchoolTerm.school_settings_id == 1, # Default / National Dates
-                    SchoolTerm.year == data.year,
-                    SchoolTerm.term_number == term_number
-                ).first()
-
-            # Attempt 3: Any term matching the year/number (Legacy fallback)
-            if not school_term:
-                school_term = db.query(SchoolTerm).filter(
-                    SchoolTerm.year == data.year,
-                    SchoolTerm.term_number == term_number
-                ).first()
-
-            # Attempt 4: Try SystemTerm (new global terms table)
-            system_term = None
-            if not school_term:
-                system_term = db.query(SystemTerm).filter(
-                    SystemTerm.year == data.year,
-                    SystemTerm.term_number == term_number
-                ).first()
-                if system_term:
-                    print(f"[DEBUG] Found SystemTerm: id={system_term.id}")
-                    print(f"[DEBUG] SystemTerm start_date: {system_term.start_date}")
-                    print(f"[DEBUG] SystemTerm mid_term_break_start: {system_term.mid_term_break_start}")
-                    print(f"[DEBUG] SystemTerm mid_term_break_end: {system_term.mid_term_break_end}")
-
-            # Use SystemTerm if found and no SchoolTerm
-            if system_term and not school_term:
-                if system_term.start_date:
-                    term_start_date = system_term.start_date if isinstance(system_term.start_date, datetime) else datetime.strptime(str(system_term.start_date)[:10], "%Y-%m-%d")
-                    print(f"[DEBUG] Parsed term_start_date from SystemTerm: {term_start_date}")
-                
-                if system_term.mid_term_break_start and system_term.mid_term_break_end:
-                    mid_term_start = system_term.mid_term_break_start if isinstance(system_term.mid_term_break_start, datetime) else datetime.strptime(str(system_term.mid_term_break_start)[:10], "%Y-%m-%d")
-                    mid_term_end = system_term.mid_term_break_end if isinstance(system_term.mid_term_break_end, datetime) else datetime.strptime(str(system_term.mid_term_break_end)[:10], "%Y-%m-%d")
-                    print(f"[DEBUG] Mid Term Break from SystemTerm: {mid_term_start} to {mid_term_end}")
-                else:
-                    print(f"[DEBUG] No mid-term break dates found in SystemTerm")
-            elif school_term:
-                print(f"[DEBUG] Found SchoolTerm: id={school_term.id}")
-                print(f"[DEBUG] SchoolTerm start_date: {school_term.start_date}")
-                print(f"[DEBUG] SchoolTerm mid_term_break_start: {school_term.mid_term_break_start}")
-                print(f"[DEBUG] SchoolTerm mid_term_break_end: {school_term.mid_term_break_end}")
-
-                if school_term.start_date:
-                    try:
-                        term_start_date = datetime.strptime(school_term.start_date, "%Y-%m-%d")
-                        print(f"[DEBUG] Parsed term_start_date: {term_start_date}")
-                    except ValueError:
-                        print(f"[DEBUG] Failed to parse start_date: {school_term.start_date}")
-
-                if school_term.mid_term_break_start and school_term.mid_term_break_end:
-                    try:
-                        mid_term_start = datetime.strptime(school_term.mid_term_break_start, "%Y-%m-%d")
-                        mid_term_end = datetime.strptime(school_term.mid_term_break_end, "%Y-%m-%d")
-                        print(f"[DEBUG] Mid Term Break: {mid_term_start} to {mid_term_end}")
-                    except ValueError:
-                        print(f"[DEBUG] Failed to parse mid term dates")
-                else:
-                    print(f"[DEBUG] No mid-term break dates found in SchoolTerm")
-            else:
-                print(f"[DEBUG] No SchoolTerm found for year={data.year}, term_number={term_number}")
-        else:
-            print(f"[DEBUG] Could not parse term number from: {data.term}")
-    except Exception as e:
-        print(f"[DEBUG] Error calculating mid term break: {e}")
+    # 2. Load planner inputs: term calendar and template snapshot
+    print(f"[DEBUG] Generating scheme for Term: {data.term}, Year: {data.year}")
+    calendar = resolve_term_calendar(db, data.term, data.year, current_user)
+    print(f"[DEBUG] Term {calendar.term_number} start: {calendar.start_date}, mid term: {calendar.mid_term_start} to {calendar.mid_term_end}")
 
-    # 3. Flatten Curriculum into Lessons
-    strands = db.query(TemplateStrand).filter(
-        TemplateStrand.curriculum_template_id == template.id
-    ).order_by(TemplateStrand.sequence_order, TemplateStrand.id).all()
+    user_default_textbook = getattr(data, 'default_textbook', None) or ""
+    curriculum = flatten_curriculum(load_template_snapshot(db, template.id), user_default_textbook)
 
-    all_lessons_data = []
+    # 3. Plan weeks and lessons in memory
+    weeks = layout_weeks(
+        curriculum,
+        calendar,
+        total_weeks=data.total_weeks,
+        lessons_per_week=data.lessons_per_week,
+        include_special_weeks=getattr(data, 'include_special_weeks', False),
+    )
+    print(f"[DEBUG] Total curriculum lessons: {len(curriculum)}, weeks: {data.total_weeks}, lessons per week: {data.lessons_per_week}")
+
+    scheme_values = {
+        "user_id": current_user.id,
+        "subject_id": data.subject_id,
+        "teacher_name": data.teacher_name,
+        "school": data.school,
+        "term": data.term,
+        "year": data.year,
+        "subject": data.subject,
+        "grade": data.grade,
+        "stream": getattr(data, 'stream', None),
+        "roll": getattr(data, 'roll', None),
+        "lesson_duration_minutes": getattr(data, 'lesson_duration_minutes', None),
+        "total_weeks": data.total_weeks,
+        "total_lessons": count_lessons(weeks),
+        "status": "active",
+    }
+    return scheme_values, weeks
 
-    def format_list_field(field_data):
-        if not field_data:
-            return ""
-        if isinstance(field_data, list):
-            return "\n".join([f"- {item}" for item in field_data])
-        return str(field_data)
 
-    # Get the user-provided default textbook name (if any)
-    user_default_textbook = getattr(data, 'default_textbook', None) or ""
+async def generate_scheme_of_work(data, current_user, db):
+    """
+    Generate and save a scheme of work.
 
-    # Smart Generators for Resources and Assessment
-    def generate_smart_resources(experiences, outcomes):
-        # Build textbook entries - show both Learner's Book and Teacher's Guide
-        if user_default_textbook:
-            learner_book = f"{user_default_textbook} (Learner's Book)"
-            teacher_guide = f"{user_default_textbook} (Teacher's Guide)"
-            resources = ["Curriculum designs", learner_book, teacher_guide]
-        else:
-            resources = ["Curriculum designs", "Textbooks"]
-        
-        text = (str(experiences) + " " + str(outcomes)).lower()
-        
-        if "digital" in text or "video" in text or "watch" in text or "internet" in text or "online" in text:
-            resources.append("Digital devices")
-            resources.append("Video clips")
-        if "chart" in text or "draw" in text or "illustrate" in text or "poster" in text:
-            resources.append("Charts/Manila paper")
-        if "map" in text or "locate" in text:
-            resources.append("Maps/Atlases")
-        if "model" in text or "construct" in text or "make" in text:
-            resources.append("Modeling materials")
-        if "group" in text or "discuss" in text:
-            resources.append("Reference materials")
-        if "field" in text or "visit" in text or "walk" in text:
-            resources.append("Field trip consent forms")
-        if "experiment" in text or "observe" in text or "measure" in text:
-            resources.append("Real objects/Realia")
-        if "picture" in text or "photo" in text:
-            resources.append("Pictures/Photographs")
-
-        return ", ".join(resources)
-
-    def generate_smart_assessment(experiences, outcomes):
-        methods = ["Observation", "Oral questions"]
-        text = (str(experiences) + " " + str(outcomes)).lower()
-
-        if "write" in text or "list" in text or "explain" in text or "describe" in text:
-            methods.append("Written exercise")
-        if "draw" in text or "sketch" in text or "paint" in text:
-            methods.append("Drawing/Portfolio")
-        if "group" in text or "discuss" in text or "share" in text:
-            methods.append("Group discussion")
-        if "present" in text or "report" in text or "tell" in text:
-            methods.append("Presentation")
-        if "project" in text or "create" in text or "make" in text:
-            methods.append("Project work")
-        if "calculate" in text or "solve" in text or "compute" in text:
-            methods.append("Computation")
-        if "role" in text or "act" in text or "play" in text:
-            methods.append("Role play")
-
-        return ", ".join(methods)
-
-    for strand in strands:
-        substrands = db.query(TemplateSubstrand).filter(
-            TemplateSubstrand.strand_id == strand.id
-        ).order_by(TemplateSubstrand.sequence_order, TemplateSubstrand.id).all()
-        
-        for sub in substrands:
-            # Determine how many lessons this substrand takes
-            count = sub.number_of_lessons if sub.number_of_lessons and sub.number_of_lessons > 0 else 1
-            
-            # Prepare content
-            slo = format_list_field(sub.specific_learning_outcomes)
-            kiq = format_list_field(sub.key_inquiry_questions)
-            sle = format_list_field(sub.suggested_learning_experiences)
-
-            # Generate smart content
-            smart_resources = generate_smart_resources(sle, slo)
-            smart_assessment = generate_smart_assessment(sle, slo)
-
-            # Textbook Data (if available in template, otherwise use user's default)
-            tb_name = sub.default_textbook_name or user_default_textbook or ""
-            tb_learner_pages = sub.default_learner_book_pages or ""
-            tb_teacher_pages = sub.default_teacher_guide_pages or ""
-
-            for i in range(count):
-                all_lessons_data.append({
-                    "strand": strand.strand_name,
-                    "sub_strand": sub.substrand_name,
-                    "specific_learning_outcomes": slo,
-                    "key_inquiry_questions": kiq,
-                    "learning_experiences": sle,
-                    "learning_resources": smart_resources,
-                    "assessment_methods": smart_assessment,
-                    "textbook_name": tb_name,
-                    "textbook_learner_book_pages": tb_learner_pages,
-                    "textbook_teacher_guide_pages": tb_teacher_pages,
-                })
-
-    # scheme.total_lessons = len(all_lessons_data) # Don't set it here, or set it to 0
-
-    # 4. Distribute into Weeks
-    total_lessons_count = len(all_lessons_data)
-
-    # Smart Start Index based on Term (Weighted Distribution)
-    # Term 1 (13 weeks), Term 2 (14 weeks), Term 3 (9 weeks) -> Total 36 weeks
-    start_index = 0
-    if term_number == 2:
-        # Start after Term 1 (~36%)
-        start_index = int(total_lessons_count * (13/36))
-    elif term_number == 3:
-        # Start after Term 2 (~75%)
-        start_index = int(total_lessons_count * (27/36))
-
-    current_lesson_idx = start_index
-
-    print(f"[DEBUG] Total curriculum lessons: {total_lessons_count}")
-    print(f"[DEBUG] Term {term_number} start index: {start_index}")
-    print(f"[DEBUG] Total weeks: {data.total_weeks}, Lessons per week: {data.lessons_per_week}")
-
-    actual_lessons_count = 0
-
-    # Create weeks
-    for week_num in range(1, data.total_weeks + 1):
-        week = SchemeWeek(scheme_id=scheme.id, week_number=week_num)
-        db.add(week)
-        db.flush()
-
-        # Calculate week start date if we have term start date
-        week_start = None
-        week_end = None
-        if term_start_date:
-            week_start = term_start_date + timedelta(weeks=week_num - 1)
-            week_end = week_start + timedelta(days=6) # Sunday
-            if week_num <= 10:  # Only log first 10 weeks
-                print(f"[DEBUG] Week {week_num}: {week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}")
-
-        # --- Special Weeks Logic (Opening, Assessment, Closing) ---
-        is_special_week = False
-        special_week_data = None
-
-        if getattr(data, 'include_special_weeks', False):
-            if week_num == 1:
-                is_special_week = True
-                special_week_data = {
-                    "strand": "OPENING WEEK",
-                    "sub_strand": "OPENER ASSESSMENT",
-                    "specific_learning_outcomes": "By the end of the week, the learner should be able to attempt the opener assessment.",
-                    "learning_experiences": "Administering opener assessment.",
-                    "learning_resources": "Assessment papers",
-                    "assessment_methods": "Written"
-                }
-            elif week_num == data.total_weeks - 1:
-                is_special_week = True
-                special_week_data = {
-                    "strand": "ASSESSMENT WEEK",
-                    "sub_strand": "END OF TERM ASSESSMENT",
-                    "specific_learning_outcomes": "By the end of the week, the learner should be able to attempt the end of term assessment.",
-                    "learning_experiences": "Administering end of term assessment.",
-                    "learning_resources": "Assessment papers",
-                    "assessment_methods": "Written"
-                }
-            elif week_num == data.total_weeks:
-                is_special_week = True
-                special_week_data = {
-                    "strand": "CLOSING WEEK",
-                    "sub_strand": "CLOSING AND CLEANING",
-                    "specific_learning_outcomes": "Closing school for the holiday.",
-                    "learning_experiences": "Cleaning and clearing.",
-                    "learning_resources": "Cleaning materials",
-                    "assessment_methods": "Observation"
-                }
-
-        if is_special_week and special_week_data:
-             # Create lessons for special week
-             for lesson_num in range(1, data.lessons_per_week + 1):
-                lesson = SchemeLesson(
-                    week_id=week.id,
-                    lesson_number=lesson_num,
-                    strand=special_week_data["strand"],
-                    sub_strand=special_week_data["sub_strand"],
-                    specific_learning_outcomes=special_week_data["specific_learning_outcomes"],
-                    key_inquiry_questions="",
-                    learning_experiences=special_week_data["learning_experiences"],
-                    learning_resources=special_week_data.get("learning_resources", ""),
-                    assessment_methods=special_week_data.get("assessment_methods", ""),
-                    textbook_name="",
-                    textbook_teacher_guide_pages="",
-                    textbook_learner_book_pages="",
-                    reflection=""
-                )
-                db.add(lesson)
-                actual_lessons_count += 1
-             continue # Skip to next week
-
-        # Check if the ENTIRE week is a break (Full Week Break)
-        # If week_start and week_end are both within mid_term range
-        is_full_week_break = False
-        if week_start and mid_term_start and mid_term_end:
-            # Check if the working week (Mon-Fri) is covered
-            # Mon = week_start, Fri = week_start + 4
-            mon = week_start
-            fri = week_start + timedelta(days=4)
-            if mid_term_start <= mon and mid_term_end >= fri:
-                is_full_week_break = True
-
-        if is_full_week_break:
-            # Create ONE lesson for the whole week
-            lesson = SchemeLesson(
-                week_id=week.id,
-                lesson_number=1,
-                strand="MID TERM BREAK",
-                sub_strand="MID TERM BREAK",
-                specific_learning_outcomes="Mid Term Break",
-                key_inquiry_questions="",
-                learning_experiences="Mid Term Break",
-                learning_resources="",
-                assessment_methods="",
-                textbook_name="",
-                textbook_teacher_guide_pages="",
-                textbook_learner_book_pages="",
-                reflection=""
-            )
-            db.add(lesson)
-            actual_lessons_count += 1
-            # Do NOT increment current_lesson_idx (Push lessons)
-            continue # Skip to next week
-
-        # Add lessons for this week
-        for lesson_num in range(1, data.lessons_per_week + 1):
-            # Check for Mid Term Break Lesson (Partial Week)
-            is_break = False
-            if week_start and mid_term_start and mid_term_end:
-                day_offset = lesson_num - 1
-                if day_offset > 6: day_offset = 6
-                lesson_date = week_start + timedelta(days=day_offset)
-
-                if mid_term_start <= lesson_date <= mid_term_end:
-                    is_break = True
-
-            if is_break:
-                print(f"[DEBUG] Week {week_num}, Lesson {lesson_num}: BREAK (lesson_date={lesson_date.strftime('%Y-%m-%d')}). current_lesson_idx stays at {current_lesson_idx}")
-                lesson = SchemeLesson(
-                    week_id=week.id,
-                    lesson_number=lesson_num,
-                    strand="MID TERM BREAK",
-                    sub_strand="MID TERM BREAK",
-                    specific_learning_outcomes="Mid Term Break",
-                    key_inquiry_questions="",
-                    learning_experiences="Mid Term Break",
-                    learning_resources="",
-                    assessment_methods="",
-                    textbook_name="",
-                    textbook_teacher_guide_pages="",
-                    textbook_learner_book_pages="",
-                    reflection=""
-                )
-                db.add(lesson)
-                actual_lessons_count += 1
-                # Do NOT increment current_lesson_idx (Push lessons)
-            elif current_lesson_idx < total_lessons_count:
-                l_data = all_lessons_data[current_lesson_idx]
-                if week_num <= 10:  # Only log first 10 weeks
-                    print(f"[DEBUG] Week {week_num}, Lesson {lesson_num}: Curriculum idx={current_lesson_idx}, Strand={l_data['strand'][:20]}...")
-                lesson = SchemeLesson(
-                    week_id=week.id,
-                    lesson_number=lesson_num,
-                    strand=l_data["strand"],
-                    sub_strand=l_data["sub_strand"],
-                    specific_learning_outcomes=l_data["specific_learning_outcomes"],
-                    key_inquiry_questions=l_data["key_inquiry_questions"],
-                    learning_experiences=l_data["learning_experiences"],
-                    learning_resources=l_data["learning_resources"],
-                    assessment_methods=l_data["assessment_methods"],
-                    textbook_name=l_data["textbook_name"],
-                    textbook_teacher_guide_pages=l_data["textbook_teacher_guide_pages"],
-                    textbook_learner_book_pages=l_data["textbook_learner_book_pages"],
-                    reflection=""
-                )
-                db.add(lesson)
-                actual_lessons_count += 1
-                current_lesson_idx += 1
-            else:
-                # Add Revision / End of Term Assessment if curriculum is finished
-                lesson = SchemeLesson(
-                    week_id=week.id,
-                    lesson_number=lesson_num,
-                    strand="REVISION / ASSESSMENT",
-                    sub_strand="REVISION",
-                    specific_learning_outcomes="Learners to revise covered work and prepare for assessment.",
-                    key_inquiry_questions="",
-                    learning_experiences="Revision and Assessment",
-                    learning_resources="Past papers, Assessment tools",
-                    assessment_methods="Written assessment",
-                    textbook_name="",
-                    textbook_teacher_guide_pages="",
-                    textbook_learner_book_pages="",
-                    reflection=""
-                )
-                db.add(lesson)
-                actual_lessons_count += 1
+    The layout is planned in memory and written with a few bulk inserts by
+    `scheme_store.persist_scheme`.
+    """
+    from scheme_store import persist_scheme
+    from lesson_plan_generation import load_scheme_tree
+    from activity_log import record_activity, SCHEME_GENERATED
 
-    scheme.total_lessons = actual_lessons_count
+    scheme_values, weeks = plan_scheme_of_work(data, current_user, db)
+    scheme = persist_scheme(db, scheme_values, weeks)
+    record_activity(current_user, SCHEME_GENERATED, scheme_id=scheme.id)
     db.commit()
-    db.refresh(scheme)
-    
-    return scheme
+
+    return load_scheme_tree(db, scheme.id, current_user.id)
 
 async def generate_lesson_plan(plan):
     """
@@ -657,3 +431,192 @@ async def generate_lesson_plan(plan):
             plan.learning_resources = str(result["resources"])
             
     return plan
+
+
+# Matches a (possibly still-open) JSON string value for one plan section
+_PARTIAL_SECTION_RE = re.compile(
+    r'"(introduction|development|conclusion|summary|reflection_prompt)"\s*:\s*"((?:[^"\\]|\\.)*)'
+)
+
+
+def extract_partial_sections(text: str) -> Dict[str, str]:
+    """
+    Pull section text out of an incomplete JSON completion.
+
+    Used while streaming: values may still be unterminated, so trailing partial
+    escape sequences are dropped before decoding.
+    """
+    sections = {}
+    for match in _PARTIAL_SECTION_RE.finditer(text):
+        raw = re.sub(r'\\u[0-9a-fA-F]{0,3}$', '', match.group(2))
+        try:
+            sections[match.group(1)] = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            sections[match.group(1)] = raw
+    return sections
+
+
+def apply_generated_content(plan, result: Dict):
+    """Copy AI-generated sections onto a LessonPlan, keeping existing text for missing keys."""
+    plan.introduction = result.get("introduction", plan.introduction)
+    plan.development = result.get("development", plan.development)
+    plan.conclusion = result.get("conclusion", plan.conclusion)
+    plan.summary = result.get("summary", plan.summary)
+    if result.get("reflection_prompt"):
+        plan.reflection_self_evaluation = result["reflection_prompt"]
+    return plan
+
+
+def lesson_data_from_plan(plan) -> Dict:
+    return {
+        "grade": plan.grade,
+        "learning_area": plan.learning_area,
+        "strand": plan.strand_theme_topic,
+        "sub_strand": plan.sub_strand_sub_theme_sub_topic,
+        "outcomes": plan.specific_learning_outcomes,
+        "competencies": plan.core_competences or "",
+        "values": plan.values_to_be_developed or "",
+        "learning_experiences": plan.development or "",
+    }
+
+
+def group_plans_for_batch(rows: List, group_by: str = "substrand", max_batch_size: int = AILessonPlanner.MAX_BATCH_SIZE) -> List[List]:
+    """
+    Split (plan, week_number, lesson_number) rows into prompt batches.
+
+    Rows are grouped by sub-strand or by week, in scheme order. Small neighbouring
+    groups that share a strand are packed together up to `max_batch_size` so a
+    scheme full of 1-2 lesson sub-strands still needs few upstream calls.
+    """
+    groups = []
+    current_key = None
+    for row in rows:
+        plan, week_number, _ = row
+        if group_by == "week":
+            key = (week_number,)
+        else:
+            key = (plan.strand_theme_topic, plan.sub_strand_sub_theme_sub_topic)
+        if key != current_key:
+            groups.append([])
+            current_key = key
+        groups[-1].append(row)
+
+    batches = []
+    for group in groups:
+        for start in range(0, len(group), max_batch_size):
+            chunk = group[start:start + max_batch_size]
+            if batches:
+                last = batches[-1]
+                same_strand = last[-1][0].strand_theme_topic == chunk[0][0].strand_theme_topic
+                if same_strand and len(last) + len(chunk) <= max_batch_size:
+                    last.extend(chunk)
+                    continue
+            batches.append(list(chunk))
+    return batches
+
+
+def enhance_scheme_lesson_plans(
+    db,
+    scheme_id: int,
+    user_id: int,
+    group_by: str = "substrand",
+    progress_callback: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """
+    Enhance every lesson plan generated from a scheme using batched prompts.
+
+    Each batch is committed as soon as it is processed so progress survives a
+    worker restart. Lessons the batch response did not cover (or returned
+    invalid) are retried one by one with `generate_detailed_plan`.
+    """
+    from models import SchemeOfWork, SchemeWeek, SchemeLesson, LessonPlan
+
+    planner = AILessonPlanner(debug=False)
+    if not planner.client:
+        return {"status": "skipped", "reason": "AI not configured"}
+
+    scheme = db.query(SchemeOfWork).filter(
+        SchemeOfWork.id == scheme_id,
+        SchemeOfWork.user_id == user_id
+    ).first()
+    if not scheme:
+        return {"error": "Scheme not found", "status": "failed"}
+
+    rows = db.query(LessonPlan, SchemeWeek.week_number, SchemeLesson.lesson_number)\
+        .join(SchemeLesson, LessonPlan.scheme_lesson_id == SchemeLesson.id)\
+        .join(SchemeWeek, SchemeLesson.week_id == SchemeWeek.id)\
+        .filter(
+            SchemeWeek.scheme_id == scheme_id,
+            LessonPlan.user_id == user_id,
+            SchemeLesson.strand.notin_(NON_TEACHING_STRANDS),
+        )\
+        .order_by(SchemeWeek.week_number, SchemeLesson.lesson_number)\
+        .all()
+
+    total = len(rows)
+    processed = 0
+    enhanced = 0
+    failed = []
+    upstream_calls = 0
+
+    def report():
+        if progress_callback:
+            progress_callback({
+                "processed": processed,
+                "total": total,
+                "enhanced": enhanced,
+                "failed": len(failed),
+                "upstream_calls": upstream_calls,
+            })
+
+    report()
+
+    for batch in group_plans_for_batch(rows, group_by=group_by):
+        first_plan = batch[0][0]
+        strands = {plan.strand_theme_topic for plan, _, _ in batch}
+        context = {
+            "grade": first_plan.grade,
+            "learning_area": first_plan.learning_area,
+            "strand": first_plan.strand_theme_topic if len(strands) == 1 else "Various (given per lesson)",
+        }
+
+        lessons = []
+        plans_by_key = {}
+        for plan, week_number, lesson_number in batch:
+            key = str(plan.id)
+            payload = lesson_data_from_plan(plan)
+            payload["key"] = key
+            payload["position"] = f"Week {week_number}, Lesson {lesson_number}"
+            lessons.append(payload)
+            plans_by_key[key] = plan
+
+        results = planner.generate_batch_plans(context, lessons)
+        upstream_calls += 1
+
+        for key, plan in plans_by_key.items():
+            result = results.get(key)
+            if result is None:
+                # Retry only this lesson on its own
+                single = planner.generate_detailed_plan(lesson_data_from_plan(plan))
+                upstream_calls += 1
+                valid = isinstance(single, dict) and "error" not in single
+                result = planner._validate_plan(single) if valid else None
+
+            if result:
+                apply_generated_content(plan, result)
+                enhanced += 1
+            else:
+                failed.append(plan.id)
+            processed += 1
+
+        db.commit()
+        report()
+
+    return {
+        "status": "success" if not failed else "partial",
+        "scheme_id": scheme_id,
+        "total": total,
+        "enhanced": enhanced,
+        "failed_lesson_plan_ids": failed,
+        "upstream_calls": upstream_calls,
+    }
@@ -0,0 +1,279 @@
+"""
+Analytics Rollups
+Daily rollup tables behind the admin analytics endpoints, so a page load reads
+a few hundred pre-aggregated rows instead of scanning users, subjects and
+activity_events.
+
+`refresh_rollups` is run by the `refresh_analytics_rollups` Celery job:
+- The first run of a day rebuilds that day's user and subject snapshots for
+  every school (which also accounts for deleted rows).
+- Later runs only recompute schools with users or subjects updated since the
+  last watermark.
+- Activity (DAU, lessons completed, sign-ups) is recomputed for the days that
+  received new activity events since the last processed event id.
+Every rebuild replaces whole (day, school) rows, so reprocessing overlaps is
+harmless.
+"""
+
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, func, insert, or_
+from sqlalchemy.orm import Session
+
+from activity_log import LESSON_COMPLETED
+
+from models import (
+    User, UserRole, Subject, ActivityEvent, AnalyticsWatermark, AnalyticsUserDaily,
+    AnalyticsSubjectDaily, AnalyticsActivityDaily, AnalyticsTeacherTotals
+)
+
+NO_SCHOOL = 0  # school_id bucket for users without a school
+TEACHER_ROLES = (UserRole.TEACHER, UserRole.HOD)
+# Re-read this far behind the watermark so rows from transactions that
+# committed late are not skipped
+WATERMARK_LAG = timedelta(minutes=2)
+ACTIVITY_BACKFILL_DAYS = 90  # Days of activity built on the first run
+
+school_key = func.coalesce(User.school_id, NO_SCHOOL)
+
+
+def _watermark(db: Session, name: str) -> AnalyticsWatermark:
+    mark = db.query(AnalyticsWatermark).filter(AnalyticsWatermark.name == name).with_for_update().first()
+    if mark is None:
+        mark = AnalyticsWatermark(name=name, last_id=0)
+        db.add(mark)
+    return mark
+
+
+def _for_schools(query, school_ids: Optional[Iterable[int]]):
+    if school_ids is None:
+        return query
+    real = [s for s in school_ids if s != NO_SCHOOL]
+    conditions = [User.school_id.in_(real)] if real else []
+    if NO_SCHOOL in school_ids:
+        conditions.append(User.school_id.is_(None))
+    return query.filter(or_(*conditions))
+
+
+def _replace(db: Session, model, day, school_ids: Optional[Iterable[int]], rows: List[Dict]):
+    stale = db.query(model).filter(model.day == day)
+    if school_ids is not None:
+        stale = stale.filter(model.school_id.in_(list(school_ids)))
+    stale.delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(model), [{"day": day, **row} for row in rows])
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, "value") else value
+
+
+def rebuild_user_snapshot(db: Session, day, school_ids: Optional[Iterable[int]] = None):
+    active_teacher = case(
+        (and_(User.is_active == True, User.role.in_(TEACHER_ROLES)), 1),
+        else_=0
+    )
+    query = db.query(
+        school_key.label("school_id"),
+        User.role,
+        User.subscription_type,
+        func.count(User.id).label("users"),
+        func.sum(active_teacher).label("active_teachers"),
+    )
+    rows = _for_schools(query, school_ids).group_by(school_key, User.role, User.subscription_type).all()
+    _replace(db, AnalyticsUserDaily, day, school_ids, [
+        {
+            "school_id": r.school_id,
+            "role": _enum_value(r.role),
+            "subscription_type": _enum_value(r.subscription_type),
+            "users": r.users,
+            "active_teachers": int(r.active_teachers or 0),
+        }
+        for r in rows
+    ])
+
+
+def rebuild_subject_snapshot(db: Session, day, school_ids: Optional[Iterable[int]] = None):
+    progress = func.coalesce(Subject.progress_percentage, 0)
+
+    def bucket(low, high):
+        return func.sum(case((and_(progress > low, progress <= high), 1), else_=0))
+
+    query = db.query(
+        school_key.label("school_id"),
+        Subject.subject_name,
+        Subject.grade,
+        func.count(Subject.id).label("subjects"),
+        func.sum(progress).label("progress_sum"),
+        func.sum(func.coalesce(Subject.total_lessons, 0)).label("total_lessons"),
+        func.sum(func.coalesce(Subject.lessons_completed, 0)).label("lessons_completed"),
+        func.sum(case((progress <= 20, 1), else_=0)).label("progress_0_20"),
+        bucket(20, 40).label("progress_21_40"),
+        bucket(40, 60).label("progress_41_60"),
+        bucket(60, 80).label("progress_61_80"),
+        func.sum(case((progress > 80, 1), else_=0)).label("progress_81_100"),
+    ).join(User, Subject.user_id == User.id)
+    rows = _for_schools(query, school_ids).group_by(school_key, Subject.subject_name, Subject.grade).all()
+    _replace(db, AnalyticsSubjectDaily, day, school_ids, [
+        {
+            "school_id": r.school_id,
+            "subject_name": r.subject_name,
+            "grade": r.grade,
+            "subjects": r.subjects,
+            "progress_sum": r.progress_sum or 0,
+            "total_lessons": int(r.total_lessons or 0),
+            "lessons_completed": int(r.lessons_completed or 0),
+            "progress_0_20": int(r.progress_0_20 or 0),
+            "progress_21_40": int(r.progress_21_40 or 0),
+            "progress_41_60": int(r.progress_41_60 or 0),
+            "progress_61_80": int(r.progress_61_80 or 0),
+            "progress_81_100": int(r.progress_81_100 or 0),
+        }
+        for r in rows
+    ])
+
+
+def rebuild_teacher_totals(db: Session, user_ids: Optional[Iterable[int]] = None):
+    query = db.query(
+        User.id,
+        school_key.label("school_id"),
+        User.email,
+        func.count(Subject.id).label("subjects"),
+        func.avg(Subject.progress_percentage).label("avg_progress"),
+    ).join(Subject, User.id == Subject.user_id).filter(User.role.in_(TEACHER_ROLES))
+
+    stale = db.query(AnalyticsTeacherTotals)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        query = query.filter(User.id.in_(user_ids))
+        stale = stale.filter(AnalyticsTeacherTotals.user_id.in_(user_ids))
+    rows = query.group_by(User.id, school_key, User.email).all()
+
+    stale.delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(AnalyticsTeacherTotals), [
+            {
+                "user_id": r.id,
+                "school_id": r.school_id,
+                "email": r.email,
+                "subjects": r.subjects,
+                "avg_progress": r.avg_progress or 0,
+            }
+            for r in rows
+        ])
+
+
+def rebuild_activity(db: Session, first_day, last_day):
+    """Recompute DAU, lessons completed and sign-ups for each day in [first_day, last_day]."""
+    start = datetime.combine(first_day, time.min)
+    end = datetime.combine(last_day + timedelta(days=1), time.min)
+
+    # Events carry the user's school at the time, so no join; the date range
+    # only touches the partitions for those months
+    event_day = func.date(ActivityEvent.created_at)
+    event_school = func.coalesce(ActivityEvent.school_id, NO_SCHOOL)
+    active = db.query(
+        event_day.label("day"),
+        event_school.label("school_id"),
+        func.count(func.distinct(ActivityEvent.user_id)).label("active_users"),
+        func.sum(case((ActivityEvent.event_type == LESSON_COMPLETED, 1), else_=0)).label("lessons_completed"),
+    ).filter(
+        ActivityEvent.created_at >= start, ActivityEvent.created_at < end
+    ).group_by(event_day, event_school).all()
+
+    signup_day = func.date(User.created_at)
+    signups = db.query(
+        signup_day.label("day"),
+        school_key.label("school_id"),
+        func.count(User.id).label("new_users"),
+    ).filter(
+        User.created_at >= start, User.created_at < end
+    ).group_by(signup_day, school_key).all()
+
+    rows = {}
+    for r in active:
+        rows[(str(r.day), r.school_id)] = {
+            "day": r.day, "school_id": r.school_id, "active_users": r.active_users,
+            "lessons_completed": int(r.lessons_completed or 0), "new_users": 0,
+        }
+    for r in signups:
+        row = rows.setdefault((str(r.day), r.school_id), {
+            "day": r.day, "school_id": r.school_id, "active_users": 0, "lessons_completed": 0,
+        })
+        row["new_users"] = r.new_users
+
+    db.query(AnalyticsActivityDaily).filter(
+        AnalyticsActivityDaily.day >= first_day, AnalyticsActivityDaily.day <= last_day
+    ).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(AnalyticsActivityDaily), list(rows.values()))
+
+
+def refresh_rollups(db: Session, full: bool = False) -> Dict:
+    """
+    Bring the rollup tables up to date. Set `full` to rebuild today's
+    snapshots for every school regardless of watermarks. Returns a summary.
+    """
+    # Database clock, so comparisons with server_default timestamps line up
+    now = db.query(func.now()).scalar()
+    today = now.date()
+
+    # The snapshot row lock keeps concurrent refreshes from interleaving
+    snapshot = _watermark(db, "snapshot")
+    users_mark = _watermark(db, "users")
+    subjects_mark = _watermark(db, "subjects")
+    events_mark = _watermark(db, "activity_events")
+    users_since = users_mark.last_seen_at
+    summary = {"day": str(today)}
+
+    if full or snapshot.snapshot_day != today or users_since is None or subjects_mark.last_seen_at is None:
+        rebuild_user_snapshot(db, today)
+        rebuild_subject_snapshot(db, today)
+        rebuild_teacher_totals(db)
+        snapshot.snapshot_day = today
+        summary["mode"] = "full"
+    else:
+        changed = db.query(User.id, User.school_id).filter(User.updated_at >= users_since).all()
+        changed += db.query(User.id, User.school_id).join(Subject, Subject.user_id == User.id).filter(
+            Subject.updated_at >= subjects_mark.last_seen_at
+        ).distinct().all()
+        school_ids = {school_id or NO_SCHOOL for _, school_id in changed}
+        user_ids = {user_id for user_id, _ in changed}
+        if school_ids:
+            rebuild_user_snapshot(db, today, school_ids)
+            rebuild_subject_snapshot(db, today, school_ids)
+        if user_ids:
+            rebuild_teacher_totals(db, user_ids)
+        summary.update(mode="incremental", schools=len(school_ids), users=len(user_ids))
+
+    first_event_at, last_event_id = db.query(
+        func.min(ActivityEvent.created_at), func.max(ActivityEvent.id)
+    ).filter(ActivityEvent.id > (events_mark.last_id or 0)).one()
+
+    if snapshot.last_seen_at is None:
+        activity_from = today - timedelta(days=ACTIVITY_BACKFILL_DAYS)
+    else:
+        # Sign-ups since the users watermark, plus any day that got new events
+        activity_from = (users_since or now).date()
+        if first_event_at:
+            activity_from = min(activity_from, first_event_at.date())
+    rebuild_activity(db, activity_from, today)
+    summary["activity_from"] = str(activity_from)
+
+    seen_at = now - WATERMARK_LAG
+    users_mark.last_seen_at = seen_at
+    subjects_mark.last_seen_at = seen_at
+    if last_event_id:
+        events_mark.last_id = last_event_id
+    snapshot.last_seen_at = now  # When the rollups were last refreshed
+    db.commit()
+    return summary
+
+
+def rollup_state(db: Session) -> Optional[AnalyticsWatermark]:
+    """The snapshot watermark, or None if the rollups have never been built."""
+    snapshot = db.query(AnalyticsWatermark).filter(AnalyticsWatermark.name == "snapshot").first()
+    if snapshot is None or snapshot.snapshot_day is None:
+        return None
+    return snapshot
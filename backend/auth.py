@@ -1,19 +1,28 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
+from fastapi import HTTPException
 from config import settings
+import asyncio
+import math
+import threading
+import time
 import warnings
 
 # Suppress bcrypt version warning
 warnings.filterwarnings("ignore", message=".*bcrypt.*")
 
-# Configure bcrypt with lower rounds for faster hashing
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=10  # Reduced from default 12 for faster login (still secure)
-)
+# The first scheme hashes new passwords; hashes in the others, or bcrypt hashes
+# with a different cost, still verify and are upgraded on the next login
+_hash_schemes = [scheme.strip() for scheme in settings.PASSWORD_HASH_SCHEMES.split(",") if scheme.strip()]
+_bcrypt_policy = {
+    "bcrypt__rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+    "bcrypt__min_rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+    "bcrypt__max_rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+} if "bcrypt" in _hash_schemes else {}
+pwd_context = CryptContext(schemes=_hash_schemes, deprecated="auto", **_bcrypt_policy)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -23,6 +32,126 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+
+class PasswordHasher:
+    """
+    Runs hashing and verification on a dedicated pool, so a login peak
+    queues here for a few cores instead of burning CPU in the threadpool that
+    serves sync endpoints (and async callers never block the event loop).
+    bcrypt releases the GIL while hashing, so threads give real parallelism;
+    the pool size caps how many cores hashing can take from request handling.
+    Admission is bounded: past `max_pending` queued + running calls, callers
+    get 503 with a Retry-After estimate. A bulk job is admitted once as a whole
+    and then fed through `workers` calls at a time, so it never trips the cap
+    itself and interactive calls queue behind at most one chunk of it.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = max(workers, 1)
+        self.max_pending = max(max_pending, self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        # Admission checks and reserves a slot in one step, so concurrent callers can't overshoot
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        # Moving averages, in seconds
+        self._avg_wait = 0.0
+        self._avg_run = 0.1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": min(self._pending, self.workers),
+            "queued": max(self._pending - self.workers, 0),
+            "max_pending": self.max_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._avg_wait * 1000, 1),
+            "avg_run_ms": round(self._avg_run * 1000, 1),
+        }
+
+    def _admit(self, check: bool = True):
+        """Reserve a pending slot; with `check`, refuse it once `max_pending` are taken."""
+        with self._lock:
+            if not check or self._pending < self.max_pending:
+                self._pending += 1
+                return
+            self._rejected += 1
+            retry_after = math.ceil(self._avg_run * self._pending / self.workers)
+        raise HTTPException(
+            status_code=503,
+            detail="Sign-in is busy right now. Please try again shortly.",
+            headers={"Retry-After": str(max(1, retry_after))}
+        )
+
+    def _submit(self, func: Callable, args: tuple):
+        submitted = time.monotonic()
+
+        def timed():
+            started = time.monotonic()
+            result = func(*args)
+            return result, started - submitted, time.monotonic() - started
+
+        return self._executor.submit(timed)
+
+    def _finish(self, outcome):
+        with self._lock:
+            self._pending -= 1
+            if outcome is None:
+                return None
+            result, wait, run = outcome
+            self._completed += 1
+            self._avg_wait = 0.8 * self._avg_wait + 0.2 * wait
+            self._avg_run = 0.8 * self._avg_run + 0.2 * run
+        return result
+
+    async def run(self, func: Callable, *args, admit: bool = True):
+        self._admit(check=admit)
+        outcome = None
+        try:
+            outcome = await asyncio.wrap_future(self._submit(func, args))
+        finally:
+            result = self._finish(outcome)
+        return result
+
+    async def run_batch(self, func: Callable, items: List) -> List:
+        """`func(item)` for every item, admitted as one job and run a chunk at a time."""
+        self._admit()
+        results = []
+        try:
+            for start in range(0, len(items), self.workers):
+                chunk = items[start:start + self.workers]
+                results.extend(await asyncio.gather(*(self.run(func, item, admit=False) for item in chunk)))
+        finally:
+            self._finish(None)
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_QUEUE_MAX,
+)
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash passwords in the bounded hashing pool without blocking the event loop"""
+    return await password_hasher.run_batch(pwd_context.hash, passwords)
+
+async def hash_password(password: str) -> str:
+    """Hash one password in the bounded hashing pool"""
+    return await password_hasher.run(pwd_context.hash, password)
+
+async def verify_and_upgrade_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the bounded hashing pool. Returns (valid, new_hash);
+    new_hash is set when the stored hash uses an outdated scheme or cost and
+    should be replaced.
+    """
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -12,11 +12,16 @@ from typing import Optional
 from database import get_db
 from models import User
 from schemas import UserCreate, UserLogin, UserResponse, Token, GoogleAuth, CaptchaResponse, PasswordResetRequest, PasswordReset
-from auth import get_password_hash, verify_password, create_access_token, verify_token, verify_captcha_token
+from auth import hash_password, verify_and_upgrade_password, create_access_token, verify_token, verify_captcha_token
 from config import settings
 from google_auth import verify_google_token
-from email_utils import send_verification_email, send_welcome_email, send_password_reset_email
+from email_utils import queue_verification_email, queue_welcome_email, queue_password_reset_email
+from email_outbox import notify_outbox
+from activity_log import record_activity, LOGIN
+from live_counters import track_signup
+from rate_limiter import rate_limiter
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
 import logging
 import random
 
@@ -81,7 +86,7 @@ def generate_verification_token() -> str:
 
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limiter("auth"))])
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user with email and password
@@ -97,7 +102,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         verification_token = generate_verification_token()
         
         new_user = User(
@@ -117,20 +122,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(new_user)
+        # Queued with the user, so the email exists only if the account does
+        queue_verification_email(
+            db,
+            to_email=new_user.email,
+            username=new_user.full_name,
+            verification_token=verification_token
+        )
         db.commit()
         db.refresh(new_user)
-        
-        # Send verification email
-        try:
-            await send_verification_email(
-                to_email=new_user.email,
-                username=new_user.full_name,
-                verification_token=verification_token
-            )
-            logger.info(f"Verification email sent to {new_user.email}")
-        except Exception as e:
-            logger.error(f"Failed to send verification email: {str(e)}")
-            # Don't fail registration if email fails
+        notify_outbox()
+        track_signup(new_user.role)
         
         return new_user
         
@@ -146,8 +148,24 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 
-@router.post("/login", response_model=Token)
-def login(response: Response, user_credentials: UserLogin, db: Session = Depends(get_db)):
+def _find_login_user(db: Session, email: str) -> Optional[User]:
+    """Look up the user signing in, with the subjects the response reads already loaded"""
+    user = db.query(User).filter(User.email == email).first()
+    if user is not None:
+        user.subjects
+    return user
+
+
+def _save_upgraded_hash(db: Session, user: User, password_hash: str):
+    """Store a rehashed password and reload what the commit expired"""
+    user.password_hash = password_hash
+    db.commit()
+    db.refresh(user)
+    user.subjects
+
+
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limiter("auth"))])
+async def login(response: Response, user_credentials: UserLogin, db: Session = Depends(get_db)):
     """
     Login with email and password
     Returns JWT access token and sets HttpOnly cookie
@@ -166,8 +184,8 @@ def login(response: Response, user_credentials: UserLogin, db: Session = Depends
                 detail="Incorrect captcha answer"
             )
 
-        # Find user
-        user = db.query(User).filter(User.email == user_credentials.email).first()
+        # Find user (DB work runs in the threadpool, hashing in the hashing pool)
+        user = await run_in_threadpool(_find_login_user, db, user_credentials.email)
         
         if not user or user.auth_provider != "local":
             raise HTTPException(
@@ -176,12 +194,17 @@ def login(response: Response, user_credentials: UserLogin, db: Session = Depends
             )
         
         # Verify password
-        if not verify_password(user_credentials.password, user.password_hash):
+        valid, upgraded_hash = await verify_and_upgrade_password(user_credentials.password, user.password_hash)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
         
+        # Stored with an outdated scheme or cost: replace it while we have the plain password
+        if upgraded_hash:
+            await run_in_threadpool(_save_upgraded_hash, db, user, upgraded_hash)
+        
         # Check if email is verified
         if not user.email_verified:
             raise HTTPException(
@@ -199,6 +222,7 @@ def login(response: Response, user_credentials: UserLogin, db: Session = Depends
         
         # Create access token
         access_token = create_access_token(data={"sub": user.email})
+        record_activity(user, LOGIN, provider="local")
         
         # Set HttpOnly cookie
         response.set_cookie(
@@ -276,18 +300,17 @@ async def google_auth(response: Response, google_data: GoogleAuth, db: Session =
                 updated_at=datetime.utcnow()
             )
             db.add(new_user)
+            # Welcome email for new users
+            queue_welcome_email(db, new_user.email, new_user.full_name)
             db.commit()
             db.refresh(new_user)
             user = new_user
-            
-            # Send welcome email for new users
-            try:
-                await send_welcome_email(user.email, user.full_name)
-            except Exception as e:
-                logger.error(f"Failed to send welcome email: {str(e)}")
+            notify_outbox()
+            track_signup(user.role)
         
         # Create access token
         access_token = create_access_token(data={"sub": user.email})
+        record_activity(user, LOGIN, provider="google")
         
         print(f"DEBUG: Returning user {user.email} with role {user.role}")
 
@@ -355,13 +378,9 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
         user.email_verified = True
         user.verification_token = None  # Clear token
         user.updated_at = datetime.utcnow()
+        queue_welcome_email(db, user.email, user.full_name)
         db.commit()
-        
-        # Send welcome email
-        try:
-            await send_welcome_email(user.email, user.full_name)
-        except Exception as e:
-            logger.error(f"Failed to send welcome email: {str(e)}")
+        notify_outbox()
         
         return {
             "message": "Email verified successfully",
@@ -379,7 +398,7 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
         )
 
 
-@router.post("/resend-verification")
+@router.post("/resend-verification", dependencies=[Depends(rate_limiter("auth"))])
 async def resend_verification(email: str = Body(..., embed=True), db: Session = Depends(get_db)):
     """
     Resend verification email
@@ -402,21 +421,14 @@ async def resend_verification(email: str = Body(..., embed=True), db: Session =
         new_token = generate_verification_token()
         user.verification_token = new_token
         user.updated_at = datetime.utcnow()
+        queue_verification_email(
+            db,
+            to_email=user.email,
+            username=user.full_name,
+            verification_token=new_token
+        )
         db.commit()
-        
-        # Send verification email
-        try:
-            await send_verification_email(
-                to_email=user.email,
-                username=user.full_name,
-                verification_token=new_token
-            )
-        except Exception as e:
-            logger.error(f"Failed to send verification email: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to send verification email"
-            )
+        notify_outbox()
         
         return {"message": "Verification email sent"}
         
@@ -431,7 +443,7 @@ async def resend_verification(email: str = Body(..., embed=True), db: Session =
         )
 
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[Depends(rate_limiter("auth"))])
 async def forgot_password(request_data: PasswordResetRequest, db: Session = Depends(get_db)):
     """
     Request a password reset email
@@ -456,19 +468,14 @@ async def forgot_password(request_data: PasswordResetRequest, db: Session = Depe
         user.password_reset_token = reset_token
         user.password_reset_expires = reset_expires
         user.updated_at = datetime.utcnow()
+        queue_password_reset_email(
+            db,
+            to_email=user.email,
+            username=user.full_name or "User",
+            reset_token=reset_token
+        )
         db.commit()
-        
-        # Send password reset email
-        try:
-            await send_password_reset_email(
-                to_email=user.email,
-                username=user.full_name or "User",
-                reset_token=reset_token
-            )
-            logger.info(f"Password reset email sent to {user.email}")
-        except Exception as e:
-            logger.error(f"Failed to send password reset email: {str(e)}")
-            # Still return success to prevent email enumeration
+        notify_outbox()
         
         return {"message": "If an account exists with this email, a password reset link has been sent."}
         
@@ -481,7 +488,7 @@ async def forgot_password(request_data: PasswordResetRequest, db: Session = Depe
         )
 
 
-@router.post("/reset-password")
+@router.post("/reset-password", dependencies=[Depends(rate_limiter("auth"))])
 async def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
     """
     Reset password with token from email
@@ -511,7 +518,7 @@ async def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db
             )
         
         # Update password
-        user.password_hash = get_password_hash(reset_data.new_password)
+        user.password_hash = await hash_password(reset_data.new_password)
         user.password_reset_token = None  # Clear token
         user.password_reset_expires = None
         user.updated_at = datetime.utcnow()
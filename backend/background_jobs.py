@@ -0,0 +1,278 @@
+"""
+Background Jobs
+Named job types that can be submitted through the /jobs API (or the async mode
+of the heavy endpoints), each mapped to a Celery task. Every submission is
+recorded in `background_jobs` under the Celery task id; the worker keeps the
+record's status and result up to date through the task signals in
+`celery_app`, and progress is copied over from the result backend on reads.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import User, UserRole, BackgroundJob
+
+JOBS_PREFIX = f"{settings.API_V1_PREFIX}/jobs"
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("success", "failed", "cancelled")
+
+
+def _require(params: Dict, *keys) -> List:
+    missing = [key for key in keys if params.get(key) in (None, "", [])]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing job parameters: {', '.join(missing)}")
+    return [params[key] for key in keys]
+
+
+def _scheme_lesson_plans_args(db: Session, params: Dict, user: User) -> List:
+    scheme_id, = _require(params, "scheme_id")
+    return [int(scheme_id), user.id]
+
+
+def _enhance_lesson_plan_args(db: Session, params: Dict, user: User) -> List:
+    lesson_plan_id, = _require(params, "lesson_plan_id")
+    return [int(lesson_plan_id), user.id]
+
+
+def _enhance_scheme_args(db: Session, params: Dict, user: User) -> List:
+    scheme_id, = _require(params, "scheme_id")
+    group_by = params.get("group_by") or "substrand"
+    if group_by not in ("substrand", "week"):
+        raise HTTPException(status_code=400, detail="group_by must be 'substrand' or 'week'")
+    return [int(scheme_id), user.id, group_by]
+
+
+def _export_lesson_plans_args(db: Session, params: Dict, user: User) -> List:
+    lesson_plan_ids, = _require(params, "lesson_plan_ids")
+    return [[int(plan_id) for plan_id in lesson_plan_ids], user.id]
+
+
+def _generate_scheme_args(db: Session, params: Dict, user: User) -> List:
+    from schemas import SchemeAutoGenerateRequest
+    try:
+        data = SchemeAutoGenerateRequest(**params)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scheme parameters: {e}")
+    return [data.model_dump(), user.id]
+
+
+def _import_curriculum_args(db: Session, params: Dict, user: User) -> List:
+    # Only a file saved by /curriculum/upload, named by the upload id; never a client-supplied path
+    from routers.curriculum import UPLOAD_DIR
+    upload, = _require(params, "upload")
+    name = os.path.basename(str(upload))
+    file_path = os.path.join(UPLOAD_DIR, name)
+    if name in ("", ".", "..") or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="Uploaded file not found")
+    return [file_path, user.id]
+
+
+def _document_pack_args(db: Session, params: Dict, user: User) -> List:
+    term, year = _require(params, "term", "year")
+    if user.role not in [UserRole.SCHOOL_ADMIN, UserRole.HOD, UserRole.SUPER_ADMIN]:
+        raise HTTPException(status_code=403, detail="Only School Admins and HODs can export document packs")
+    if not user.school_id:
+        raise HTTPException(status_code=400, detail="User is not linked to a school")
+    subjects = params.get("subjects") or None
+    if user.role == UserRole.HOD:
+        # An HOD's scope comes from the departments they head, never from the request
+        from document_pack import hod_learning_areas
+        scope = hod_learning_areas(db, user)
+        if not scope:
+            raise HTTPException(status_code=403, detail="You are not the HOD of any department in your school")
+        if subjects:
+            requested = {s.strip().lower() for s in subjects if s and s.strip()}
+            subjects = [area for area in scope if area.lower() in requested]
+            if not subjects:
+                raise HTTPException(status_code=403, detail="You can only export your department's learning areas")
+        else:
+            subjects = scope
+        params["subjects"] = subjects
+    return [user.id, user.school_id, term, int(year), subjects]
+
+
+# job_type -> (Celery task name, builds the task arguments from params and the submitting user)
+JOB_TYPES: Dict[str, tuple] = {
+    "generate_lesson_plans": ("generate_lesson_plans_background", _scheme_lesson_plans_args),
+    "enhance_lesson_plan": ("generate_ai_lesson_content", _enhance_lesson_plan_args),
+    "enhance_scheme_lesson_plans": ("enhance_scheme_lesson_plans_batch", _enhance_scheme_args),
+    "export_lesson_plans_pdf": ("export_lesson_plans_pdf", _export_lesson_plans_args),
+    "generate_scheme": ("generate_scheme_background", _generate_scheme_args),
+    "import_curriculum": ("import_curriculum_file", _import_curriculum_args),
+    "export_document_pack": ("export_document_pack", _document_pack_args),
+}
+
+# Tasks whose lifecycle is mirrored into background_jobs
+TRACKED_TASKS = {task_name for task_name, _ in JOB_TYPES.values()}
+
+
+def submit_job(db: Session, user: User, job_type: str, params: Optional[Dict] = None) -> BackgroundJob:
+    """Record a job and queue its task. Raises 400/403 for bad input, 503 if Celery is down."""
+    if job_type not in JOB_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown job type: {job_type}")
+    params = params or {}
+    task_name, build_args = JOB_TYPES[job_type]
+    args = build_args(db, params, user)
+
+    job = BackgroundJob(id=str(uuid.uuid4()), user_id=user.id, job_type=job_type, status="queued", params=params)
+    db.add(job)
+    db.commit()
+
+    try:
+        from celery_app import celery_app
+        celery_app.send_task(task_name, args=args, task_id=job.id)
+    except Exception as e:
+        print(f"[ERROR] Could not queue job {job_type}: {e}")
+        job.status = "failed"
+        job.error = "Background processing is not available right now"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        raise HTTPException(status_code=503, detail="Background processing is not available right now")
+    return job
+
+
+def job_accepted(job: BackgroundJob, **extra) -> JSONResponse:
+    """202 response for an endpoint running in async mode."""
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "task_id": job.id,
+        "status": job.status,
+        "status_url": f"{JOBS_PREFIX}/{job.id}",
+        **extra,
+    })
+
+
+def get_user_job(db: Session, job_id: str, user: User) -> BackgroundJob:
+    job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id, BackgroundJob.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def outcome_status(retval) -> tuple:
+    """(status, error) for a task return value; tasks report failures as {"status": "failed"}."""
+    if isinstance(retval, dict) and (retval.get("status") == "failed" or "error" in retval):
+        return "failed", str(retval.get("error") or "Job failed")
+    return "success", None
+
+
+def refresh_job(db: Session, job: BackgroundJob) -> BackgroundJob:
+    """
+    Copy live progress from the result backend into an unfinished job, and
+    settle jobs whose worker died before the signals could record the outcome.
+    """
+    if job.status not in ACTIVE_STATUSES:
+        return job
+    try:
+        from celery_app import celery_app
+        result = celery_app.AsyncResult(job.id)
+        state, info = result.state, result.info
+        if state == "PROGRESS" and isinstance(info, dict) and info.get("group_id"):
+            # Fanned out as a chord (document packs); count the finished parts
+            parts = celery_app.GroupResult.restore(info["group_id"])
+            if parts is not None:
+                info = {**info, "completed": parts.completed_count()}
+    except Exception as e:
+        print(f"[ERROR] Could not read task {job.id}: {e}")
+        return job
+
+    changed = False
+    if state == "PROGRESS" and isinstance(info, dict) and info != job.progress:
+        job.progress = info
+        job.status = "running"
+        changed = True
+    elif state == "SUCCESS":
+        job.status, job.error = outcome_status(info)
+        job.result = info if isinstance(info, dict) else {"value": info}
+        job.finished_at = job.finished_at or datetime.utcnow()
+        changed = True
+    elif state in ("FAILURE", "REVOKED"):
+        job.status = "cancelled" if state == "REVOKED" else "failed"
+        job.error = job.error or str(info)
+        job.finished_at = job.finished_at or datetime.utcnow()
+        changed = True
+
+    if changed:
+        db.commit()
+    return job
+
+
+def cancel_job(db: Session, job: BackgroundJob) -> BackgroundJob:
+    if job.status in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    try:
+        from celery_app import celery_app
+        # Terminate stops a job that already started; a queued one is dropped on arrival
+        celery_app.control.revoke(job.id, terminate=job.status == "running")
+    except Exception as e:
+        print(f"[ERROR] Could not cancel job {job.id}: {e}")
+        raise HTTPException(status_code=503, detail="Background processing is not available right now")
+
+    job.status = "cancelled"
+    job.finished_at = datetime.utcnow()
+    db.commit()
+    return job
+
+
+def job_file(job: BackgroundJob) -> Optional[str]:
+    """Path of the file a finished job produced, if it exists and has not expired."""
+    from export_files import export_available
+    result = job.result or {}
+    path = result.get("file")
+    if job.status == "success" and path and export_available(path):
+        return path
+    return None
+
+
+def sse_event(event: str, data: dict) -> str:
+    """One server-sent event, as written by the job and AI streaming endpoints."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def serialize_job(job: BackgroundJob, prefix: str = JOBS_PREFIX) -> Dict:
+    # Internal file paths stay on the server; a download URL is offered instead
+    result = {k: v for k, v in (job.result or {}).items() if k not in ("file", "user_id")} or None
+    data = {
+        "id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "params": job.params,
+        "progress": job.progress,
+        "result": result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "status_url": f"{prefix}/{job.id}",
+    }
+    if (job.result or {}).get("file"):
+        data["download_url"] = f"{prefix}/{job.id}/file"
+    return data
+
+
+# Worker-side bookkeeping, called from the Celery task signals
+
+def mark_job_started(db: Session, job_id: str):
+    db.query(BackgroundJob).filter(
+        BackgroundJob.id == job_id, BackgroundJob.status == "queued"
+    ).update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def mark_job_finished(db: Session, job_id: str, status: str, result=None, error: Optional[str] = None):
+    values = {"status": status, "error": error, "finished_at": datetime.utcnow()}
+    if result is not None:
+        values["result"] = result if isinstance(result, dict) else {"value": result}
+    db.query(BackgroundJob).filter(
+        BackgroundJob.id == job_id, BackgroundJob.status.in_(ACTIVE_STATUSES)
+    ).update(values, synchronize_session=False)
+    db.commit()
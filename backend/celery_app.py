@@ -3,11 +3,17 @@ Celery Application for Background Task Processing
 Handles heavy operations like AI lesson generation, bulk operations, etc.
 """
 import os
+import json
+import time
 from celery import Celery
+from celery.signals import before_task_publish, task_prerun, task_postrun, task_revoked, worker_process_shutdown
+from kombu import Queue
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from config import settings
+
 # Initialize Celery
 celery_app = Celery(
     'teachtrack',
@@ -15,6 +21,44 @@ celery_app = Celery(
     backend=os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 )
 
+# Queue topology
+# Each queue can be served by its own worker pool so a burst of long AI calls
+# cannot starve quick work, e.g.
+#   celery -A celery_app worker -Q ai -c 4 --prefetch-multiplier=1
+# A worker started without -Q consumes every queue below.
+QUEUES = {
+    # name: worker concurrency, prefetch multiplier, hard/soft time limits (seconds)
+    'ai': {'concurrency': 4, 'prefetch': 1, 'time_limit': 600, 'soft_time_limit': 540},
+    'pdf': {'concurrency': 4, 'prefetch': 1, 'time_limit': 900, 'soft_time_limit': 840},
+    'bulk': {'concurrency': 2, 'prefetch': 1, 'time_limit': 3600, 'soft_time_limit': 3480},
+    'email': {'concurrency': 4, 'prefetch': 8, 'time_limit': 60, 'soft_time_limit': 45},
+    'default': {'concurrency': 4, 'prefetch': 4, 'time_limit': 300, 'soft_time_limit': 270},
+}
+
+# task name -> (queue, priority); with Redis 0 is the highest priority
+TASK_ROUTES = {
+    'generate_ai_lesson_content': ('ai', 3),  # One plan, a user is waiting
+    'enhance_scheme_lesson_plans_batch': ('ai', 6),
+    'export_lesson_plans_pdf': ('pdf', 3),
+    'render_pack_document': ('pdf', 7),  # Pack renders yield to interactive exports
+    'export_document_pack': ('bulk', 5),
+    'finish_document_pack': ('bulk', 5),
+    'document_pack_failed': ('bulk', 5),
+    'import_curriculum_file': ('bulk', 5),
+    'generate_lesson_plans_background': ('default', 3),
+    'generate_scheme_background': ('default', 3),
+    'deliver_email_outbox': ('email', 3),
+    'refresh_analytics_rollups': ('default', 7),
+    'maintain_activity_partitions': ('default', 8),
+    'reconcile_live_counters': ('default', 7),
+    'reconcile_payment_totals': ('default', 8),
+    'purge_expired_exports': ('default', 8),
+    'health_check': ('default', 0),
+}
+
+PRIORITY_STEPS = list(range(10))
+PRIORITY_SEP = '\x06\x16'  # kombu's separator for per-priority Redis lists
+
 # Configuration
 celery_app.conf.update(
     task_serializer='json',
@@ -23,9 +67,54 @@ celery_app.conf.update(
     timezone='Africa/Nairobi',
     enable_utc=True,
     task_track_started=True,
-    task_time_limit=300,  # 5 minutes max per task
-    worker_prefetch_multiplier=4,
+    task_time_limit=300,  # 5 minutes max per task unless its queue allows more
+    worker_prefetch_multiplier=1,  # Overridden per pool with --prefetch-multiplier
     worker_max_tasks_per_child=1000,
+    task_queues=[Queue(name, routing_key=name) for name in QUEUES],
+    task_default_queue='default',
+    task_default_priority=5,
+    task_routes={name: {'queue': queue} for name, (queue, _) in TASK_ROUTES.items()},
+    task_annotations={
+        name: {
+            'priority': priority,
+            'time_limit': QUEUES[queue]['time_limit'],
+            'soft_time_limit': QUEUES[queue]['soft_time_limit'],
+        }
+        for name, (queue, priority) in TASK_ROUTES.items()
+    },
+    broker_transport_options={
+        'priority_steps': PRIORITY_STEPS,
+        'sep': PRIORITY_SEP,
+        'queue_order_strategy': 'priority',
+    },
+    # Periodic jobs: the email outbox sweep (retries, kicks lost while workers were
+    # down) and the analytics rollups; run one scheduler: celery -A celery_app beat
+    beat_schedule={
+        'deliver-email-outbox': {
+            'task': 'deliver_email_outbox',
+            'schedule': settings.EMAIL_OUTBOX_INTERVAL_SECONDS,
+        },
+        'refresh-analytics-rollups': {
+            'task': 'refresh_analytics_rollups',
+            'schedule': settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS,
+        },
+        'reconcile-live-counters': {
+            'task': 'reconcile_live_counters',
+            'schedule': settings.LIVE_COUNTERS_RECONCILE_SECONDS,
+        },
+        'reconcile-payment-totals': {
+            'task': 'reconcile_payment_totals',
+            'schedule': 24 * 60 * 60,
+        },
+        'maintain-activity-partitions': {
+            'task': 'maintain_activity_partitions',
+            'schedule': 24 * 60 * 60,
+        },
+        'purge-expired-exports': {
+            'task': 'purge_expired_exports',
+            'schedule': 60 * 60,
+        },
+    },
 )
 
 # Auto-discover tasks from the current module (tasks are defined in this file)
@@ -40,110 +129,23 @@ def generate_lesson_plans_background(scheme_id: int, user_id: int):
     This prevents blocking the API when 500 teachers click "Generate" at once
     """
     from database import SessionLocal
-    from models import SchemeOfWork, LessonPlan, SchemeWeek, SchemeLesson, SystemTerm, UserTermAdjustment
-    from sqlalchemy.orm import joinedload
-    from datetime import timedelta
-    import re
+    from models import User
+    from lesson_plan_generation import load_scheme_tree, generate_lesson_plans_for_scheme
     
     db = SessionLocal()
     try:
-        # Fetch the scheme with all related data
-        scheme = db.query(SchemeOfWork).options(
-            joinedload(SchemeOfWork.weeks).joinedload(SchemeWeek.lessons),
-            joinedload(SchemeOfWork.subject_rel)
-        ).filter(
-            SchemeOfWork.id == scheme_id,
-            SchemeOfWork.user_id == user_id
-        ).first()
-        
+        scheme = load_scheme_tree(db, scheme_id, user_id)
         if not scheme:
             return {"error": "Scheme not found", "status": "failed"}
-        
-        # Check if plans already exist
-        existing_plans = db.query(LessonPlan).join(SchemeLesson).join(SchemeWeek).filter(
-            SchemeWeek.scheme_id == scheme_id
-        ).count()
-        
-        if existing_plans > 0:
-            return {
-                "error": f"Lesson plans already exist ({existing_plans} plans found)",
-                "status": "failed"
-            }
-        
-        created_count = 0
-
-        # Resolve term start date (system term, optionally adjusted)
-        term_number = None
-        if scheme.term:
-            m = re.search(r"(\d+)", scheme.term)
-            if m:
-                term_number = int(m.group(1))
-
-        term_q = db.query(SystemTerm).filter(SystemTerm.year == scheme.year)
-        system_term = None
-        if scheme.term:
-            system_term = term_q.filter(SystemTerm.term_name == scheme.term).first()
-            if not system_term and term_number is not None:
-                system_term = term_q.filter(SystemTerm.term_number == term_number).first()
-        if not system_term:
-            system_term = term_q.order_by(SystemTerm.term_number.asc()).first()
-
-        term_start = None
-        if system_term:
-            adjustment = None
-            if getattr(scheme.user, 'school_id', None):
-                adjustment = db.query(UserTermAdjustment).filter(
-                    UserTermAdjustment.system_term_id == system_term.id,
-                    UserTermAdjustment.school_id == scheme.user.school_id,
-                    UserTermAdjustment.is_active == True,
-                ).first()
-            if not adjustment:
-                adjustment = db.query(UserTermAdjustment).filter(
-                    UserTermAdjustment.system_term_id == system_term.id,
-                    UserTermAdjustment.user_id == user_id,
-                    UserTermAdjustment.is_active == True,
-                ).first()
-            term_start = adjustment.adjusted_start_date if adjustment else system_term.start_date
-        
-        # Generate lesson plans for each lesson
-        for week in scheme.weeks:
-            for lesson in week.lessons:
-                planned_date = None
-                if term_start:
-                    week_start = term_start + timedelta(days=(week.week_number - 1) * 7)
-                    lesson_index = max((lesson.lesson_number or 1) - 1, 0)
-                    extra_weeks, day_index = divmod(lesson_index, 5)
-                    planned_dt = week_start + timedelta(weeks=extra_weeks, days=day_index)
-                    planned_date = planned_dt.date().isoformat()
-
-                lesson_plan = LessonPlan(
-                    user_id=user_id,
-                    subject_id=scheme.subject_id,
-                    scheme_lesson_id=lesson.id,
-                    learning_area=scheme.subject,
-                    grade=scheme.grade,
-                    date=planned_date,
-                    roll=scheme.roll,
-                    lesson_duration_minutes=getattr(scheme, 'lesson_duration_minutes', None),
-                    strand_theme_topic=lesson.strand,
-                    sub_strand_sub_theme_sub_topic=lesson.sub_strand,
-                    specific_learning_outcomes=lesson.specific_learning_outcomes,
-                    key_inquiry_questions=lesson.key_inquiry_questions or "",
-                    learning_resources=lesson.learning_resources or "",
-                    introduction=f"Introduce: {lesson.strand} - {lesson.sub_strand}",
-                    development=lesson.learning_experiences or "Learning activities",
-                    conclusion="Summarize key learning points",
-                    summary=f"Week {week.week_number}: {lesson.sub_strand}",
-                    status="pending"
-                )
-                db.add(lesson_plan)
-                created_count += 1
-        
+
+        user = db.query(User).filter(User.id == user_id).first()
+        result = generate_lesson_plans_for_scheme(db, scheme, user)
         db.commit()
         
         return {
             "status": "success",
-            "created": created_count,
+            "created": result["created"],
+            "skipped": result["skipped"],
             "scheme_id": scheme_id
         }
         
@@ -219,8 +221,480 @@ def generate_ai_lesson_content(lesson_plan_id: int, user_id: int):
         db.close()
 
 
+@celery_app.task(bind=True, name='enhance_scheme_lesson_plans_batch')
+def enhance_scheme_lesson_plans_batch(self, scheme_id: int, user_id: int, group_by: str = 'substrand'):
+    """
+    Background task to AI-enhance every lesson plan of a scheme in batches
+    Lessons of a sub-strand (or week) share one prompt; progress is reported
+    through the task state so the API can poll it
+    """
+    from database import SessionLocal
+    from ai_lesson_planner import enhance_scheme_lesson_plans
+
+    db = SessionLocal()
+    try:
+        def report_progress(progress):
+            self.update_state(state='PROGRESS', meta=progress)
+
+        return enhance_scheme_lesson_plans(
+            db,
+            scheme_id,
+            user_id,
+            group_by=group_by,
+            progress_callback=report_progress
+        )
+    except Exception as e:
+        db.rollback()
+        return {"error": str(e), "status": "failed"}
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, name='export_lesson_plans_pdf')
+def export_lesson_plans_pdf(self, lesson_plan_ids: list, user_id: int):
+    """
+    Background task to render a large bulk lesson plan download into a single PDF
+    The file lands in EXPORT_DIR and is served by /lesson-plans/bulk-download/{task_id}/file
+    """
+    from database import SessionLocal
+    from models import User, LessonPlan
+    from pdf_render_service import snapshot_row
+    from export_files import new_export_path, purge_expired_exports
+    from pdf import render_lesson_plans_bulk
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        plans = db.query(LessonPlan).filter(
+            LessonPlan.id.in_(lesson_plan_ids),
+            LessonPlan.user_id == user_id
+        ).all()
+        if not user or not plans:
+            return {"error": "No lesson plans found", "status": "failed", "user_id": user_id}
+
+        self.update_state(state='PROGRESS', meta={"status": "rendering", "user_id": user_id, "total_plans": len(plans)})
+
+        # Keep the caller's order
+        position = {plan_id: i for i, plan_id in enumerate(lesson_plan_ids)}
+        snapshots = [snapshot_row(plan) for plan in sorted(plans, key=lambda p: position.get(p.id, 0))]
+        teacher_name = user.full_name or user.email
+    finally:
+        db.close()
+
+    try:
+        purge_expired_exports()
+        output_path = render_lesson_plans_bulk(snapshots, teacher_name, new_export_path("lesson_plans", "pdf"))
+    except Exception as e:
+        return {"error": str(e), "status": "failed", "user_id": user_id}
+
+    return {
+        "status": "success",
+        "user_id": user_id,
+        "total_plans": len(snapshots),
+        "file": output_path,
+        "filename": f"LessonPlans_Bulk_{len(snapshots)}_plans.pdf",
+    }
+
+
+@celery_app.task(name='generate_scheme_background')
+def generate_scheme_background(data: dict, user_id: int):
+    """
+    Background task to generate and save a scheme of work
+    Same planning and bulk persistence as POST /schemes/generate
+    """
+    from database import SessionLocal
+    from models import User
+    from schemas import SchemeAutoGenerateRequest
+    from ai_lesson_planner import plan_scheme_of_work
+    from scheme_store import persist_scheme
+    from activity_log import record_activity, SCHEME_GENERATED
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return {"error": "User not found", "status": "failed"}
+
+        scheme_values, weeks = plan_scheme_of_work(SchemeAutoGenerateRequest(**data), user, db)
+        scheme = persist_scheme(db, scheme_values, weeks)
+        record_activity(user, SCHEME_GENERATED, scheme_id=scheme.id)
+        db.commit()
+        return {"status": "success", "scheme_id": scheme.id, "total_weeks": len(weeks)}
+    except Exception as e:
+        db.rollback()
+        return {"error": str(getattr(e, "detail", e)), "status": "failed"}
+    finally:
+        db.close()
+
+
+@celery_app.task(name='import_curriculum_file')
+def import_curriculum_file(file_path: str, user_id: int):
+    """
+    Background task to parse an uploaded curriculum file and import it
+    The upload directory must be shared with the workers, like EXPORT_DIR
+    """
+    from database import SessionLocal
+    from curriculum_parser import CurriculumParser
+    from curriculum_importer import import_curriculum_from_json
+
+    db = SessionLocal()
+    try:
+        result = CurriculumParser().parse_file(file_path)
+        import_curriculum_from_json(result, db)
+        return {
+            "status": "success",
+            "subject": result.get("subject") if isinstance(result, dict) else None,
+            "grade": result.get("grade") if isinstance(result, dict) else None,
+        }
+    except Exception as e:
+        db.rollback()
+        return {"error": f"Processing failed: {e}", "status": "failed"}
+    finally:
+        db.close()
+
+
+@celery_app.task(name='render_pack_document')
+def render_pack_document(document: dict, output_path: str):
+    """Render one document of a term document pack; part of export_document_pack"""
+    from database import SessionLocal
+    from document_pack import render_pack_document as render_document
+
+    db = SessionLocal()
+    try:
+        render_document(db, document, output_path)
+        return {"status": "success", "file": output_path}
+    except Exception as e:
+        print(f"[ERROR] Document pack render failed for {document.get('kind')} {document.get('id')}: {e}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, name='export_document_pack')
+def export_document_pack(self, user_id: int, school_id: int, term: str, year: int, subjects: list = None):
+    """
+    Background task to build a school's term document pack (schemes, records of
+    work and lesson plans) as a ZIP with a manifest
+    Each document is rendered by its own render_pack_document task and a chord
+    callback (finish_document_pack) writes the ZIP once they are all done, so no
+    worker sits waiting on the renders. The pack's result is stored under this
+    task's id by the callback.
+    """
+    from celery import chord
+    from celery.exceptions import Ignore
+    from database import SessionLocal
+    from models import School
+    from document_pack import collect_pack_documents
+    from export_files import new_export_path, purge_expired_exports
+
+    db = SessionLocal()
+    try:
+        school = db.query(School).filter(School.id == school_id).first()
+        school_name = school.name if school else ""
+        documents = collect_pack_documents(db, school_id, term, year, subjects)
+    finally:
+        db.close()
+
+    if not documents:
+        return {"error": "No documents found for this term", "status": "failed", "user_id": user_id}
+
+    purge_expired_exports()
+    staging_dir = new_export_path("document_pack", "parts")
+    os.makedirs(staging_dir)
+    pack = {
+        "pack_id": self.request.id, "user_id": user_id, "school": school_name,
+        "term": term, "year": year, "subjects": subjects or [], "staging_dir": staging_dir,
+    }
+    header = [
+        render_pack_document.s(doc, os.path.join(staging_dir, f"{i}.pdf"))
+        for i, doc in enumerate(documents)
+    ]
+    callback = finish_document_pack.s(documents, pack).on_error(document_pack_failed.s(pack))
+    renders = chord(header)(callback).parent
+    # Saved so the status endpoint can count finished renders
+    renders.save()
+
+    self.update_state(state='PROGRESS', meta={
+        "status": "rendering", "user_id": user_id, "total_documents": len(documents),
+        "completed": 0, "group_id": renders.id,
+    })
+    # The callback settles this task's result and job record
+    raise Ignore()
+
+
+def _settle_document_pack(pack: dict, result: dict):
+    """Store the final result of a document pack under its export_document_pack task id."""
+    from background_jobs import mark_job_finished, outcome_status
+    from database import SessionLocal
+
+    celery_app.backend.store_result(pack["pack_id"], result, 'SUCCESS')
+    status, error = outcome_status(result)
+    db = SessionLocal()
+    try:
+        mark_job_finished(db, pack["pack_id"], status, result, error)
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Could not update job record: {e}")
+    finally:
+        db.close()
+
+
+@celery_app.task(name='finish_document_pack')
+def finish_document_pack(outcomes: list, documents: list, pack: dict):
+    """Chord callback of export_document_pack: write the ZIP from the rendered documents"""
+    import shutil
+    from document_pack import write_pack_zip
+    from export_files import new_export_path, remove_export
+
+    output_path = None
+    try:
+        for doc, outcome in zip(documents, outcomes):
+            outcome = outcome if isinstance(outcome, dict) else {"error": str(outcome)}
+            if outcome.get("status") == "success":
+                doc["file"] = outcome["file"]
+            else:
+                doc["error"] = outcome.get("error")
+
+        output_path = write_pack_zip(
+            documents,
+            new_export_path("document_pack", "zip"),
+            {"school": pack["school"], "term": pack["term"], "year": pack["year"], "subjects": pack["subjects"]},
+        )
+        filename = f"DocumentPack_{pack['school']}_{pack['term']}_{pack['year']}.zip".replace(" ", "_")
+        result = {
+            "status": "success",
+            "user_id": pack["user_id"],
+            "total_documents": len(documents),
+            "failed_documents": sum(1 for doc in documents if "file" not in doc),
+            "file": output_path,
+            "filename": filename,
+        }
+    except Exception as e:
+        if output_path:
+            remove_export(output_path)
+        result = {"error": str(e), "status": "failed", "user_id": pack["user_id"]}
+    finally:
+        shutil.rmtree(pack["staging_dir"], ignore_errors=True)
+
+    _settle_document_pack(pack, result)
+    return result
+
+
+@celery_app.task(name='document_pack_failed')
+def document_pack_failed(request, exc, traceback, pack: dict):
+    """Errback of the document pack chord (a render task crashed or timed out)"""
+    import shutil
+    shutil.rmtree(pack["staging_dir"], ignore_errors=True)
+    _settle_document_pack(pack, {"error": str(exc), "status": "failed", "user_id": pack["user_id"]})
+
+
+# Stop claiming new batches after this long, well inside the email queue's time limit;
+# the run re-queues itself when more mail is due
+EMAIL_RUN_SECONDS = 30
+
+
+@celery_app.task(name='deliver_email_outbox')
+def deliver_email_outbox():
+    """Deliver due outbox email in batches over one provider connection"""
+    from database import SessionLocal
+    from email_outbox import EmailSender, deliver_batch
+
+    totals = {"sent": 0, "retry": 0, "failed": 0, "skipped": 0}
+    deadline = time.monotonic() + EMAIL_RUN_SECONDS
+    more_due = False
+    db = SessionLocal()
+    try:
+        with EmailSender() as sender:
+            while True:
+                counts = deliver_batch(db, sender, settings.EMAIL_BATCH_SIZE)
+                if not counts:
+                    break
+                for key, value in counts.items():
+                    totals[key] += value
+                if time.monotonic() > deadline:
+                    more_due = True
+                    break
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Email outbox delivery failed: {e}")
+    finally:
+        db.close()
+
+    if more_due:
+        deliver_email_outbox.delay()
+    if any(totals.values()):
+        print(f"[INFO] Email outbox: {totals}")
+    return totals
+
+
+@celery_app.task(name='refresh_analytics_rollups')
+def refresh_analytics_rollups(full: bool = False):
+    """Bring the admin analytics rollup tables up to date"""
+    from database import SessionLocal
+    from analytics_rollups import refresh_rollups
+
+    db = SessionLocal()
+    try:
+        return refresh_rollups(db, full=full)
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Analytics rollup refresh failed: {e}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name='reconcile_live_counters')
+def reconcile_live_counters():
+    """Rebuild the live Redis counters from SQL"""
+    from database import SessionLocal
+    from live_counters import reconcile
+
+    db = SessionLocal()
+    try:
+        return reconcile(db)
+    except Exception as e:
+        print(f"[ERROR] Live counter reconciliation failed: {e}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name='reconcile_payment_totals')
+def reconcile_payment_totals():
+    """Rebuild payment_daily_totals from the payments table"""
+    from database import SessionLocal
+    from payment_totals import rebuild_totals
+
+    db = SessionLocal()
+    try:
+        return rebuild_totals(db)
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Payment totals reconciliation failed: {e}")
+        return {"status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name='maintain_activity_partitions')
+def maintain_activity_partitions():
+    """Add upcoming monthly partitions to activity_events and drop expired ones"""
+    from activity_log import maintain_partitions
+    try:
+        return maintain_partitions()
+    except Exception as e:
+        print(f"[ERROR] Activity partition maintenance failed: {e}")
+        return {"status": "failed", "error": str(e)}
+
+
+@celery_app.task(name='purge_expired_exports')
+def purge_expired_export_files():
+    """Delete downloadable exports older than EXPORT_TTL_HOURS"""
+    from export_files import purge_expired_exports
+    try:
+        return {"status": "success", "removed": purge_expired_exports()}
+    except Exception as e:
+        print(f"[ERROR] Export purge failed: {e}")
+        return {"status": "failed", "error": str(e)}
+
+
 # Health check task
 @celery_app.task(name='health_check')
 def health_check():
     """Simple task to verify Celery is working"""
     return {"status": "healthy", "message": "Celery worker is running"}
+
+
+# Job bookkeeping: mirror the lifecycle of /jobs submissions into background_jobs
+
+def _update_job(task_name: str, update, *args, **kwargs):
+    from background_jobs import TRACKED_TASKS
+    if task_name not in TRACKED_TASKS:
+        return
+
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        update(db, *args, **kwargs)
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Could not update job record: {e}")
+    finally:
+        db.close()
+
+
+@task_prerun.connect
+def record_job_started(sender=None, task_id=None, **kwargs):
+    from background_jobs import mark_job_started
+    _update_job(sender.name, mark_job_started, task_id)
+
+
+@task_postrun.connect
+def record_job_finished(sender=None, task_id=None, retval=None, state=None, **kwargs):
+    from background_jobs import mark_job_finished, outcome_status
+    if state == 'IGNORED':
+        # Handed off (e.g. to a chord callback), which settles the job itself
+        return
+    if state == 'SUCCESS':
+        status, error = outcome_status(retval)
+        _update_job(sender.name, mark_job_finished, task_id, status, retval, error)
+    else:
+        _update_job(sender.name, mark_job_finished, task_id, 'failed', None, str(retval))
+
+
+@task_revoked.connect
+def record_job_cancelled(sender=None, request=None, **kwargs):
+    from background_jobs import mark_job_finished
+    _update_job(sender.name, mark_job_finished, request.id, 'cancelled')
+
+
+@worker_process_shutdown.connect
+def flush_activity_events(**kwargs):
+    # Pool processes exit without running atexit handlers
+    from activity_log import activity_buffer
+    activity_buffer.flush()
+
+
+# Queue depth and latency, for dashboards and autoscaling
+
+@before_task_publish.connect
+def stamp_sent_at(headers=None, **kwargs):
+    # Lets queue_stats() tell how long the oldest waiting message has been queued
+    if headers is not None:
+        headers.setdefault('sent_at', time.time())
+
+
+def queue_stats() -> dict:
+    """
+    Per queue: waiting messages (all priority levels) and the age of the
+    oldest one, alongside the pool settings the queue is meant to run with.
+    """
+    now = time.time()
+    stats = {}
+    with celery_app.connection_for_read() as conn:
+        client = conn.default_channel.client
+        for name, pool in QUEUES.items():
+            depth = 0
+            oldest_sent = None
+            for priority in PRIORITY_STEPS:
+                key = f"{name}{PRIORITY_SEP}{priority}" if priority else name
+                waiting = client.llen(key)
+                if not waiting:
+                    continue
+                depth += waiting
+                # Messages are pushed on the left and consumed from the right
+                raw = client.lindex(key, -1)
+                try:
+                    sent_at = json.loads(raw).get('headers', {}).get('sent_at')
+                except (TypeError, ValueError):
+                    sent_at = None
+                if sent_at and (oldest_sent is None or sent_at < oldest_sent):
+                    oldest_sent = sent_at
+
+            stats[name] = {
+                'depth': depth,
+                'oldest_wait_seconds': round(now - oldest_sent, 1) if oldest_sent else 0.0,
+                **pool,
+            }
+    return stats
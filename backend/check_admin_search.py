@@ -0,0 +1,63 @@
+import os
+import sys
+from sqlalchemy import or_
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from models import User, School, Payment
+from admin_listing import search_clause
+
+# Terms containing InnoDB stopwords; these miss rows if an index was built with stopwords on
+STOPWORD_TERMS = ["in", "is", "to", "at", "an", "ian", "mary", "gmail", "admin"]
+
+SEARCHES = [
+    ("users", User, (User.email, User.full_name, User.phone)),
+    ("payments", Payment, (Payment.phone_number, Payment.transaction_code, Payment.checkout_request_id)),
+    ("schools", School, (School.name,)),
+]
+
+
+def sample_terms(db, limit=20):
+    """Name fragments taken from real users, so the check covers the data actually searched."""
+    terms = set()
+    for full_name, email in db.query(User.full_name, User.email).order_by(User.id.desc()).limit(limit):
+        for word in (full_name or "").split():
+            if len(word) >= 3:
+                terms.add(word[:4].lower())
+        local_part = (email or "").split("@")[0]
+        if len(local_part) >= 3:
+            terms.add(local_part[:3].lower())
+    return sorted(terms)
+
+
+def check_admin_search(terms=None):
+    """Compare the FULLTEXT admin search with the LIKE search it replaced."""
+    db = SessionLocal()
+    mismatches = 0
+    try:
+        terms = terms or STOPWORD_TERMS + sample_terms(db)
+        for term in terms:
+            for name, model, columns in SEARCHES:
+                like = {row[0] for row in db.query(model.id).filter(
+                    or_(*(column.ilike(f"%{term}%") for column in columns))
+                )}
+                fulltext = {row[0] for row in db.query(model.id).filter(search_clause(db, term, *columns))}
+                if like != fulltext:
+                    mismatches += 1
+                    print(f"[WARN] {name} '{term}': LIKE {len(like)} rows, FULLTEXT {len(fulltext)} rows "
+                          f"(missing {len(like - fulltext)}, extra {len(fulltext - like)})")
+        if mismatches:
+            print(f"{mismatches} mismatching searches; rebuild the indexes with migration 011")
+        else:
+            print(f"[OK] FULLTEXT matches LIKE for {len(terms)} terms")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        db.close()
+    return mismatches
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check_admin_search(sys.argv[1:]) else 0)
@@ -50,6 +50,18 @@ class Settings(BaseSettings):
     
     # Email Verification
     VERIFICATION_TOKEN_EXPIRE_HOURS: int = 24
+
+    # Email outbox delivery
+    EMAIL_BATCH_SIZE: int = 50  # Messages per Resend batch call / SMTP session round
+    EMAIL_MAX_ATTEMPTS: int = 6  # Then the message is marked failed
+    EMAIL_OUTBOX_INTERVAL_SECONDS: int = 60  # Periodic sweep for messages whose kick was lost
+
+    # Password hashing (bcrypt runs in a small thread pool, off the event loop)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_MAX: int = 500  # Hash/verify calls queued + running; beyond this sign-ins get 503
+    PASSWORD_HASH_SCHEMES: str = "bcrypt"  # The first hashes new passwords; hashes in the others are upgraded on login
+    PASSWORD_BCRYPT_ROUNDS: int = 10  # bcrypt hashes with any other cost are upgraded on login
+    BULK_INVITE_MAX_ROWS: int = 500  # Rows accepted per bulk teacher invite; at most PASSWORD_HASH_QUEUE_MAX
     
     # OpenRouter AI (for intelligent document parsing)
     OPENROUTER_API_KEY: str = ""  # Get free API key from https://openrouter.ai/keys
@@ -74,6 +86,43 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE_MB: int = 50
     ALLOWED_FILE_TYPES: str = "pdf,docx,doc,pptx,ppt,xlsx,xls,txt,jpg,jpeg,png,gif,bmp,svg,mp4,mov,avi,mkv,webm"
     
+    # PDF Rendering (process pool)
+    PDF_RENDER_WORKERS: int = 2
+    PDF_RENDER_QUEUE_SIZE: int = 20  # Queued + running renders across all users
+    PDF_RENDER_QUEUE_PER_USER: int = 3  # Queued + running renders per user
+    PDF_CACHE_DIR: str = "cache/pdf"  # Rendered PDFs; keep outside the public uploads mount
+    PDF_CACHE_MAX_MB: int = 500
+    BULK_PDF_SYNC_LIMIT: int = 20  # Larger bulk downloads run as a background job
+    EXPORT_DIR: str = "cache/exports"  # Files produced by background export jobs
+    EXPORT_TTL_HOURS: int = 24
+    
+    # Analytics rollups (analytics_rollups.py)
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: int = 300
+    
+    # Teacher dashboard (dashboard_snapshot.py); also dropped on the teacher's own writes
+    DASHBOARD_SNAPSHOT_TTL_SECONDS: int = 900
+    
+    # Admin listings (admin_listing.py)
+    ADMIN_LIST_COUNT_TTL_SECONDS: int = 60  # Listing totals are cached per filter combination
+    ADMIN_EXPORT_BATCH_SIZE: int = 1000  # Rows fetched and written per chunk of a streamed export
+    
+    # Live Redis counters (live_counters.py)
+    LIVE_COUNTERS_RECONCILE_SECONDS: int = 900  # Rebuilt from SQL this often
+    LIVE_TOP_CURRICULA: int = 10
+    
+    # Rate limits (rate_limiter.py): "class=requests/seconds", shared by all workers through Redis
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: str = "auth=10/60,pdf=5/60"
+    RATE_LIMIT_TRUSTED_PROXIES: str = "127.0.0.1/32,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16"  # Peers whose X-Real-IP / X-Forwarded-For are believed
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 10000  # Per-worker buckets kept while Redis is unavailable
+    
+    # Activity event log (activity_log.py)
+    ACTIVITY_FLUSH_SIZE: int = 200  # Events per multi-row insert; a full batch flushes immediately
+    ACTIVITY_FLUSH_INTERVAL_MS: int = 1000
+    ACTIVITY_BUFFER_MAX: int = 20000  # Oldest events are dropped beyond this while the DB is unreachable
+    ACTIVITY_RETENTION_MONTHS: int = 24  # Older monthly partitions are dropped
+    LOCAL_TIMEZONE: str = "Africa/Nairobi"  # For hour-of-day reporting; events are stored in UTC
+    
     @property
     def MAX_FILE_SIZE_BYTES(self) -> int:
         return self.MAX_FILE_SIZE_MB * 1024 * 1024
@@ -90,6 +139,11 @@ class Settings(BaseSettings):
                 f"mysql+pymysql://{self.DB_USER}:{encoded_password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
             )
 
+        # A bulk invite hashes one password per row and must fit the hashing queue
+        if self.BULK_INVITE_MAX_ROWS > self.PASSWORD_HASH_QUEUE_MAX:
+            print(f"[WARN] BULK_INVITE_MAX_ROWS lowered to PASSWORD_HASH_QUEUE_MAX ({self.PASSWORD_HASH_QUEUE_MAX})")
+            self.BULK_INVITE_MAX_ROWS = self.PASSWORD_HASH_QUEUE_MAX
+
         # Normalize common env vars that are frequently pasted with trailing newlines/spaces.
         if isinstance(self.GOOGLE_CLIENT_ID, str):
             self.GOOGLE_CLIENT_ID = self.GOOGLE_CLIENT_ID.strip()
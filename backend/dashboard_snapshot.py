@@ -0,0 +1,313 @@
+"""
+Dashboard Snapshot
+Every teacher dashboard widget (stats, insights, deadlines, resources and
+curriculum progress) computed together with shared queries and cached as a
+single entry per user. The per-widget endpoints are views of the same entry.
+
+The entry is dropped when the teacher's own data changes: a session hook
+collects the owners of new, changed or deleted subjects, progress logs,
+notes and terms, and deletes their snapshots once the transaction commits.
+Changes the hook cannot see (bulk query deletes, lesson rows, which carry no
+owner) call `mark_dashboard_stale` before committing.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case, desc, event, func
+from sqlalchemy.orm import Session, joinedload
+
+from activity_log import LESSON_COMPLETED
+from cache_manager import cache
+from config import settings
+from models import User, Subject, Strand, SubStrand, Lesson, ProgressLog, Note, Term, ActivityEvent
+
+TRACKED_MODELS = (Subject, ProgressLog, Note, Term)
+_STALE_USERS = "dashboard_stale_users"
+
+
+def snapshot_key(user_id: int) -> str:
+    return f"dashboard_snapshot:user:{user_id}"
+
+
+def mark_dashboard_stale(db: Session, user_id: int):
+    """Drop `user_id`'s snapshot when `db` next commits."""
+    db.info.setdefault(_STALE_USERS, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_stale_users(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, TRACKED_MODELS) and obj.user_id:
+            mark_dashboard_stale(session, obj.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_snapshots(session):
+    for user_id in session.info.pop(_STALE_USERS, ()):
+        cache.delete(snapshot_key(user_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_users(session):
+    session.info.pop(_STALE_USERS, None)
+
+
+def _curriculum_progress(db: Session, user: User, subjects: List[Subject]) -> Dict:
+    # Lesson totals for every substrand in one grouped query
+    lesson_counts = {}
+    if subjects:
+        lesson_counts = {
+            row.substrand_id: (row.total, int(row.completed or 0))
+            for row in db.query(
+                Lesson.substrand_id,
+                func.count(Lesson.id).label("total"),
+                func.sum(case((Lesson.is_completed == True, 1), else_=0)).label("completed"),
+            ).join(SubStrand, Lesson.substrand_id == SubStrand.id)
+            .join(Strand, SubStrand.strand_id == Strand.id)
+            .filter(Strand.subject_id.in_([s.id for s in subjects]))
+            .group_by(Lesson.substrand_id)
+            .all()
+        }
+
+    def percent(done, total):
+        return round(done / total * 100, 1) if total > 0 else 0
+
+    total_lessons_all = 0
+    completed_lessons_all = 0
+    subjects_data = []
+    for subject in subjects:
+        subject_total = 0
+        subject_completed = 0
+        strands_data = []
+        for strand in sorted(subject.strands, key=lambda s: s.sequence_order):
+            strand_total = 0
+            strand_completed = 0
+            substrands_data = []
+            for substrand in sorted(strand.sub_strands, key=lambda s: s.sequence_order):
+                total, completed = lesson_counts.get(substrand.id, (0, 0))
+                strand_total += total
+                strand_completed += completed
+                substrands_data.append({
+                    "substrand_code": substrand.substrand_code,
+                    "substrand_name": substrand.substrand_name,
+                    "total_lessons": total,
+                    "completed_lessons": completed,
+                    "progress": percent(completed, total)
+                })
+            subject_total += strand_total
+            subject_completed += strand_completed
+            strands_data.append({
+                "strand_code": strand.strand_code,
+                "strand_name": strand.strand_name,
+                "total_lessons": strand_total,
+                "completed_lessons": strand_completed,
+                "progress": percent(strand_completed, strand_total),
+                "substrands": substrands_data
+            })
+        total_lessons_all += subject_total
+        completed_lessons_all += subject_completed
+        subjects_data.append({
+            "id": subject.id,
+            "subject_name": subject.subject_name,
+            "grade": subject.grade,
+            "total_lessons": subject_total,
+            "completed_lessons": subject_completed,
+            "progress_percentage": percent(subject_completed, subject_total),
+            "strands": strands_data
+        })
+
+    # Recent completions with their lesson and subject in one join
+    recent = db.query(
+        ProgressLog.lesson_id, ProgressLog.created_at, Lesson.lesson_title, Lesson.lesson_number,
+        Subject.subject_name, Subject.grade
+    ).join(Lesson, Lesson.id == ProgressLog.lesson_id)\
+     .outerjoin(Subject, Subject.id == ProgressLog.subject_id)\
+     .filter(ProgressLog.user_id == user.id, ProgressLog.action == "completed")\
+     .order_by(ProgressLog.created_at.desc())\
+     .limit(10)\
+     .all()
+
+    return {
+        "overview": {
+            "total_subjects": len(subjects),
+            "total_lessons": total_lessons_all,
+            "completed_lessons": completed_lessons_all,
+            "average_progress": percent(completed_lessons_all, total_lessons_all)
+        },
+        "subjects": subjects_data,
+        "recent_completions": [
+            {
+                "lesson_id": r.lesson_id,
+                "lesson_title": r.lesson_title or f"Lesson {r.lesson_number}",
+                "completed_at": r.created_at.isoformat() if r.created_at else None,
+                "subject_name": r.subject_name or "Unknown",
+                "grade": r.grade or "Unknown"
+            }
+            for r in recent
+        ]
+    }
+
+
+def _completion_windows(db: Session, user: User, today: datetime):
+    """All-time completed lessons and the last four 7-day windows, in one scan."""
+    windows = [
+        (today - timedelta(days=(i + 1) * 7), today - timedelta(days=i * 7))
+        for i in range(3, -1, -1)
+    ]
+    row = db.query(
+        func.count(ProgressLog.id),
+        *(
+            func.sum(case(((ProgressLog.created_at >= start) & (ProgressLog.created_at < end), 1), else_=0))
+            for start, end in windows
+        )
+    ).filter(
+        ProgressLog.user_id == user.id,
+        ProgressLog.action == "COMPLETED"
+    ).one()
+    return row[0], [int(count or 0) for count in row[1:]]
+
+
+def _insights(db: Session, user: User, weekly_completed: List[int]) -> Dict:
+    subject_counts = db.query(
+        Subject.subject_name,
+        func.count(ProgressLog.id).label('count')
+    ).join(ProgressLog, Subject.id == ProgressLog.subject_id)\
+     .filter(ProgressLog.user_id == user.id)\
+     .group_by(Subject.subject_name)\
+     .order_by(desc('count'))\
+     .limit(5)\
+     .all()
+
+    avg_duration = db.query(func.avg(Lesson.duration_minutes)).join(ProgressLog, Lesson.id == ProgressLog.lesson_id)\
+        .filter(ProgressLog.user_id == user.id).scalar() or 40
+
+    # Peak teaching hours: the 5 hours of day with the most lessons completed (last 90 days)
+    event_hour = func.hour(ActivityEvent.created_at)
+    hour_counts = db.query(event_hour.label("hour"), func.count(ActivityEvent.id).label("count"))\
+        .filter(
+            ActivityEvent.user_id == user.id,
+            ActivityEvent.created_at >= datetime.utcnow() - timedelta(days=90),
+            ActivityEvent.event_type == LESSON_COMPLETED
+        )\
+        .group_by(event_hour)\
+        .all()
+
+    # Events are stored in UTC; report hours in the school's local time
+    utc_offset = int(datetime.now(ZoneInfo(settings.LOCAL_TIMEZONE)).utcoffset().total_seconds() // 3600)
+    busiest = sorted(hour_counts, key=lambda r: r.count, reverse=True)[:5]
+    peak_hours = sorted(
+        ({"hour": f"{(r.hour + utc_offset) % 24:02d}:00", "count": r.count} for r in busiest),
+        key=lambda h: h["hour"]
+    )
+
+    weekly_comparison = []
+    for index, completed_count in enumerate(weekly_completed):
+        # Planned lessons are mocked as completed plus a buffer until timetable dates are linked
+        weekly_comparison.append({
+            "week": "This Week" if index == 3 else f"Week {index + 1}",
+            "lessons": completed_count + random.randint(0, 5),
+            "completed": completed_count
+        })
+
+    return {
+        "mostTaughtSubjects": [
+            {"subject": name, "count": count, "color": f"#{random.randint(0, 0xFFFFFF):06x}"}
+            for name, count in subject_counts
+        ],
+        "averageLessonDuration": round(avg_duration),
+        "peakTeachingHours": peak_hours,
+        "weeklyComparison": weekly_comparison
+    }
+
+
+def _deadlines(db: Session, user: User, today: datetime) -> List[Dict]:
+    terms = db.query(Term).filter(
+        Term.user_id == user.id,
+        Term.end_date >= today
+    ).order_by(Term.end_date).limit(2).all()
+
+    deadlines = [
+        {
+            "id": f"term-{term.id}",
+            "title": f"End of {term.term_name}",
+            "date": term.end_date.isoformat(),
+            "type": "exam",
+            "daysUntil": (term.end_date - today).days
+        }
+        for term in terms
+    ]
+
+    # Helpful placeholders for new users
+    if not deadlines:
+        deadlines = [
+            {
+                "id": "setup-1",
+                "title": "Complete Profile Setup",
+                "date": (today + timedelta(days=2)).isoformat(),
+                "type": "task",
+                "daysUntil": 2
+            },
+            {
+                "id": "setup-2",
+                "title": "Create First Lesson Plan",
+                "date": (today + timedelta(days=5)).isoformat(),
+                "type": "lesson-plan",
+                "daysUntil": 5
+            },
+        ]
+    return deadlines
+
+
+def _resources(db: Session, user: User) -> List[Dict]:
+    notes = db.query(Note).filter(
+        Note.user_id == user.id
+    ).order_by(Note.updated_at.desc()).limit(6).all()
+
+    return [
+        {
+            "id": note.id,
+            "title": note.title,
+            "type": "material",
+            "lastAccessed": note.updated_at.isoformat(),
+            "icon": "📄"
+        }
+        for note in notes
+    ]
+
+
+def build_snapshot(db: Session, user: User) -> Dict:
+    today = datetime.now()
+    subjects = db.query(Subject).filter(
+        Subject.user_id == user.id
+    ).options(
+        joinedload(Subject.strands).joinedload(Strand.sub_strands)
+    ).all()
+    lessons_completed, weekly_completed = _completion_windows(db, user, today)
+
+    return {
+        "stats": {
+            "lessonsCompleted": lessons_completed,
+            "totalLessons": sum(s.total_lessons or 0 for s in subjects),
+            # Attendance and assessments are not tracked yet
+            "attendanceAverage": 0,
+            "assessmentsCreated": 0
+        },
+        "insights": _insights(db, user, weekly_completed),
+        "deadlines": _deadlines(db, user, today),
+        "resources": _resources(db, user),
+        "curriculumProgress": _curriculum_progress(db, user, subjects),
+        "generatedAt": datetime.utcnow().isoformat()
+    }
+
+
+def get_snapshot(db: Session, user: User) -> Dict:
+    """The cached snapshot for `user`, computed on a miss."""
+    key = snapshot_key(user.id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(db, user)
+        cache.set(key, snapshot, settings.DASHBOARD_SNAPSHOT_TTL_SECONDS)
+    return snapshot
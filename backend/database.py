@@ -17,7 +17,11 @@ engine = create_engine(
     connect_args={
         "connect_timeout": 15,  # MySQL connection timeout
         "read_timeout": 30,     # Read timeout for long queries
-        "write_timeout": 30     # Write timeout for large inserts
+        "write_timeout": 30,    # Write timeout for large inserts
+        # FULLTEXT indexes keep the stopword setting of the session that builds
+        # them; with stopwords on, the ngram parser drops every token containing
+        # "a", "i", "in", "is", ... and admin search misses ordinary names
+        "init_command": "SET SESSION innodb_ft_enable_stopword = OFF"
     },
     echo=False  # Set to True only when debugging SQL queries
 )
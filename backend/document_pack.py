@@ -0,0 +1,202 @@
+"""
+Term Document Packs
+Every scheme of work, record of work and set of lesson plans a school's
+teachers produced for a term, rendered to PDF and packaged into one ZIP with a
+manifest for inspection. The `export_document_pack` Celery job collects the
+document list here and fans the renders out to `render_pack_document` tasks,
+so a pack is spread across the worker pool.
+"""
+
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from models import User, Department, SchemeOfWork, SchemeWeek, SchemeLesson, LessonPlan, RecordOfWork
+from lesson_plan_generation import load_scheme_tree, resolve_term_start_date
+from pdf_render_service import snapshot_row
+from pdf import render_scheme_pdf, render_lesson_plans_bulk, render_record_of_work_pdf
+
+KIND_LABELS = {
+    "scheme": "Scheme_of_Work",
+    "record_of_work": "Record_of_Work",
+    "lesson_plans": "Lesson_Plans",
+}
+
+
+def _safe_name(value) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(value or "")).strip("_") or "Untitled"
+
+
+def _document(kind: str, doc_id: int, teacher: User, subject: str, grade: str, **extra) -> Dict:
+    teacher_name = teacher.full_name or teacher.email
+    return {
+        "kind": kind,
+        "id": doc_id,
+        "user_id": teacher.id,
+        "teacher": teacher_name,
+        "subject": subject,
+        "grade": grade,
+        "filename": f"{_safe_name(teacher_name)}/{KIND_LABELS[kind]}_{_safe_name(subject)}_{_safe_name(grade)}_{doc_id}.pdf",
+        **extra,
+    }
+
+
+def hod_learning_areas(db: Session, user: User) -> List[str]:
+    """
+    The learning areas an HOD may export: those of the departments they head
+    at their school. A department covers the learning area it is named after
+    and any listed, comma-separated, in its description.
+    """
+    departments = db.query(Department).filter(
+        Department.hod_id == user.id,
+        Department.school_id == user.school_id,
+    ).all()
+    areas = {}
+    for department in departments:
+        for name in [department.name, *re.split(r"[,\n]", department.description or "")]:
+            name = name.strip()
+            if name:
+                areas.setdefault(name.lower(), name)
+    return list(areas.values())
+
+
+def collect_pack_documents(
+    db: Session,
+    school_id: int,
+    term: str,
+    year: int,
+    subjects: Optional[List[str]] = None,
+) -> List[Dict]:
+    """
+    The documents that make up a school's pack for a term, one dict each.
+
+    `subjects` limits the pack to those learning areas (a department's share).
+    Lesson plans are grouped into one PDF per scheme; plans not created from a
+    scheme carry no term and are left out.
+    """
+    teachers = {t.id: t for t in db.query(User).filter(User.school_id == school_id).all()}
+    if not teachers:
+        return []
+    subject_filter = [s.strip().lower() for s in subjects or [] if s and s.strip()]
+
+    scheme_query = db.query(SchemeOfWork).filter(
+        SchemeOfWork.user_id.in_(teachers.keys()),
+        SchemeOfWork.term == term,
+        SchemeOfWork.year == year,
+    )
+    record_query = db.query(RecordOfWork).filter(
+        RecordOfWork.user_id.in_(teachers.keys()),
+        RecordOfWork.term == term,
+        RecordOfWork.year == year,
+    )
+    if subject_filter:
+        scheme_query = scheme_query.filter(func.lower(SchemeOfWork.subject).in_(subject_filter))
+        record_query = record_query.filter(func.lower(RecordOfWork.learning_area).in_(subject_filter))
+
+    schemes = scheme_query.order_by(SchemeOfWork.user_id, SchemeOfWork.subject, SchemeOfWork.grade).all()
+    records = record_query.order_by(RecordOfWork.user_id, RecordOfWork.learning_area, RecordOfWork.grade).all()
+
+    plan_counts = {}
+    if schemes:
+        plan_counts = dict(
+            db.query(SchemeWeek.scheme_id, func.count(LessonPlan.id))
+            .join(SchemeLesson, SchemeLesson.week_id == SchemeWeek.id)
+            .join(LessonPlan, LessonPlan.scheme_lesson_id == SchemeLesson.id)
+            .filter(SchemeWeek.scheme_id.in_([s.id for s in schemes]))
+            .group_by(SchemeWeek.scheme_id)
+            .all()
+        )
+
+    documents = []
+    for scheme in schemes:
+        teacher = teachers[scheme.user_id]
+        documents.append(_document("scheme", scheme.id, teacher, scheme.subject, scheme.grade))
+        if plan_counts.get(scheme.id):
+            documents.append(_document(
+                "lesson_plans", scheme.id, teacher, scheme.subject, scheme.grade,
+                plan_count=plan_counts[scheme.id]
+            ))
+    for record in records:
+        documents.append(_document(
+            "record_of_work", record.id, teachers[record.user_id], record.learning_area, record.grade
+        ))
+    return documents
+
+
+def render_pack_document(db: Session, document: Dict, output_path: str) -> str:
+    """Render one document from `collect_pack_documents` to `output_path`."""
+    kind, doc_id, user_id = document["kind"], document["id"], document["user_id"]
+
+    if kind == "scheme":
+        scheme = load_scheme_tree(db, doc_id, user_id)
+        if not scheme:
+            raise ValueError("Scheme no longer exists")
+        user = db.query(User).filter(User.id == user_id).first()
+        snapshot = snapshot_row(scheme, weeks=[
+            snapshot_row(week, lessons=[snapshot_row(lesson) for lesson in week.lessons])
+            for week in scheme.weeks
+        ])
+        pdf_bytes = render_scheme_pdf(snapshot, resolve_term_start_date(db, scheme, user))
+
+    elif kind == "record_of_work":
+        record = db.query(RecordOfWork).options(joinedload(RecordOfWork.entries)).filter(
+            RecordOfWork.id == doc_id, RecordOfWork.user_id == user_id
+        ).first()
+        if not record:
+            raise ValueError("Record of work no longer exists")
+        pdf_bytes = render_record_of_work_pdf(
+            snapshot_row(record, entries=[snapshot_row(entry) for entry in record.entries])
+        )
+
+    elif kind == "lesson_plans":
+        plans = db.query(LessonPlan)\
+            .join(SchemeLesson, LessonPlan.scheme_lesson_id == SchemeLesson.id)\
+            .join(SchemeWeek, SchemeLesson.week_id == SchemeWeek.id)\
+            .filter(SchemeWeek.scheme_id == doc_id, LessonPlan.user_id == user_id)\
+            .order_by(SchemeWeek.week_number, SchemeLesson.lesson_number, LessonPlan.id)\
+            .all()
+        if not plans:
+            raise ValueError("Lesson plans no longer exist")
+        return render_lesson_plans_bulk([snapshot_row(plan) for plan in plans], document["teacher"], output_path)
+
+    else:
+        raise ValueError(f"Unknown document kind: {kind}")
+
+    with open(output_path, "wb") as f:
+        f.write(pdf_bytes)
+    return output_path
+
+
+def write_pack_zip(documents: List[Dict], output_path: str, header: Dict) -> str:
+    """
+    Package rendered documents and a manifest into a ZIP at `output_path`.
+
+    Each document dict carries `file` (the rendered PDF) or `error`. Files are
+    copied into the archive in chunks, so the pack is never held in memory.
+    """
+    manifest = {
+        **header,
+        "generated_at": datetime.utcnow().isoformat(),
+        "documents": [],
+    }
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for doc in documents:
+            entry = {k: v for k, v in doc.items() if k not in ("file", "user_id")}
+            if doc.get("file") and os.path.exists(doc["file"]):
+                zf.write(doc["file"], doc["filename"])
+                entry["status"] = "included"
+            else:
+                entry["status"] = "failed"
+                entry.pop("filename", None)
+            manifest["documents"].append(entry)
+
+        manifest["total_documents"] = len(manifest["documents"])
+        manifest["failed_documents"] = sum(1 for d in manifest["documents"] if d["status"] == "failed")
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2, default=str))
+    return output_path
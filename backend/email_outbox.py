@@ -0,0 +1,253 @@
+"""
+Email Outbox
+Transactional email is not sent from request handlers. `queue_email` adds a
+row to `email_outbox` in the caller's session, so it commits (or rolls back)
+with the change that triggered it, and `notify_outbox` asks the email worker to
+deliver. The worker claims batches of due messages, sends them with one Resend
+batch call or over a single SMTP connection, and retries failures with
+exponential backoff. Messages sharing a `dedupe_key` are delivered once.
+
+Bodies carry temporary passwords and one-time links, so they are cleared as
+soon as a message is sent, skipped or given up on; only the envelope (recipient,
+subject, status) is kept.
+"""
+
+import smtplib
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import EmailOutbox
+
+# A message left in "sending" this long belongs to a worker that died
+STALE_SENDING = timedelta(minutes=10)
+MAX_BACKOFF = timedelta(hours=1)
+RESEND_BATCH_LIMIT = 100
+
+
+def queue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None,
+    dedupe_key: Optional[str] = None,
+) -> Optional[EmailOutbox]:
+    """
+    Add a message to the outbox in the caller's transaction; the caller commits
+    and then calls `notify_outbox`. Returns None when a message with the same
+    dedupe key is already queued or sent.
+    """
+    if dedupe_key:
+        existing = db.query(EmailOutbox.id).filter(
+            EmailOutbox.dedupe_key == dedupe_key,
+            EmailOutbox.status.in_(("pending", "sending", "sent")),
+        ).first()
+        if existing:
+            return None
+
+    message = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        text_content=text_content,
+        dedupe_key=dedupe_key,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(message)
+    return message
+
+
+def notify_outbox():
+    """Ask the email worker to deliver now. The periodic sweep covers a failed kick."""
+    try:
+        from celery_app import deliver_email_outbox
+        deliver_email_outbox.delay()
+    except Exception as e:
+        print(f"[WARN] Could not notify email worker, delivery waits for the next sweep: {e}")
+
+
+def claim_batch(db: Session, batch_size: int) -> List[EmailOutbox]:
+    """Mark up to `batch_size` due messages as sending; concurrent workers skip each other's rows."""
+    now = datetime.utcnow()
+    messages = db.query(EmailOutbox).filter(or_(
+        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == "sending", EmailOutbox.updated_at < now - STALE_SENDING),
+    )).order_by(EmailOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    for message in messages:
+        message.status = "sending"
+        message.attempts = (message.attempts or 0) + 1
+    db.commit()
+    return messages
+
+
+REDACTED_BODY = ""
+
+
+def _finish(message: EmailOutbox, status: str):
+    message.status = status
+    message.html_content = REDACTED_BODY
+    message.text_content = None
+
+
+def _skip_duplicates(db: Session, messages: List[EmailOutbox]) -> List[EmailOutbox]:
+    """Drop messages whose dedupe key was already delivered (or appears earlier in the batch)."""
+    keys = {m.dedupe_key for m in messages if m.dedupe_key}
+    delivered = set()
+    if keys:
+        delivered = {
+            row[0] for row in db.query(EmailOutbox.dedupe_key).filter(
+                EmailOutbox.dedupe_key.in_(keys), EmailOutbox.status == "sent"
+            ).all()
+        }
+
+    to_send = []
+    for message in messages:
+        if message.dedupe_key and message.dedupe_key in delivered:
+            _finish(message, "skipped")
+            continue
+        if message.dedupe_key:
+            delivered.add(message.dedupe_key)
+        to_send.append(message)
+    return to_send
+
+
+def _from_address() -> str:
+    return f"{settings.FROM_NAME} <{settings.FROM_EMAIL}>"
+
+
+def _mime_message(message: EmailOutbox) -> MIMEMultipart:
+    mime = MIMEMultipart("alternative")
+    mime["From"] = _from_address()
+    mime["To"] = message.to_email
+    mime["Subject"] = message.subject
+    if message.text_content:
+        mime.attach(MIMEText(message.text_content, "plain"))
+    mime.attach(MIMEText(message.html_content, "html"))
+    return mime
+
+
+class EmailSender:
+    """
+    Delivers batches through Resend (batch API) with SMTP as the fallback. The
+    SMTP connection is opened on first use and kept for the sender's lifetime.
+    """
+
+    def __init__(self):
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+            smtp.starttls()
+            if settings.SMTP_USER:
+                smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+            self._smtp = smtp
+        return self._smtp
+
+    def _send_resend(self, messages: List[EmailOutbox]):
+        import resend
+        resend.api_key = settings.RESEND_API_KEY
+
+        response = resend.Batch.send([
+            {
+                "from": _from_address(),
+                "to": [m.to_email],
+                "subject": m.subject,
+                "html": m.html_content,
+                "text": m.text_content or "Please view this email in an HTML-compatible client.",
+            }
+            for m in messages
+        ])
+        data = response.get("data", []) if isinstance(response, dict) else []
+        for message, item in zip(messages, data):
+            message.provider_message_id = item.get("id")
+
+    def _send_smtp(self, message: EmailOutbox):
+        mime = _mime_message(message).as_string()
+        try:
+            self._connection().sendmail(settings.FROM_EMAIL, [message.to_email], mime)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError):
+            # Connection dropped between batches; reconnect once
+            self.close()
+            self._connection().sendmail(settings.FROM_EMAIL, [message.to_email], mime)
+
+    def send(self, messages: List[EmailOutbox]) -> Dict[int, Optional[str]]:
+        """
+        Deliver messages. Returns {message_id: error or None}; a message missing
+        from the result was not attempted.
+        """
+        results = {}
+        if settings.RESEND_API_KEY and messages:
+            try:
+                self._send_resend(messages)
+                return {m.id: None for m in messages}
+            except Exception as e:
+                print(f"[WARN] Resend batch failed ({e}), falling back to SMTP")
+
+        for message in messages:
+            try:
+                self._send_smtp(message)
+                results[message.id] = None
+            except Exception as e:
+                results[message.id] = str(e)
+        return results
+
+
+def _backoff(attempts: int) -> timedelta:
+    return min(timedelta(seconds=30 * 2 ** max(attempts - 1, 0)), MAX_BACKOFF)
+
+
+def deliver_batch(db: Session, sender: EmailSender, batch_size: int) -> Dict[str, int]:
+    """Claim and deliver one batch. Returns counts by outcome; empty when nothing was due."""
+    # One Resend batch call per claim
+    messages = claim_batch(db, min(batch_size, RESEND_BATCH_LIMIT))
+    if not messages:
+        return {}
+
+    to_send = _skip_duplicates(db, messages)
+    results = sender.send(to_send)
+
+    counts = {"sent": 0, "retry": 0, "failed": 0, "skipped": len(messages) - len(to_send)}
+    now = datetime.utcnow()
+    for message in to_send:
+        error = results.get(message.id, "Not attempted")
+        if error is None:
+            _finish(message, "sent")
+            message.sent_at = now
+            message.last_error = None
+            counts["sent"] += 1
+        elif message.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            _finish(message, "failed")
+            message.last_error = error
+            counts["failed"] += 1
+            print(f"[ERROR] Giving up on email {message.id} to {message.to_email}: {error}")
+        else:
+            message.status = "pending"
+            message.last_error = error
+            message.next_attempt_at = now + _backoff(message.attempts)
+            counts["retry"] += 1
+    db.commit()
+    return counts
@@ -1,85 +1,17 @@
 """
 Email utilities for TeachTrack
-Handles sending verification emails, password reset emails, etc.
+Builds verification, welcome, invitation and password reset emails and queues
+them in the email outbox (see email_outbox.py). Callers commit the session and
+then call `notify_outbox()`.
 """
 
-import aiosmtplib
-import resend
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from fastapi.concurrency import run_in_threadpool
-from config import settings
-import logging
-
-logger = logging.getLogger(__name__)
+from typing import Optional
 
+from sqlalchemy.orm import Session
 
-async def send_email(
-    to_email: str,
-    subject: str,
-    html_content: str,
-    text_content: str = None
-) -> bool:
-    """
-    Send an email using Resend (preferred) or Gmail SMTP (fallback)
-    """
-    # 1. Try Resend API first (Reliable)
-    if settings.RESEND_API_KEY:
-        try:
-            resend.api_key = settings.RESEND_API_KEY
-            
-            def _send_resend():
-                return resend.Emails.send({
-                    "from": f"{settings.FROM_NAME} <{settings.FROM_EMAIL}>",
-                    "to": to_email,
-                    "subject": subject,
-                    "html": html_content,
-                    "text": text_content or "Please view this email in an HTML-compatible client."
-                })
-            
-            # Run blocking call in threadpool
-            await run_in_threadpool(_send_resend)
-            
-            logger.info(f"Email sent via Resend to {to_email}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Resend API failed: {str(e)}. Attempting SMTP fallback...")
-            # Fall through to SMTP
-
-    # 2. Fallback to SMTP
-    try:
-        # Create message
-        message = MIMEMultipart("alternative")
-        message["From"] = f"{settings.FROM_NAME} <{settings.FROM_EMAIL}>"
-        message["To"] = to_email
-        message["Subject"] = subject
-        
-        # Add text version
-        if text_content:
-            text_part = MIMEText(text_content, "plain")
-            message.attach(text_part)
-        
-        # Add HTML version
-        html_part = MIMEText(html_content, "html")
-        message.attach(html_part)
-        
-        # Send email
-        await aiosmtplib.send(
-            message,
-            hostname=settings.SMTP_HOST,
-            port=settings.SMTP_PORT,
-            start_tls=True,
-            username=settings.SMTP_USER,
-            password=settings.SMTP_PASSWORD,
-        )
-        
-        logger.info(f"Email sent via SMTP to {to_email}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"All email methods failed for {to_email}: {str(e)}")
-        return False
+from config import settings
+from email_outbox import queue_email
+from models import EmailOutbox
 
 
 def get_verification_email_html(username: str, verification_url: str) -> str:
@@ -185,37 +117,41 @@ The TeachTrack Team
     """
 
 
-async def send_verification_email(
+def queue_verification_email(
+    db: Session,
     to_email: str,
     username: str,
     verification_token: str
-) -> bool:
+) -> Optional[EmailOutbox]:
     """
-    Send email verification email
+    Queue the email verification email
     
     Args:
+        db: Session of the change that issued the token
         to_email: User's email address
         username: User's full name
         verification_token: Verification token
     
     Returns:
-        bool: True if email sent successfully
+        The outbox message, or None if it was already queued
     """
     verification_url = f"{settings.FRONTEND_URL}/verify-email?token={verification_token}"
     
     html_content = get_verification_email_html(username, verification_url)
     text_content = get_verification_email_text(username, verification_url)
     
-    return await send_email(
+    return queue_email(
+        db,
         to_email=to_email,
         subject="Verify Your Email - TeachTrack",
         html_content=html_content,
-        text_content=text_content
+        text_content=text_content,
+        dedupe_key=f"verify:{verification_token}"
     )
 
 
-async def send_welcome_email(to_email: str, username: str) -> bool:
-    """Send welcome email after successful verification"""
+def queue_welcome_email(db: Session, to_email: str, username: str) -> Optional[EmailOutbox]:
+    """Queue the welcome email sent after successful verification (once per address)"""
     html_content = f"""
     <!DOCTYPE html>
     <html>
@@ -268,25 +204,28 @@ Happy teaching!
 The TeachTrack Team
     """
     
-    return await send_email(
+    return queue_email(
+        db,
         to_email=to_email,
         subject="Welcome to TeachTrack!",
         html_content=html_content,
-        text_content=text_content
+        text_content=text_content,
+        dedupe_key=f"welcome:{to_email.lower()}"
     )
 
 
-async def send_invitation_email(email: str, school_name: str, password: str):
+def queue_invitation_email(db: Session, email: str, school_name: str, password: str) -> Optional[EmailOutbox]:
     """
-    Send an invitation email to a new user
+    Queue an invitation email to a new user
     
     Args:
+        db: Session the invited user is created in
         email: Recipient email address
         school_name: Name of the school
         password: Temporary password for the user
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        The outbox message
     """
     subject = f"Invitation to join {school_name} on TeachTrack"
     html_content = f"""
@@ -297,7 +236,7 @@ async def send_invitation_email(email: str, school_name: str, password: str):
     """
     text_content = f"You have been invited to join {school_name} on TeachTrack. Your temporary password is: {password}"
     
-    return await send_email(email, subject, html_content, text_content)
+    return queue_email(db, email, subject, html_content, text_content)
 
 
 def get_password_reset_email_html(username: str, reset_url: str) -> str:
@@ -405,30 +344,34 @@ The TeachTrack Team
     """
 
 
-async def send_password_reset_email(
+def queue_password_reset_email(
+    db: Session,
     to_email: str,
     username: str,
     reset_token: str
-) -> bool:
+) -> Optional[EmailOutbox]:
     """
-    Send password reset email
+    Queue the password reset email
     
     Args:
+        db: Session of the change that issued the token
         to_email: User's email address
         username: User's full name
         reset_token: Password reset token
     
     Returns:
-        bool: True if email sent successfully
+        The outbox message, or None if it was already queued
     """
     reset_url = f"{settings.FRONTEND_URL}/reset-password?token={reset_token}"
     
     html_content = get_password_reset_email_html(username, reset_url)
     text_content = get_password_reset_email_text(username, reset_url)
     
-    return await send_email(
+    return queue_email(
+        db,
         to_email=to_email,
         subject="Reset Your Password - TeachTrack",
         html_content=html_content,
-        text_content=text_content
+        text_content=text_content,
+        dedupe_key=f"reset:{reset_token}"
     )
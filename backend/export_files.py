@@ -0,0 +1,61 @@
+"""
+Export Files
+Location and lifetime of files produced for download (bulk PDFs, document
+packs). The directory must be shared between API and Celery workers.
+Files are served for EXPORT_TTL_HOURS; the hourly `purge_expired_exports`
+job deletes them afterwards.
+"""
+
+import os
+import shutil
+import time
+import uuid
+
+from config import settings
+
+
+def new_export_path(prefix: str, extension: str) -> str:
+    """A fresh, unguessable file path in the export directory."""
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    return os.path.join(settings.EXPORT_DIR, f"{prefix}_{uuid.uuid4().hex}.{extension}")
+
+
+def remove_export(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _cutoff() -> float:
+    return time.time() - settings.EXPORT_TTL_HOURS * 3600
+
+
+def export_available(path: str) -> bool:
+    """Whether an export file exists and is still within EXPORT_TTL_HOURS."""
+    try:
+        return os.path.getmtime(path) >= _cutoff()
+    except OSError:
+        return False
+
+
+def purge_expired_exports() -> int:
+    """Delete export files (and abandoned staging directories) older than EXPORT_TTL_HOURS."""
+    if not os.path.isdir(settings.EXPORT_DIR):
+        return 0
+
+    cutoff = _cutoff()
+    removed = 0
+    with os.scandir(settings.EXPORT_DIR) as it:
+        for entry in it:
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+                removed += 1
+            except OSError:
+                continue
+    return removed
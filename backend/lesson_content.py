@@ -0,0 +1,226 @@
+"""
+Rule-based Lesson Content Engine
+Builds lesson plan sections locally from curriculum template fields so that
+generating plans needs no network call. The LLM is only used to enrich.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# Leading lines such as "By the end of the sub-strand, the learner should be able to:"
+_INTRO_LINE_RE = re.compile(r"^(by the end of|the learner)\b[^:]*:\s*$", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*(?:[-•*]|[a-z]\)|\d+[.)])\s*", re.IGNORECASE)
+
+INTRODUCTION_MINUTES = 5
+CONCLUSION_MINUTES = 5
+
+# Placeholder strands written by scheme generation; they carry no teaching content
+NON_TEACHING_STRANDS = {
+    "MID TERM BREAK",
+    "OPENING WEEK",
+    "ASSESSMENT WEEK",
+    "CLOSING WEEK",
+    "REVISION / ASSESSMENT",
+}
+
+
+def format_items(value) -> List[str]:
+    """Normalize a template field (JSON list, bulleted or newline separated text) into clean items."""
+    if not value:
+        return []
+
+    if isinstance(value, list):
+        raw_items = [str(v) for v in value]
+    else:
+        text = str(value)
+        if "\n" in text:
+            raw_items = text.split("\n")
+        elif text.strip().startswith("- ") or " - " in text:
+            raw_items = text.split("- ")
+        else:
+            raw_items = [text]
+
+    items = []
+    for item in raw_items:
+        item = _BULLET_RE.sub("", item).strip()
+        if not item or _INTRO_LINE_RE.match(item):
+            continue
+        items.append(item[0].upper() + item[1:])
+    return items
+
+
+def generate_smart_resources(experiences, outcomes, default_textbook: str = "") -> str:
+    """Suggest learning resources from the wording of the experiences and outcomes."""
+    # Build textbook entries - show both Learner's Book and Teacher's Guide
+    if default_textbook:
+        learner_book = f"{default_textbook} (Learner's Book)"
+        teacher_guide = f"{default_textbook} (Teacher's Guide)"
+        resources = ["Curriculum designs", learner_book, teacher_guide]
+    else:
+        resources = ["Curriculum designs", "Textbooks"]
+
+    text = (str(experiences) + " " + str(outcomes)).lower()
+
+    if "digital" in text or "video" in text or "watch" in text or "internet" in text or "online" in text:
+        resources.append("Digital devices")
+        resources.append("Video clips")
+    if "chart" in text or "draw" in text or "illustrate" in text or "poster" in text:
+        resources.append("Charts/Manila paper")
+    if "map" in text or "locate" in text:
+        resources.append("Maps/Atlases")
+    if "model" in text or "construct" in text or "make" in text:
+        resources.append("Modeling materials")
+    if "group" in text or "discuss" in text:
+        resources.append("Reference materials")
+    if "field" in text or "visit" in text or "walk" in text:
+        resources.append("Field trip consent forms")
+    if "experiment" in text or "observe" in text or "measure" in text:
+        resources.append("Real objects/Realia")
+    if "picture" in text or "photo" in text:
+        resources.append("Pictures/Photographs")
+
+    return ", ".join(resources)
+
+
+def generate_smart_assessment(experiences, outcomes) -> str:
+    """Suggest assessment methods from the wording of the experiences and outcomes."""
+    methods = ["Observation", "Oral questions"]
+    text = (str(experiences) + " " + str(outcomes)).lower()
+
+    if "write" in text or "list" in text or "explain" in text or "describe" in text:
+        methods.append("Written exercise")
+    if "draw" in text or "sketch" in text or "paint" in text:
+        methods.append("Drawing/Portfolio")
+    if "group" in text or "discuss" in text or "share" in text:
+        methods.append("Group discussion")
+    if "present" in text or "report" in text or "tell" in text:
+        methods.append("Presentation")
+    if "project" in text or "create" in text or "make" in text:
+        methods.append("Project work")
+    if "calculate" in text or "solve" in text or "compute" in text:
+        methods.append("Computation")
+    if "role" in text or "act" in text or "play" in text:
+        methods.append("Role play")
+
+    return ", ".join(methods)
+
+
+def _learner_grouping(text: str) -> str:
+    lowered = text.lower()
+    if "pair" in lowered:
+        return "In pairs, learners"
+    if "group" in lowered or "discuss" in lowered:
+        return "In groups, learners"
+    if "individual" in lowered or "write" in lowered or "draw" in lowered:
+        return "Individually, learners"
+    return "Learners"
+
+
+def _lesson_share(items: List[str], lesson_index: int, lesson_count: int) -> List[str]:
+    """Give each lesson of a sub-strand its own contiguous slice of the items."""
+    if not items:
+        return []
+    if lesson_count <= 1 or len(items) <= 1:
+        return list(items)
+    if len(items) < lesson_count:
+        return [items[lesson_index % len(items)]]
+    per_lesson, extra = divmod(len(items), lesson_count)
+    start = lesson_index * per_lesson + min(lesson_index, extra)
+    end = start + per_lesson + (1 if lesson_index < extra else 0)
+    return items[start:end]
+
+
+def _lower_first(text: str) -> str:
+    return text[0].lower() + text[1:] if text else text
+
+
+def build_lesson_content(
+    strand: str,
+    sub_strand: str,
+    outcomes=None,
+    experiences=None,
+    key_inquiry_questions=None,
+    core_competencies=None,
+    lesson_index: int = 0,
+    lesson_count: int = 1,
+    duration_minutes: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Produce introduction, development steps, conclusion, summary and a reflection
+    prompt for one lesson of a sub-strand.
+
+    `lesson_index`/`lesson_count` locate the lesson within its sub-strand so the
+    outcomes and experiences are spread across consecutive lessons instead of
+    repeated. Keys match the AI planner output so the result can be applied with
+    `ai_lesson_planner.apply_generated_content`.
+    """
+    if (strand or "").strip().upper() in NON_TEACHING_STRANDS:
+        return {
+            "introduction": "",
+            "development": "\n".join(format_items(experiences)),
+            "conclusion": "",
+            "summary": sub_strand or strand or "",
+            "reflection_prompt": "",
+        }
+
+    topic = sub_strand or strand or "the topic"
+    lesson_count = max(lesson_count or 1, 1)
+    lesson_index = min(max(lesson_index or 0, 0), lesson_count - 1)
+    duration = duration_minutes or 40
+    development_minutes = max(duration - INTRODUCTION_MINUTES - CONCLUSION_MINUTES, 10)
+
+    outcome_items = _lesson_share(format_items(outcomes), lesson_index, lesson_count)
+    experience_items = _lesson_share(format_items(experiences), lesson_index, lesson_count)
+    question_items = format_items(key_inquiry_questions)
+    competency_items = format_items(core_competencies)
+
+    focus = _lower_first(outcome_items[0].rstrip(".")) if outcome_items else f"describe {topic}"
+    question = question_items[lesson_index % len(question_items)] if question_items else None
+
+    # Introduction
+    intro_lines = [f"Introduction ({INTRODUCTION_MINUTES} minutes)"]
+    if lesson_index == 0:
+        intro_lines.append(f"- Find out what learners already know about {topic}.")
+    else:
+        intro_lines.append(f"- Recap the previous lesson on {topic} through oral questions.")
+    if question:
+        intro_lines.append(f"- Pose the key inquiry question: {question}")
+    intro_lines.append(f"- Share the lesson outcome: learners should be able to {focus}.")
+
+    # Development
+    development_lines = [f"Lesson Development ({development_minutes} minutes)"]
+    steps = experience_items or [f"Guide learners to {focus}"]
+    for number, experience in enumerate(steps, start=1):
+        experience = experience.rstrip(".")
+        grouping = _learner_grouping(experience)
+        development_lines.append(f"Step {number}: {experience}.")
+        if grouping != "Learners" and grouping.split(",")[0].lower() not in experience.lower():
+            development_lines.append(f"- {grouping} carry out the activity as the teacher moves round to guide them.")
+        if competency_items:
+            competency = competency_items[(lesson_index + number - 1) % len(competency_items)]
+            development_lines.append(f"- Core competency: {competency.rstrip('.')}.")
+
+    # Conclusion
+    conclusion_lines = [
+        f"Conclusion ({CONCLUSION_MINUTES} minutes)",
+        f"- Summarize the key points on {topic} with the learners.",
+        f"- Quick check: ask learners to {focus}.",
+    ]
+    if lesson_index + 1 < lesson_count:
+        conclusion_lines.append(f"- Preview the next lesson on {topic}.")
+    else:
+        conclusion_lines.append(f"- Link {topic} to the next sub-strand and real-life situations.")
+
+    summary = f"Lesson on {topic}: learners were guided to {focus}."
+
+    reflection = f"Were learners able to {focus}?"
+    if question:
+        reflection += f" How well did they respond to: {question}"
+
+    return {
+        "introduction": "\n".join(intro_lines),
+        "development": "\n".join(development_lines),
+        "conclusion": "\n".join(conclusion_lines),
+        "summary": summary,
+        "reflection_prompt": reflection,
+    }
@@ -0,0 +1,190 @@
+"""
+Lesson Plan Generation from Schemes of Work
+Shared by the schemes router and the Celery background task. Reads the scheme
+tree, existing plans and template data with one query each and writes all new
+plans with a single bulk insert.
+"""
+
+import re
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, joinedload
+
+from models import (
+    User, SchemeOfWork, SchemeWeek, LessonPlan, SystemTerm, UserTermAdjustment,
+    CurriculumTemplate, TemplateStrand, TemplateSubstrand
+)
+from lesson_content import build_lesson_content
+from activity_log import record_activity, LESSON_PLANS_GENERATED
+
+
+def resolve_term_start_date(db: Session, scheme: SchemeOfWork, user: User):
+    """Resolve start date from system terms, applying user/school adjustments if present."""
+    term_number = None
+    if scheme.term:
+        m = re.search(r"(\d+)", scheme.term)
+        if m:
+            term_number = int(m.group(1))
+
+    term_q = db.query(SystemTerm).filter(SystemTerm.year == scheme.year)
+    system_term = None
+    if scheme.term:
+        system_term = term_q.filter(SystemTerm.term_name == scheme.term).first()
+        if not system_term and term_number is not None:
+            system_term = term_q.filter(SystemTerm.term_number == term_number).first()
+    if not system_term:
+        system_term = term_q.order_by(SystemTerm.term_number.asc()).first()
+
+    if not system_term:
+        return None
+
+    adjustment = None
+    if user.school_id:
+        adjustment = db.query(UserTermAdjustment).filter(
+            UserTermAdjustment.system_term_id == system_term.id,
+            UserTermAdjustment.school_id == user.school_id,
+            UserTermAdjustment.is_active == True,
+        ).first()
+    if not adjustment:
+        adjustment = db.query(UserTermAdjustment).filter(
+            UserTermAdjustment.system_term_id == system_term.id,
+            UserTermAdjustment.user_id == user.id,
+            UserTermAdjustment.is_active == True,
+        ).first()
+
+    return adjustment.adjusted_start_date if adjustment else system_term.start_date
+
+
+def planned_lesson_date(term_start, week_number: int, lesson_number: Optional[int]) -> Optional[str]:
+    """Date of a scheme lesson, assuming week 1 starts on term_start and a 5-day teaching week."""
+    if not term_start:
+        return None
+    week_start = term_start + timedelta(days=(week_number - 1) * 7)
+    lesson_index = max((lesson_number or 1) - 1, 0)
+    extra_weeks, day_index = divmod(lesson_index, 5)
+    planned_dt = week_start + timedelta(weeks=extra_weeks, days=day_index)
+    return planned_dt.date().isoformat()
+
+
+def load_scheme_tree(db: Session, scheme_id: int, user_id: int) -> Optional[SchemeOfWork]:
+    """Fetch a scheme with its weeks and lessons in a single query."""
+    return db.query(SchemeOfWork).options(
+        joinedload(SchemeOfWork.weeks).joinedload(SchemeWeek.lessons)
+    ).filter(
+        SchemeOfWork.id == scheme_id,
+        SchemeOfWork.user_id == user_id
+    ).first()
+
+
+def _template_substrand_map(db: Session, scheme: SchemeOfWork) -> Dict:
+    """(strand_name, substrand_name) -> TemplateSubstrand for the scheme's curriculum template."""
+    template_id = db.query(CurriculumTemplate.id).filter(
+        func.lower(CurriculumTemplate.subject) == func.lower(scheme.subject),
+        func.lower(CurriculumTemplate.grade) == func.lower(scheme.grade)
+    ).scalar()
+    if not template_id:
+        return {}
+
+    rows = db.query(TemplateStrand.strand_name, TemplateSubstrand)\
+        .join(TemplateSubstrand, TemplateSubstrand.strand_id == TemplateStrand.id)\
+        .filter(TemplateStrand.curriculum_template_id == template_id)\
+        .all()
+    return {
+        (strand_name.strip().lower(), sub.substrand_name.strip().lower()): sub
+        for strand_name, sub in rows
+    }
+
+
+def _format_list(data) -> str:
+    if isinstance(data, list):
+        return ", ".join(data)
+    return str(data) if data else ""
+
+
+def generate_lesson_plans_for_scheme(db: Session, scheme: SchemeOfWork, user: User) -> Dict:
+    """
+    Create a lesson plan for every scheme lesson that does not have one yet.
+
+    `scheme` should come from `load_scheme_tree` so no lazy loads happen while
+    iterating. The caller commits.
+    """
+    ordered_lessons = [
+        (week, lesson)
+        for week in sorted(scheme.weeks, key=lambda w: w.week_number)
+        for lesson in sorted(week.lessons, key=lambda l: l.lesson_number)
+    ]
+    lesson_ids = [lesson.id for _, lesson in ordered_lessons]
+    if not lesson_ids:
+        return {"created": 0, "skipped": 0}
+
+    existing_ids = {
+        row[0] for row in db.query(LessonPlan.scheme_lesson_id).filter(
+            LessonPlan.scheme_lesson_id.in_(lesson_ids)
+        ).all()
+    }
+
+    substrand_map = _template_substrand_map(db, scheme)
+    term_start = resolve_term_start_date(db, scheme, user)
+
+    # Lessons per sub-strand, so the content engine can spread the material across them
+    substrand_totals = Counter((l.strand, l.sub_strand) for _, l in ordered_lessons)
+    substrand_seen = Counter()
+
+    rows = []
+    for week, lesson in ordered_lessons:
+        position = substrand_seen[(lesson.strand, lesson.sub_strand)]
+        substrand_seen[(lesson.strand, lesson.sub_strand)] += 1
+
+        if lesson.id in existing_ids:
+            continue
+
+        template_data = substrand_map.get((lesson.strand.strip().lower(), lesson.sub_strand.strip().lower()))
+
+        content = build_lesson_content(
+            strand=lesson.strand,
+            sub_strand=lesson.sub_strand,
+            outcomes=lesson.specific_learning_outcomes,
+            experiences=lesson.learning_experiences,
+            key_inquiry_questions=(template_data.key_inquiry_questions if template_data else None) or lesson.key_inquiry_questions,
+            core_competencies=template_data.core_competencies if template_data else None,
+            lesson_index=position,
+            lesson_count=substrand_totals[(lesson.strand, lesson.sub_strand)],
+            duration_minutes=scheme.lesson_duration_minutes,
+        )
+
+        rows.append({
+            "user_id": user.id,
+            "subject_id": scheme.subject_id,
+            "scheme_lesson_id": lesson.id,
+            "learning_area": scheme.subject,
+            "grade": scheme.grade,
+            "date": planned_lesson_date(term_start, week.week_number, lesson.lesson_number),
+            "roll": scheme.roll,
+            "lesson_duration_minutes": scheme.lesson_duration_minutes,
+            "strand_theme_topic": lesson.strand,
+            "sub_strand_sub_theme_sub_topic": lesson.sub_strand,
+            "specific_learning_outcomes": lesson.specific_learning_outcomes,
+            "key_inquiry_questions": lesson.key_inquiry_questions,
+            "learning_resources": lesson.learning_resources,
+            "core_competences": _format_list(template_data.core_competencies) if template_data else "",
+            "values_to_be_developed": _format_list(template_data.values) if template_data else "",
+            "pcis_to_be_addressed": _format_list(template_data.pcis) if template_data else "",
+            "introduction": content["introduction"],
+            "development": content["development"] or lesson.learning_experiences,
+            "conclusion": content["conclusion"],
+            "summary": content["summary"],
+            "reflection_self_evaluation": content["reflection_prompt"],
+            "status": "pending",
+            "is_archived": False,
+            "is_public": False,
+        })
+
+    if rows:
+        # One executemany; PyMySQL folds it into a multi-row INSERT
+        db.execute(insert(LessonPlan), rows)
+        record_activity(user, LESSON_PLANS_GENERATED, scheme_id=scheme.id, count=len(rows))
+
+    return {"created": len(rows), "skipped": len(existing_ids)}
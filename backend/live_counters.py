@@ -0,0 +1,266 @@
+"""
+Live Counters
+Approximate real-time numbers for the admin widgets, kept in Redis and
+updated on the write path so a "live" read is a handful of O(1) commands:
+- HyperLogLogs of distinct active teachers per UTC day and month (~0.8% error)
+- a sorted set of curricula by adoption, bumped when a teacher adds a
+  subject from a curriculum template
+- hashes of sign-ups and completed-payment revenue per day and month
+- a `live:totals` hash with the platform counts shown by /admin/stats
+
+The write path only increments, so deletions and missed updates drift until
+the `reconcile_live_counters` job rebuilds everything from SQL. A totals hash
+without `reconciled_at` (Redis restarted, never reconciled) is treated as
+missing and callers fall back to SQL. Every function here swallows Redis
+errors: counters are never worth failing a request for.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from cache_manager import cache
+from config import settings
+from models import (
+    User, UserRole, School, Subject, Payment, PaymentStatus, SubscriptionType, ActivityEvent
+)
+
+TEACHER_ROLES = (UserRole.TEACHER, UserRole.HOD)
+TOTALS_KEY = "live:totals"
+CURRICULA_KEY = "live:curricula"
+DAY_TTL = 3 * 24 * 60 * 60
+MONTH_TTL = 62 * 24 * 60 * 60
+PFADD_CHUNK = 1000
+
+
+def _client():
+    return cache.redis_client if cache.cache_enabled else None
+
+
+def _periods(now: Optional[datetime] = None):
+    now = now or datetime.utcnow()
+    return f"{now:%Y-%m-%d}", f"{now:%Y-%m}"
+
+
+def _active_key(period: str) -> str:
+    return f"live:active_teachers:{period}"
+
+
+def _counts_key(period: str) -> str:
+    return f"live:counts:{period}"
+
+
+def _curriculum_member(subject_name: str, grade: str) -> str:
+    return f"{subject_name}|{grade}"
+
+
+def _run(pipeline_builder, action: str):
+    client = _client()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipeline_builder(pipe)
+        pipe.execute()
+    except Exception as e:
+        print(f"[WARN] Live counters: could not record {action}: {e}")
+
+
+def track_active_teacher(user_id: int, role):
+    """Count `user_id` as active today and this month if they are a teacher."""
+    if role not in TEACHER_ROLES:
+        return
+    day, month = _periods()
+
+    def build(pipe):
+        pipe.pfadd(_active_key(day), user_id)
+        pipe.expire(_active_key(day), DAY_TTL)
+        pipe.pfadd(_active_key(month), user_id)
+        pipe.expire(_active_key(month), MONTH_TTL)
+    _run(build, "activity")
+
+
+def track_signup(role=UserRole.TEACHER, count: int = 1):
+    """`count` new accounts with `role` were committed."""
+    if count <= 0:
+        return
+    day, month = _periods()
+
+    def build(pipe):
+        for period, ttl in ((day, DAY_TTL), (month, MONTH_TTL)):
+            pipe.hincrby(_counts_key(period), "signups", count)
+            pipe.expire(_counts_key(period), ttl)
+        pipe.hincrby(TOTALS_KEY, "users", count)
+        if role in TEACHER_ROLES:
+            pipe.hincrby(TOTALS_KEY, "teachers", count)
+        elif role == UserRole.SCHOOL_ADMIN:
+            pipe.hincrby(TOTALS_KEY, "school_admins", count)
+    _run(build, "sign-up")
+
+
+def track_subject_created(subject_name: str, grade: str, from_template: bool):
+    """A subject was committed; template-based ones count towards curriculum adoption."""
+    def build(pipe):
+        pipe.hincrby(TOTALS_KEY, "subjects", 1)
+        if from_template:
+            pipe.zincrby(CURRICULA_KEY, 1, _curriculum_member(subject_name, grade))
+    _run(build, "new subject")
+
+
+def track_payment(amount: float):
+    """A payment was committed as completed."""
+    day, month = _periods()
+    amount = float(amount or 0)
+
+    def build(pipe):
+        for period, ttl in ((day, DAY_TTL), (month, MONTH_TTL)):
+            pipe.hincrbyfloat(_counts_key(period), "revenue", amount)
+            pipe.hincrby(_counts_key(period), "payments", 1)
+            pipe.expire(_counts_key(period), ttl)
+        pipe.hincrbyfloat(TOTALS_KEY, "revenue", amount)
+        pipe.hincrby(TOTALS_KEY, "payments", 1)
+    _run(build, "payment")
+
+
+def _int(values: Dict, field: str) -> int:
+    return int(float(values.get(field) or 0))
+
+
+def live_snapshot() -> Optional[Dict]:
+    """
+    Everything the live widgets show, in one pipelined round trip. Returns None
+    when Redis is unavailable or the counters have not been reconciled yet.
+    """
+    client = _client()
+    if client is None:
+        return None
+    day, month = _periods()
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hgetall(TOTALS_KEY)
+        pipe.pfcount(_active_key(day))
+        pipe.pfcount(_active_key(month))
+        pipe.hgetall(_counts_key(day))
+        pipe.hgetall(_counts_key(month))
+        pipe.zrevrange(CURRICULA_KEY, 0, settings.LIVE_TOP_CURRICULA - 1, withscores=True)
+        totals, active_day, active_month, today, this_month, curricula = pipe.execute()
+    except Exception as e:
+        print(f"[WARN] Live counters unavailable: {e}")
+        return None
+
+    if not totals.get("reconciled_at"):
+        return None
+
+    top_curricula = []
+    for member, score in curricula:
+        subject, _, grade = member.partition("|")
+        top_curricula.append({"subject": subject, "grade": grade, "usage_count": int(score)})
+
+    return {
+        "totals": {
+            field: _int(totals, field)
+            for field in ("users", "teachers", "school_admins", "schools", "subjects",
+                          "basic", "premium", "school_sponsored", "payments")
+        },
+        "total_revenue": float(totals.get("revenue") or 0),
+        "active_teachers": {"today": active_day, "this_month": active_month},
+        "signups": {"today": _int(today, "signups"), "this_month": _int(this_month, "signups")},
+        "revenue": {
+            "today": float(today.get("revenue") or 0),
+            "this_month": float(this_month.get("revenue") or 0),
+            "payments_today": _int(today, "payments"),
+            "payments_this_month": _int(this_month, "payments"),
+        },
+        "most_used_curricula": top_curricula,
+        "reconciled_at": totals["reconciled_at"],
+    }
+
+
+def _period_counts(db: Session, since: datetime) -> Dict:
+    signups = db.query(func.count(User.id)).filter(User.created_at >= since).scalar() or 0
+    revenue, payments = db.query(
+        func.coalesce(func.sum(Payment.amount), 0), func.count(Payment.id)
+    ).filter(Payment.status == PaymentStatus.COMPLETED, Payment.created_at >= since).one()
+    return {"signups": signups, "revenue": float(revenue or 0), "payments": payments}
+
+
+def _rebuild_active(client, db: Session, key: str, since: datetime, ttl: int):
+    user_ids = [
+        row[0] for row in db.query(ActivityEvent.user_id).join(User, User.id == ActivityEvent.user_id).filter(
+            ActivityEvent.created_at >= since, User.role.in_(TEACHER_ROLES)
+        ).distinct().all()
+    ]
+    # Built under a scratch key and renamed, so readers never see a half-filled sketch
+    scratch = f"{key}:rebuild"
+    client.delete(scratch)
+    for start in range(0, len(user_ids), PFADD_CHUNK):
+        client.pfadd(scratch, *user_ids[start:start + PFADD_CHUNK])
+    if user_ids:
+        client.rename(scratch, key)
+        client.expire(key, ttl)
+    else:
+        client.delete(key)
+
+
+def reconcile(db: Session) -> Dict:
+    """
+    Rebuild every live counter from SQL. Increments that land while this runs
+    may be lost or counted twice until the next pass.
+    """
+    client = _client()
+    if client is None:
+        return {"status": "skipped", "reason": "Redis is not available"}
+
+    now = datetime.utcnow()
+    day, month = _periods(now)
+    start_of_day = datetime(now.year, now.month, now.day)
+    start_of_month = datetime(now.year, now.month, 1)
+
+    def users_where(*conditions):
+        return db.query(func.count(User.id)).filter(*conditions).scalar() or 0
+
+    revenue, payments = db.query(
+        func.coalesce(func.sum(Payment.amount), 0), func.count(Payment.id)
+    ).filter(Payment.status == PaymentStatus.COMPLETED).one()
+    totals = {
+        "users": users_where(),
+        "teachers": users_where(User.role.in_(TEACHER_ROLES)),
+        "school_admins": users_where(User.role == UserRole.SCHOOL_ADMIN),
+        "schools": db.query(func.count(School.id)).scalar() or 0,
+        "subjects": db.query(func.count(Subject.id)).scalar() or 0,
+        "basic": users_where(User.subscription_type == SubscriptionType.INDIVIDUAL_BASIC),
+        "premium": users_where(User.subscription_type == SubscriptionType.INDIVIDUAL_PREMIUM),
+        "school_sponsored": users_where(User.subscription_type == SubscriptionType.SCHOOL_SPONSORED),
+        "revenue": float(revenue or 0),
+        "payments": payments,
+        "reconciled_at": now.isoformat(),
+    }
+
+    adoption = db.query(
+        Subject.subject_name, Subject.grade, func.count(Subject.id)
+    ).filter(Subject.template_id.isnot(None)).group_by(Subject.subject_name, Subject.grade).all()
+    periods = (
+        (day, _period_counts(db, start_of_day), DAY_TTL),
+        (month, _period_counts(db, start_of_month), MONTH_TTL),
+    )
+
+    _rebuild_active(client, db, _active_key(day), start_of_day, DAY_TTL)
+    _rebuild_active(client, db, _active_key(month), start_of_month, MONTH_TTL)
+
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(TOTALS_KEY)
+    pipe.hset(TOTALS_KEY, mapping=totals)
+    for period, counts, ttl in periods:
+        pipe.delete(_counts_key(period))
+        pipe.hset(_counts_key(period), mapping=counts)
+        pipe.expire(_counts_key(period), ttl)
+    pipe.delete(CURRICULA_KEY)
+    if adoption:
+        pipe.zadd(CURRICULA_KEY, {
+            _curriculum_member(subject_name, grade): count for subject_name, grade, count in adoption
+        })
+    pipe.execute()
+
+    return {"status": "ok", "users": totals["users"], "curricula": len(adoption), "reconciled_at": totals["reconciled_at"]}
@@ -21,7 +21,7 @@ from payment_routes import router as payment_router
 from routers import (
     schools, profiles, admin, subjects, notes, curriculum, 
     settings as user_settings, timetable, schemes, lesson_plans, 
-    records, announcements, sharing, learning, dashboard, analytics
+    records, announcements, sharing, learning, dashboard, analytics, jobs
 )
 
 # Initialize FastAPI app
@@ -63,6 +63,11 @@ def ensure_system_settings_table_and_seed_pricing():
             # (e.g., system_settings.updated_by -> users.id) can fail.
             Base.metadata.create_all(bind=engine)
             SystemSetting.__table__.create(bind=engine, checkfirst=True)
+            try:
+                from activity_log import maintain_partitions
+                maintain_partitions()
+            except Exception as e:
+                logger.warning(f"[Startup] Could not prepare activity_events partitions: {e}")
         finally:
             # Release lock best-effort
             with engine.connect() as conn:
@@ -83,6 +88,25 @@ def ensure_system_settings_table_and_seed_pricing():
     except Exception as e:
         logger.warning(f"[Startup] Could not ensure system_settings/pricing_config: {e}")
 
+
+@app.on_event("shutdown")
+def shutdown_pdf_workers():
+    """Stop the PDF rendering process pool."""
+    from pdf_render_service import pdf_renderer
+    pdf_renderer.shutdown()
+
+@app.on_event("shutdown")
+def shutdown_password_hashing():
+    """Stop the password hashing pool."""
+    from auth import password_hasher
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+def flush_activity_events():
+    """Write buffered activity events before the worker exits."""
+    from activity_log import activity_buffer
+    activity_buffer.flush()
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.error(f"Validation error: {exc.errors()}")
@@ -124,6 +148,7 @@ app.include_router(sharing.router)
 app.include_router(learning.router)
 app.include_router(dashboard.router)
 app.include_router(analytics.router)
+app.include_router(jobs.router)
 
 # Health check
 @app.get("/")
@@ -132,7 +157,8 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "API is running"}
+    from auth import password_hasher
+    return {"status": "healthy", "message": "API is running", "password_hashing": password_hasher.stats()}
 
 if __name__ == "__main__":
     port = int(os.getenv("API_PORT", os.getenv("PORT", 8000)))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, Text, DECIMAL, ForeignKey, BigInteger, Enum as SQLEnum, Index
+from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, Text, DECIMAL, ForeignKey, BigInteger, Enum as SQLEnum, Index, Date, DateTime, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.mysql import JSON
@@ -41,7 +41,7 @@ class School(Base):
     max_teachers = Column(Integer, default=1)
     teacher_counts_by_level = Column(JSON, default={})  # Stores breakdown like {"Pre-Primary": 2, "Lower Primary": 5}
     
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)  # Admin list keyset
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     
     # Relationships
@@ -49,6 +49,10 @@ class School(Base):
     teachers = relationship("User", foreign_keys="[User.school_id]", back_populates="school_rel")
     departments = relationship("Department", back_populates="school", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ft_schools_search', 'name', mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
+    )
+
 # ============================================================================
 # DEPARTMENT MODEL
 # ============================================================================
@@ -97,11 +101,25 @@ class Payment(Base):
     result_desc = Column(String(255), nullable=True)
     mpesa_metadata = Column(JSON, nullable=True)
     
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)  # Admin list keyset
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="payments")
 
+    __table_args__ = (
+        Index('ft_payments_search', 'phone_number', 'transaction_code', 'checkout_request_id',
+              mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
+    )
+
+class PaymentDailyTotal(Base):
+    """Number and amount of payments created on `day` currently in `status` (payment_totals.py)"""
+    __tablename__ = "payment_daily_totals"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    payments = Column(Integer, nullable=False, default=0)
+    amount = Column(DECIMAL(14, 2), nullable=False, default=0)
+
 # ============================================================================
 # TEMPLATE MODELS
 # ============================================================================
@@ -195,8 +213,8 @@ class User(Base):
     default_lesson_duration = Column(Integer, default=40)  # Default lesson duration in minutes
     default_double_lesson_duration = Column(Integer, default=80)  # Default double lesson duration
     
-    created_at = Column(TIMESTAMP, server_default=func.now())
-    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), index=True)  # Analytics rollup watermark
     
     # Relationships
     # Relationships
@@ -209,6 +227,10 @@ class User(Base):
     school_rel = relationship("School", foreign_keys=[school_id], back_populates="teachers")
     payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ft_users_search', 'email', 'full_name', 'phone', mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
+    )
+
     @property
     def is_trial_active(self):
         """Check if the user is in the 14-day trial period."""
@@ -295,7 +317,7 @@ class Subject(Base):
     double_lessons_per_week = Column(Integer, default=0)  # Number of double lessons per week
     
     created_at = Column(TIMESTAMP, server_default=func.now())
-    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), index=True)  # Analytics rollup watermark
     
     # Relationships
     user = relationship("User", back_populates="subjects")
@@ -378,7 +400,7 @@ class ProgressLog(Base):
     lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
     action = Column(String(50), nullable=False)
     notes = Column(Text)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
     
     # Relationships
     user = relationship("User", back_populates="progress_logs")
@@ -1093,3 +1115,183 @@ class TeacherProfile(Base):
     # ========================================
     user = relationship("User", back_populates="teacher_profile")
 
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+class BackgroundJob(Base):
+    """A Celery job submitted through the /jobs API; the id is the Celery task id."""
+    __tablename__ = 'background_jobs'
+    id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    job_type = Column(String(50), nullable=False)
+    status = Column(String(20), default='queued')  # queued, running, success, failed, cancelled
+
+    params = Column(JSON)
+    progress = Column(JSON)  # Last progress reported by the task
+    result = Column(JSON)
+    error = Column(Text)
+
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    user = relationship("User")
+
+    __table_args__ = (
+        Index('idx_background_jobs_user_created', 'user_id', 'created_at'),
+    )
+
+# ============================================================================
+# EMAIL OUTBOX
+# ============================================================================
+
+class EmailOutbox(Base):
+    """
+    Outgoing email, written in the same transaction as the change that triggers
+    it and delivered by the `deliver_email_outbox` worker.
+    """
+    __tablename__ = 'email_outbox'
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_content = Column(Text, nullable=False)
+    text_content = Column(Text)
+    dedupe_key = Column(String(191), index=True)  # Only one message per key is delivered
+
+    status = Column(String(20), default='pending')  # pending, sending, sent, failed, skipped
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(TIMESTAMP, server_default=func.now())
+    last_error = Column(Text)
+    provider_message_id = Column(String(255))
+
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    sent_at = Column(TIMESTAMP, nullable=True)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_email_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+
+# ============================================================================
+# ANALYTICS ROLLUPS
+# ============================================================================
+# Maintained by the `refresh_analytics_rollups` job (analytics_rollups.py).
+# school_id 0 holds users without a school; platform totals are the sum over
+# all school_id values.
+
+class AnalyticsWatermark(Base):
+    """How far each rollup source has been processed"""
+    __tablename__ = 'analytics_watermarks'
+    name = Column(String(50), primary_key=True)
+    last_id = Column(BigInteger, default=0)  # Append-only sources (activity_events)
+    last_seen_at = Column(TIMESTAMP, nullable=True)  # Sources tracked by updated_at
+    snapshot_day = Column(Date, nullable=True)  # Day of the last full snapshot rebuild
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class AnalyticsUserDaily(Base):
+    """Users per school by role and subscription, one snapshot per day"""
+    __tablename__ = 'analytics_user_daily'
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    school_id = Column(Integer, nullable=False, default=0)
+    role = Column(String(20))
+    subscription_type = Column(String(30))
+    users = Column(Integer, default=0)
+    active_teachers = Column(Integer, default=0)  # Active TEACHER and HOD accounts
+
+    __table_args__ = (
+        Index('idx_analytics_user_daily_day_school', 'day', 'school_id'),
+    )
+
+class AnalyticsSubjectDaily(Base):
+    """Subject usage and completion per school, subject and grade, one snapshot per day"""
+    __tablename__ = 'analytics_subject_daily'
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    school_id = Column(Integer, nullable=False, default=0)
+    subject_name = Column(String(255), nullable=False)
+    grade = Column(String(10), nullable=False)
+    subjects = Column(Integer, default=0)
+    progress_sum = Column(DECIMAL(12, 2), default=0)  # Averages are progress_sum / subjects
+    total_lessons = Column(Integer, default=0)
+    lessons_completed = Column(Integer, default=0)
+    # Progress distribution buckets
+    progress_0_20 = Column(Integer, default=0)
+    progress_21_40 = Column(Integer, default=0)
+    progress_41_60 = Column(Integer, default=0)
+    progress_61_80 = Column(Integer, default=0)
+    progress_81_100 = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('idx_analytics_subject_daily_day_school', 'day', 'school_id'),
+    )
+
+class AnalyticsActivityDaily(Base):
+    """Daily active users and lessons completed (from activity_events) and sign-ups per school"""
+    __tablename__ = 'analytics_activity_daily'
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    school_id = Column(Integer, nullable=False, default=0)
+    active_users = Column(Integer, default=0)
+    lessons_completed = Column(Integer, default=0)
+    new_users = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('idx_analytics_activity_day_school', 'day', 'school_id', unique=True),
+    )
+
+class AnalyticsTeacherTotals(Base):
+    """Current subject count and average progress per teacher, for engagement rankings"""
+    __tablename__ = 'analytics_teacher_totals'
+    user_id = Column(Integer, primary_key=True)
+    school_id = Column(Integer, nullable=False, default=0)
+    email = Column(String(255))
+    subjects = Column(Integer, default=0)
+    avg_progress = Column(DECIMAL(5, 2), default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_analytics_teacher_school_subjects', 'school_id', 'subjects'),
+    )
+
+# ============================================================================
+# ACTIVITY EVENTS
+# ============================================================================
+
+class ActivityEvent(Base):
+    """
+    Append-only log of user activity (logins, lessons completed, plans
+    generated, PDFs downloaded), written in batches by activity_log.py.
+
+    Range-partitioned by month on created_at (UTC), so old months are dropped
+    as whole partitions and date-bounded queries only touch the months they
+    need. MySQL does not allow foreign keys on partitioned tables, and every
+    unique key must include the partition column, hence the composite primary
+    key and plain integer user/school columns.
+    """
+    __tablename__ = 'activity_events'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    school_id = Column(Integer, nullable=True)
+    event_type = Column(String(40), nullable=False)
+    event_data = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        Index('idx_activity_events_created_user', 'created_at', 'user_id'),
+        Index('idx_activity_events_user_created', 'user_id', 'created_at'),
+    )
+
+ACTIVITY_EVENTS_PARTITION_DDL = (
+    "ALTER TABLE activity_events PARTITION BY RANGE COLUMNS(created_at) "
+    "(PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+)
+# Monthly partitions are split off p_future by activity_log.maintain_partitions
+event.listen(
+    ActivityEvent.__table__,
+    "after_create",
+    DDL(ACTIVITY_EVENTS_PARTITION_DDL).execute_if(dialect="mysql")
+)
@@ -7,15 +7,15 @@ from dependencies import get_current_user
 from mpesa_utils import mpesa_client
 from datetime import datetime, timedelta
 from config import settings
+from email_outbox import queue_email, notify_outbox
+from live_counters import track_payment
+from payment_totals import record_payment_status
 import json
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
-def send_payment_confirmation_email(user_email: str, user_name: str, plan: str, amount: float, transaction_code: str):
-    """Send payment confirmation email"""
+def queue_payment_confirmation_email(db: Session, payment: Payment, user_email: str, user_name: str, plan: str, amount: float, transaction_code: str):
+    """Queue the payment confirmation email (once per payment; the callback and status query can both complete it)"""
     try:
         plan_name = "Termly Pass" if plan == "TERMLY" else "Yearly Saver"
         plan_duration = "one term (4 months)" if plan == "TERMLY" else "one year"
@@ -94,11 +94,6 @@ def send_payment_confirmation_email(user_email: str, user_name: str, plan: str,
         </html>
         """
         
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"🎉 Payment Confirmed - Welcome to TeachTrack {plan_name}!"
-        msg['From'] = f"{settings.FROM_NAME} <{settings.FROM_EMAIL}>"
-        msg['To'] = user_email
-        
         # Plain text version
         text_content = f"""
         Payment Successful!
@@ -119,19 +114,18 @@ def send_payment_confirmation_email(user_email: str, user_name: str, plan: str,
         - TeachTrack Team
         """
         
-        msg.attach(MIMEText(text_content, 'plain'))
-        msg.attach(MIMEText(html_content, 'html'))
-        
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.sendmail(settings.FROM_EMAIL, user_email, msg.as_string())
-            
-        print(f"Payment confirmation email sent to {user_email}")
+        queue_email(
+            db,
+            to_email=user_email,
+            subject=f"🎉 Payment Confirmed - Welcome to TeachTrack {plan_name}!",
+            html_content=html_content,
+            text_content=text_content,
+            dedupe_key=f"payment:{payment.id}"
+        )
         return True
         
     except Exception as e:
-        print(f"Failed to send payment confirmation email: {str(e)}")
+        print(f"Failed to queue payment confirmation email: {str(e)}")
         return False
 
 @router.post("/stk-push", response_model=PaymentResponse)
@@ -177,6 +171,7 @@ async def initiate_payment(
         )
         
         db.add(new_payment)
+        record_payment_status(db, new_payment)
         db.commit()
         
         return PaymentResponse(
@@ -205,7 +200,10 @@ async def mpesa_callback(request: Request, db: Session = Depends(get_db)):
         print(f"[CALLBACK] CheckoutID={checkout_request_id}, ResultCode={result_code}, Desc={result_desc}")
         
         # Find payment record
-        payment = db.query(Payment).filter(Payment.checkout_request_id == checkout_request_id).first()
+        # Locked so a concurrent status query cannot settle the same payment twice
+        payment = db.query(Payment).filter(
+            Payment.checkout_request_id == checkout_request_id
+        ).with_for_update().first()
         
         if not payment:
             print(f"[WARN] Payment not found for CheckoutRequestID: {checkout_request_id}")
@@ -222,6 +220,7 @@ async def mpesa_callback(request: Request, db: Session = Depends(get_db)):
         if result_code == 0:
             # SUCCESS - Payment completed!
             payment.status = PaymentStatus.COMPLETED
+            record_payment_status(db, payment, old_status=PaymentStatus.PENDING)
             
             # Extract metadata from callback
             meta_data = stk_callback.get('CallbackMetadata', {}).get('Item', [])
@@ -244,12 +243,11 @@ async def mpesa_callback(request: Request, db: Session = Depends(get_db)):
                 
                 user.subscription_status = SubscriptionStatus.ACTIVE
                 
-            db.commit()
-            print(f"[OK] Payment {checkout_request_id} COMPLETED via callback. User {user.id if user else 'unknown'} upgraded.")
-            
-            # Send payment confirmation email
+            # Confirmation email commits with the payment
             if user and user.email:
-                send_payment_confirmation_email(
+                queue_payment_confirmation_email(
+                    db,
+                    payment,
                     user_email=user.email,
                     user_name=user.full_name,
                     plan=plan_type,
@@ -257,15 +255,22 @@ async def mpesa_callback(request: Request, db: Session = Depends(get_db)):
                     transaction_code=payment.transaction_code or "N/A"
                 )
             
+            db.commit()
+            notify_outbox()
+            track_payment(payment.amount)
+            print(f"[OK] Payment {checkout_request_id} COMPLETED via callback. User {user.id if user else 'unknown'} upgraded.")
+            
         elif result_code == 1032:
             # User cancelled the STK push
             payment.status = PaymentStatus.CANCELLED
+            record_payment_status(db, payment, old_status=PaymentStatus.PENDING)
             db.commit()
             print(f"[CANCELLED] Payment {checkout_request_id} CANCELLED by user.")
             
         else:
             # Other errors = failed
             payment.status = PaymentStatus.FAILED
+            record_payment_status(db, payment, old_status=PaymentStatus.PENDING)
             db.commit()
             print(f"[FAILED] Payment {checkout_request_id} FAILED: {result_desc}")
             
@@ -307,10 +312,17 @@ async def check_payment_status(
         
         print(f"[STATUS] Query for {checkout_request_id}: ResultCode={result_code}, Desc={result_desc}")
         
-        if result_code == '0':
+        # The callback may have settled the payment while M-Pesa was being queried
+        db.refresh(payment, with_for_update=True)
+        
+        if payment.status != PaymentStatus.PENDING:
+            print(f"[INFO] Payment {checkout_request_id} already processed as {payment.status.value}")
+            
+        elif result_code == '0':
             # Payment successful!
             payment.status = PaymentStatus.COMPLETED
             payment.result_desc = result_desc
+            record_payment_status(db, payment, old_status=PaymentStatus.PENDING)
             
             # Get transaction code from result
             payment.transaction_code = result.get('MpesaReceiptNumber', f"MPESA-{checkout_request_id[:10]}")
@@ -334,23 +346,28 @@ async def check_payment_status(
                     user.subscription_type = SubscriptionType.INDIVIDUAL_PREMIUM
                 user.subscription_status = SubscriptionStatus.ACTIVE
             
-            db.commit()
-            print(f"[OK] Payment {checkout_request_id} COMPLETED. User {user.id if user else 'unknown'} upgraded to {payment.reference}.")
-            
-            # Send confirmation email
+            # Confirmation email commits with the payment
             if user and user.email:
-                send_payment_confirmation_email(
+                queue_payment_confirmation_email(
+                    db,
+                    payment,
                     user_email=user.email,
                     user_name=user.full_name,
                     plan=plan_type,
                     amount=payment.amount,
                     transaction_code=payment.transaction_code or "N/A"
                 )
+            
+            db.commit()
+            notify_outbox()
+            track_payment(payment.amount)
+            print(f"[OK] Payment {checkout_request_id} COMPLETED. User {user.id if user else 'unknown'} upgraded to {payment.reference}.")
                 
         elif result_code == '1032':
             # Cancelled by user
             payment.status = PaymentStatus.CANCELLED
             payment.result_desc = result_desc
+            record_payment_status(db, payment, old_status=PaymentStatus.PENDING)
             db.commit()
             print(f"[CANCELLED] Payment {checkout_request_id} CANCELLED by user.")
             
@@ -362,6 +379,7 @@ async def check_payment_status(
             # Other error codes = failed
             payment.status = PaymentStatus.FAILED
             payment.result_desc = result_desc
+            record_payment_status(db, payment, old_status=PaymentStatus.PENDING)
             db.commit()
             print(f"[FAILED] Payment {checkout_request_id} FAILED: {result_desc}")
             
@@ -0,0 +1,136 @@
+"""
+Payment Daily Totals
+`payment_daily_totals` holds one row per (day, status) with the number and
+amount of payments created that day currently in that status. The payment
+routes move a payment between rows in the same transaction as its status
+change, so the admin payment stats read a few hundred rows instead of
+scanning `payments`.
+
+`rebuild_totals` recomputes the table from `payments` in one GROUP BY scan;
+the `reconcile_payment_totals` Celery job runs it daily to correct any drift.
+Until it has run once the table is incomplete, and the stats fall back to a
+single conditional-aggregation scan of `payments`.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import and_, case, func, insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from models import Payment, PaymentStatus, PaymentDailyTotal, AnalyticsWatermark
+
+WATERMARK = "payment_daily_totals"  # Set once the table has been built from payments
+
+
+def _status_value(status) -> str:
+    return status.value if hasattr(status, "value") else str(status)
+
+
+def _bump(db: Session, day, status, payments: int, amount):
+    stmt = mysql_insert(PaymentDailyTotal).values(
+        day=day, status=_status_value(status), payments=payments, amount=amount
+    )
+    db.execute(stmt.on_duplicate_key_update(
+        payments=PaymentDailyTotal.payments + stmt.inserted.payments,
+        amount=PaymentDailyTotal.amount + stmt.inserted.amount,
+    ))
+
+
+def record_payment_status(db: Session, payment: Payment, old_status: Optional[PaymentStatus] = None):
+    """
+    Count `payment` under its current status, moving it out of `old_status`
+    if it had one. Call in the same transaction as the change, before commit.
+    """
+    # A payment being created has no created_at yet; the database's date matches its server default
+    day = payment.created_at.date() if payment.created_at else func.curdate()
+    amount = payment.amount or 0
+    if old_status is not None:
+        _bump(db, day, old_status, -1, -amount)
+    _bump(db, day, payment.status, 1, amount)
+
+
+def rebuild_totals(db: Session) -> Dict:
+    """Replace the whole table with totals computed from `payments`."""
+    # Clearing first locks the table's rows and gaps, so status changes that
+    # commit during the scan wait and then apply on top of the rebuilt rows
+    db.query(PaymentDailyTotal).delete(synchronize_session=False)
+
+    day = func.date(Payment.created_at)
+    rows = db.query(
+        day.label("day"),
+        Payment.status,
+        func.count(Payment.id).label("payments"),
+        func.coalesce(func.sum(Payment.amount), 0).label("amount"),
+    ).group_by(day, Payment.status).all()
+    if rows:
+        db.execute(insert(PaymentDailyTotal), [
+            {"day": r.day, "status": _status_value(r.status), "payments": r.payments, "amount": r.amount}
+            for r in rows
+        ])
+
+    mark = db.query(AnalyticsWatermark).filter(AnalyticsWatermark.name == WATERMARK).first()
+    if mark is None:
+        mark = AnalyticsWatermark(name=WATERMARK, last_id=0)
+        db.add(mark)
+    mark.last_seen_at = func.now()
+    db.commit()
+    return {"rows": len(rows)}
+
+
+def _stats(counts: Dict[str, int], total_revenue, revenue_today, revenue_this_month) -> Dict:
+    return {
+        "total_revenue": float(total_revenue or 0),
+        "revenue_today": float(revenue_today or 0),
+        "revenue_this_month": float(revenue_this_month or 0),
+        "total_completed": int(counts.get(PaymentStatus.COMPLETED.value) or 0),
+        "total_pending": int(counts.get(PaymentStatus.PENDING.value) or 0),
+        "total_failed": int(counts.get(PaymentStatus.FAILED.value) or 0),
+        "total_cancelled": int(counts.get(PaymentStatus.CANCELLED.value) or 0),
+    }
+
+
+def payment_stats_from_totals(db: Session, now: datetime) -> Optional[Dict]:
+    """Stats from the daily totals, or None if the table has not been built yet."""
+    if db.query(AnalyticsWatermark.name).filter(AnalyticsWatermark.name == WATERMARK).first() is None:
+        return None
+
+    today = now.date()
+    start_of_month = today.replace(day=1)
+    rows = db.query(
+        PaymentDailyTotal.status,
+        func.sum(PaymentDailyTotal.payments).label("payments"),
+        func.sum(PaymentDailyTotal.amount).label("amount"),
+        func.sum(case((PaymentDailyTotal.day >= today, PaymentDailyTotal.amount), else_=0)).label("today"),
+        func.sum(case((PaymentDailyTotal.day >= start_of_month, PaymentDailyTotal.amount), else_=0)).label("month"),
+    ).group_by(PaymentDailyTotal.status).all()
+
+    counts = {r.status: r.payments for r in rows}
+    completed = next((r for r in rows if r.status == PaymentStatus.COMPLETED.value), None)
+    if completed is None:
+        return _stats(counts, 0, 0, 0)
+    return _stats(counts, completed.amount, completed.today, completed.month)
+
+
+def payment_stats_from_payments(db: Session, now: datetime) -> Dict:
+    """Stats straight from `payments` in a single conditional-aggregation scan."""
+    start_of_today = datetime(now.year, now.month, now.day)
+    start_of_month = datetime(now.year, now.month, 1)
+    completed = Payment.status == PaymentStatus.COMPLETED
+
+    def count(status):
+        return func.sum(case((Payment.status == status, 1), else_=0))
+
+    def revenue(since=None):
+        condition = completed if since is None else and_(completed, Payment.created_at >= since)
+        return func.coalesce(func.sum(case((condition, Payment.amount), else_=0)), 0)
+
+    row = db.query(
+        revenue().label("total"),
+        revenue(start_of_today).label("today"),
+        revenue(start_of_month).label("month"),
+        *(count(status).label(status.value) for status in PaymentStatus),
+    ).one()
+    counts = {status.value: getattr(row, status.value) for status in PaymentStatus}
+    return _stats(counts, row.total, row.today, row.month)
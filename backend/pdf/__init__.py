@@ -0,0 +1,19 @@
+"""
+PDF rendering for schemes of work, lesson plans and records of work.
+
+Styles, table styles and formatting helpers are built once at import; the
+render functions take `pdf_render_service.snapshot_row` copies so they can run
+in the PDF worker pool or a Celery worker.
+"""
+
+from pdf.scheme import render_scheme_pdf
+from pdf.lesson_plan import lesson_plan_flowables, render_lesson_plan_pdf, render_lesson_plans_bulk
+from pdf.record_of_work import render_record_of_work_pdf
+
+__all__ = [
+    "render_scheme_pdf",
+    "lesson_plan_flowables",
+    "render_lesson_plan_pdf",
+    "render_lesson_plans_bulk",
+    "render_record_of_work_pdf",
+]
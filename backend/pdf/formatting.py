@@ -0,0 +1,118 @@
+"""
+Text formatting for PDF cells. Each function turns a stored text field into
+ReportLab paragraph markup.
+"""
+
+OUTCOMES_INTRO = "By the end of the sub-strand, the learner should be able to:"
+_BULLET_CHARS = '•-* '
+
+
+def _capitalize(text: str) -> str:
+    return text[0].upper() + text[1:]
+
+
+def format_learning_outcomes(text) -> str:
+    """Learning outcomes with a, b, c numbering under the standard intro line."""
+    if not text:
+        return ""
+
+    clean_text = text
+    # Remove intro if present to process the list items
+    if clean_text.strip().startswith(OUTCOMES_INTRO):
+        clean_text = clean_text.replace(OUTCOMES_INTRO, "", 1).strip()
+
+    if '\n' in clean_text:
+        parts = [p.strip() for p in clean_text.split('\n') if p.strip()]
+    elif '-' in clean_text:  # If hyphens are used as bullets
+        parts = [p.strip() for p in clean_text.split('-') if p.strip()]
+    else:
+        parts = [clean_text.strip()]
+
+    formatted = [f"<b>{OUTCOMES_INTRO}</b>"]
+    for i, p in enumerate(parts):
+        # Remove any leading bullets just in case
+        p = p.lstrip(_BULLET_CHARS)
+        if p:
+            formatted.append(f"{chr(97 + i)}) {_capitalize(p)}")
+
+    return "<br/>".join(formatted)
+
+
+def format_learning_experiences(text) -> str:
+    """Learning experiences as bullets, split by line or by sentence."""
+    if not text:
+        return ""
+
+    if '\n' in text:
+        parts = text.split('\n')
+    else:
+        parts = [p.strip() for p in text.split('.') if p.strip()]
+
+    formatted = []
+    for p in parts:
+        p = p.strip().lstrip(_BULLET_CHARS)
+        if p:
+            formatted.append(f"• {_capitalize(p)}")
+
+    return "<br/>".join(formatted)
+
+
+def format_resources(text, lesson) -> str:
+    """Comma separated resources as bullets, followed by the lesson's textbook reference."""
+    formatted_parts = []
+
+    if text:
+        for r in (r.strip() for r in text.split(',')):
+            if r:
+                formatted_parts.append(f"• {_capitalize(r)}")
+
+    if lesson.textbook_name:
+        # Add spacing if there are other resources
+        if formatted_parts:
+            formatted_parts.append("<br/>")
+
+        formatted_parts.append("<b>Textbook:</b>")
+        formatted_parts.append(f"{lesson.textbook_name}")
+
+        if lesson.textbook_teacher_guide_pages:
+            formatted_parts.append(f"TG: {lesson.textbook_teacher_guide_pages}")
+        if lesson.textbook_learner_book_pages:
+            formatted_parts.append(f"LB: {lesson.textbook_learner_book_pages}")
+
+    return "<br/>".join(formatted_parts)
+
+
+def format_assessment_methods(text) -> str:
+    if not text:
+        return ""
+    return "<br/>".join(f"• {_capitalize(m)}" for m in (m.strip() for m in text.split(',')) if m)
+
+
+def format_list_items(text) -> str:
+    """Free text or bullets as an a), b), c) list; falls back to the text with line breaks."""
+    if not text:
+        return ""
+
+    if '\n-' in text or '\n•' in text:
+        items = [
+            line.strip().lstrip('-•* ').strip() for line in text.split('\n')
+            if line.strip() and not line.strip().startswith(('By the end', 'The learner'))
+        ]
+    elif '- ' in text:
+        items = [item.strip() for item in text.split('- ') if item.strip()]
+    else:
+        # If comma separated list (and no sentences), split by comma; otherwise by sentence
+        clean_text = text.replace('\n', ' ')
+        if clean_text.count(',') >= 1 and '.' not in clean_text:
+            items = [item.strip() for item in clean_text.split(',') if item.strip()]
+        else:
+            items = [item.strip() for item in text.replace('\n', '. ').split('. ') if item.strip() and len(item.strip()) > 2]
+
+    if not items:
+        return text.replace('\n', '<br/>')
+
+    return '<br/>'.join(f"{chr(97 + i)}) {item}" for i, item in enumerate(items))
+
+
+def multiline(text) -> str:
+    return (text or "").replace('\n', '<br/>')
@@ -0,0 +1,104 @@
+"""
+Lesson plan PDF, single or many plans in one document.
+"""
+
+from io import BytesIO
+
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, Spacer, PageBreak
+
+from pdf import styles
+from pdf.formatting import format_list_items, multiline
+from pdf.templates import portrait_document, divider, info_grid, section_box, side_by_side_boxes
+
+CONTENT_WIDTH = 18*cm
+# 18cm total width, 0.3cm gap
+HALF_WIDTH = 8.85*cm
+
+
+def _section(elements: list, title: str, content, use_list_format: bool = False):
+    if content:
+        markup = format_list_items(content) if use_list_format else multiline(content)
+        elements.append(section_box(title, markup, CONTENT_WIDTH))
+        elements.append(Spacer(1, 0.15*cm))
+
+
+def _side_by_side(elements: list, title1: str, content1, title2: str, content2):
+    if not content1 and not content2:
+        return
+    elements.append(side_by_side_boxes(
+        (title1, format_list_items(content1) if content1 else None),
+        (title2, format_list_items(content2) if content2 else None),
+        HALF_WIDTH,
+    ))
+    elements.append(Spacer(1, 0.15*cm))
+
+
+def lesson_plan_flowables(plan, teacher_name: str) -> list:
+    """
+    Flowables for one lesson plan, shared by the single and bulk PDFs.
+    Runs in a PDF worker process, so `plan` is a `snapshot_row` copy, not an ORM object.
+    """
+    duration = f"{plan.lesson_duration_minutes} min" if plan.lesson_duration_minutes else "Not set"
+
+    elements = [
+        Spacer(1, 0.3*cm),
+        Paragraph("LESSON PLAN", styles.PLAN_TITLE),
+        Paragraph(f"{plan.learning_area or 'Subject'} • {plan.grade or 'Grade'}", styles.PLAN_SUBTITLE),
+        divider(6*cm),
+        Spacer(1, 0.3*cm),
+        info_grid(
+            [
+                [("DATE", plan.date), ("TIME", plan.time), ("DURATION", duration)],
+                [("ROLL", str(plan.roll) if plan.roll else None), ("GRADE", plan.grade), ("TEACHER", teacher_name)],
+            ],
+            col_width=6*cm,
+            label_style=styles.PLAN_LABEL,
+            value_style=styles.PLAN_VALUE,
+            padding=8,
+            border_width=1,
+            spacer=1,
+            side_padding=6,
+        ),
+        Spacer(1, 0.3*cm),
+    ]
+
+    _section(elements, "Strand / Theme", plan.strand_theme_topic)
+    _section(elements, "Sub-strand / Sub-theme", plan.sub_strand_sub_theme_sub_topic)
+    _section(elements, "Specific Learning Outcomes", plan.specific_learning_outcomes, use_list_format=True)
+    _section(elements, "Key Inquiry Questions", plan.key_inquiry_questions)
+    _side_by_side(elements, "Core Competences", plan.core_competences, "Values to be Developed", plan.values_to_be_developed)
+    _side_by_side(elements, "PCIs to be Addressed", plan.pcis_to_be_addressed, "Learning Resources", plan.learning_resources)
+    _section(elements, "Introduction", plan.introduction)
+    _section(elements, "Development (Lesson Steps)", plan.development)
+    _section(elements, "Conclusion", plan.conclusion)
+    _section(elements, "Summary", plan.summary)
+
+    # Reflection is always shown, with room to write
+    elements.append(section_box(
+        "Reflection / Self-Evaluation",
+        plan.reflection_self_evaluation or " ",
+        CONTENT_WIDTH,
+        writing_space=True,
+    ))
+    return elements
+
+
+def render_lesson_plan_pdf(plan, teacher_name: str) -> bytes:
+    pdf_io = BytesIO()
+    portrait_document(pdf_io).build(lesson_plan_flowables(plan, teacher_name))
+    return pdf_io.getvalue()
+
+
+def render_lesson_plans_bulk(plans, teacher_name: str, output_path: str) -> str:
+    """
+    Build one document from every plan's flowables, a page break between plans,
+    and write it straight to `output_path` (worker process).
+    """
+    elements = []
+    for i, plan in enumerate(plans):
+        if i:
+            elements.append(PageBreak())
+        elements.extend(lesson_plan_flowables(plan, teacher_name))
+    portrait_document(output_path).build(elements)
+    return output_path
@@ -0,0 +1,86 @@
+"""
+Record of work PDF.
+"""
+
+from io import BytesIO
+
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, Spacer, LongTable, TableStyle
+
+from pdf import styles
+from pdf.formatting import multiline
+from pdf.templates import landscape_document, divider, info_grid
+
+HEADERS = ['WEEK', 'STRAND', 'SUB-STRAND / TOPIC', 'WORK COVERED', 'DATE TAUGHT', 'REFLECTION', 'SIGNATURE']
+COLUMN_WIDTHS = [1.2*cm, 3.5*cm, 4.0*cm, 9.0*cm, 2.4*cm, 6.0*cm, 2.6*cm]
+
+_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), styles.SLATE_800),
+    ('GRID', (0, 0), (-1, -1), 0.5, styles.SLATE_300),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 2),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ('ALIGN', (0, 1), (0, -1), 'CENTER'),
+])
+
+
+def _work_covered(entry) -> str:
+    outcomes = [
+        entry.learning_outcome_a, entry.learning_outcome_b,
+        entry.learning_outcome_c, entry.learning_outcome_d,
+    ]
+    return "<br/>".join(
+        f"{letter}) {multiline(text)}"
+        for letter, text in zip("abcd", outcomes) if text
+    )
+
+
+def render_record_of_work_pdf(record) -> bytes:
+    """
+    Build the record of work PDF (worker process). `record` is a `snapshot_row`
+    copy with `entries` attached.
+    """
+    cell = styles.TABLE_CELL
+    table_data = [[Paragraph(header, styles.TABLE_HEADER) for header in HEADERS]]
+    for entry in sorted(record.entries, key=lambda e: (e.week_number, e.id)):
+        table_data.append([
+            Paragraph(f"<b>{entry.week_number}</b>", cell),
+            Paragraph(entry.strand or "", cell),
+            Paragraph(entry.topic or "", cell),
+            Paragraph(_work_covered(entry), cell),
+            Paragraph(entry.date_taught.strftime('%d %b %Y') if entry.date_taught else "", cell),
+            Paragraph(multiline(entry.reflection), cell),
+            Paragraph(entry.signature or "", cell),
+        ])
+
+    table = LongTable(table_data, colWidths=COLUMN_WIDTHS, repeatRows=1, splitByRow=1)
+    table.setStyle(_TABLE_STYLE)
+    table.hAlign = 'LEFT'
+
+    elements = [
+        Spacer(1, 0.5*cm),
+        Paragraph("RECORD OF WORK", styles.PLAN_TITLE),
+        Paragraph(f"{record.learning_area or 'Subject'} • {record.grade or 'Grade'}", styles.PLAN_SUBTITLE),
+        divider(8*cm),
+        Spacer(1, 0.4*cm),
+        info_grid(
+            [[
+                ("TEACHER", record.teacher_name), ("SCHOOL", record.school_name),
+                ("TERM", record.term), ("YEAR", str(record.year) if record.year else None),
+            ]],
+            col_width=6.5*cm,
+            label_style=styles.PLAN_LABEL,
+            value_style=styles.PLAN_VALUE,
+            padding=6,
+            border_width=1,
+            spacer=1,
+        ),
+        Spacer(1, 0.4*cm),
+        table,
+    ]
+
+    pdf_io = BytesIO()
+    landscape_document(pdf_io).build(elements)
+    return pdf_io.getvalue()
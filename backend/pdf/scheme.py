@@ -0,0 +1,125 @@
+"""
+Scheme of work PDF.
+"""
+
+from datetime import timedelta
+from io import BytesIO
+
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, Spacer, PageBreak, LongTable, TableStyle
+
+from pdf import styles
+from pdf.formatting import (
+    format_learning_outcomes, format_learning_experiences, format_resources, format_assessment_methods
+)
+from pdf.templates import landscape_document, divider, info_grid
+
+HEADERS = [
+    'WEEK', 'LESSON', 'STRAND', 'SUB-STRAND',
+    'Specific Learning Outcomes', 'Suggested Key Inquiry Question(s)', 'Suggested Learning Experiences',
+    'RESOURCES', 'ASSESSMENT', 'REFLECTION',
+]
+
+# Week, Lesson, Strand, Sub-strand, Outcomes, Questions, Experiences, Resources, Assessment, Reflection
+# Fills landscape A4 (~29.0cm) while keeping the right border from being clipped
+COLUMN_WIDTHS = [0.8*cm, 0.8*cm, 2.2*cm, 2.8*cm, 5.5*cm, 3.5*cm, 6.3*cm, 3.0*cm, 2.8*cm, 1.3*cm]
+
+_TABLE_COMMANDS = [
+    ('BACKGROUND', (0, 0), (-1, 0), styles.SLATE_800),  # Dark Slate Header
+
+    # Grid for columns 1 to end (Lesson onwards) - draws all lines
+    ('GRID', (1, 0), (-1, -1), 0.5, styles.SLATE_300),
+
+    # Vertical lines for Week column; horizontal ones are added per week
+    ('LINEBEFORE', (0, 0), (0, -1), 0.5, styles.SLATE_300),
+    ('LINEAFTER', (0, 0), (0, -1), 0.5, styles.SLATE_300),
+    ('LINEABOVE', (0, 0), (0, 0), 0.5, styles.SLATE_300),
+    ('LINEBELOW', (0, 0), (0, 0), 0.5, styles.SLATE_300),
+
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    # Reduced padding to fit more content
+    ('LEFTPADDING', (0, 0), (-1, -1), 2),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ('ALIGN', (0, 1), (1, -1), 'CENTER'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+]
+
+
+def scheme_cover(scheme) -> list:
+    return [
+        Spacer(1, 3*cm),  # Vertical centering
+        Paragraph("SCHEME OF WORK", styles.SCHEME_TITLE),
+        Paragraph(f"{scheme.subject} • {scheme.grade}", styles.SCHEME_SUBTITLE),
+        divider(10*cm),
+        Spacer(1, 2*cm),
+        info_grid(
+            [
+                [("TEACHER", scheme.teacher_name), ("TERM", scheme.term), ("TOTAL WEEKS", str(scheme.total_weeks))],
+                [("SCHOOL", scheme.school), ("YEAR", str(scheme.year)), ("TOTAL LESSONS", str(scheme.total_lessons))],
+            ],
+            col_width=7*cm,
+            label_style=styles.SCHEME_LABEL,
+            value_style=styles.SCHEME_VALUE,
+            padding=20,
+            border_width=1.5,
+            spacer=3,
+        ),
+        PageBreak(),
+    ]
+
+
+def scheme_table(scheme, term_start_date=None) -> LongTable:
+    cell = styles.TABLE_CELL
+    table_data = [[Paragraph(header, styles.TABLE_HEADER) for header in HEADERS]]
+
+    # Week cells are not merged (row spans cause LayoutError on page breaks);
+    # a line under each week's last row groups them instead
+    current_row_index = 1  # Start after header row
+    week_col_lines = []
+
+    for week in sorted(scheme.weeks, key=lambda w: w.week_number):
+        week_lessons = sorted(week.lessons, key=lambda l: l.lesson_number)
+
+        week_date_str = ""
+        if term_start_date:
+            week_start = term_start_date + timedelta(days=(week.week_number - 1) * 7)
+            week_end = week_start + timedelta(days=4)
+            week_date_str = f"<br/><font size=6 color='#64748b'>{week_start.strftime('%d %b')} - {week_end.strftime('%d %b')}</font>"
+
+        if week_lessons:
+            end_row = current_row_index + len(week_lessons) - 1
+            week_col_lines.append(('LINEBELOW', (0, end_row), (0, end_row), 0.5, styles.SLATE_400))
+
+        for i, lesson in enumerate(week_lessons):
+            # Only show week number in the first row of the week
+            week_text = f"<b>{week.week_number}</b>{week_date_str}" if i == 0 else ""
+            table_data.append([
+                Paragraph(week_text, cell),
+                Paragraph(str(lesson.lesson_number), cell),
+                Paragraph(lesson.strand or "", cell),
+                Paragraph(lesson.sub_strand or "", cell),
+                Paragraph(format_learning_outcomes(lesson.specific_learning_outcomes), cell),
+                Paragraph(lesson.key_inquiry_questions or "", cell),
+                Paragraph(format_learning_experiences(lesson.learning_experiences or ""), cell),
+                Paragraph(format_resources(lesson.learning_resources, lesson), cell),
+                Paragraph(format_assessment_methods(lesson.assessment_methods), cell),
+                Paragraph(lesson.reflection or "", cell),
+            ])
+            current_row_index += 1
+
+    main_table = LongTable(table_data, colWidths=COLUMN_WIDTHS, repeatRows=1, splitByRow=1)
+    main_table.setStyle(TableStyle(_TABLE_COMMANDS + week_col_lines))
+    main_table.hAlign = 'LEFT'
+    return main_table
+
+
+def render_scheme_pdf(scheme, term_start_date=None) -> bytes:
+    """
+    Build the scheme of work PDF. Runs in a PDF worker process, so `scheme` is a
+    `snapshot_row` copy with `weeks` (each with `lessons`) attached.
+    """
+    pdf_io = BytesIO()
+    landscape_document(pdf_io).build(scheme_cover(scheme) + [scheme_table(scheme, term_start_date)])
+    return pdf_io.getvalue()
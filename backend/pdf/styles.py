@@ -0,0 +1,43 @@
+"""
+Shared colours and paragraph styles for generated documents.
+
+Built once at import so renders don't call getSampleStyleSheet() or parse hex
+colours per document.
+"""
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+# Palette
+SLATE_900 = colors.HexColor('#0f172a')
+SLATE_800 = colors.HexColor('#1e293b')
+SLATE_700 = colors.HexColor('#334155')
+SLATE_500 = colors.HexColor('#64748b')
+SLATE_400 = colors.HexColor('#94a3b8')
+SLATE_300 = colors.HexColor('#cbd5e1')
+SLATE_50 = colors.HexColor('#f8fafc')
+GRAY_700 = colors.HexColor('#374151')
+GRAY_200 = colors.HexColor('#e5e7eb')
+BLUE_800 = colors.HexColor('#1e40af')
+INDIGO_600 = colors.HexColor('#4F46E5')
+WHITE = colors.white
+
+_base = getSampleStyleSheet()
+
+# Scheme of work (landscape, dense table)
+SCHEME_TITLE = ParagraphStyle('SchemeTitle', parent=_base['Heading1'], fontName='Helvetica-Bold', fontSize=36, textColor=SLATE_800, alignment=TA_CENTER, spaceAfter=12, leading=42)
+SCHEME_SUBTITLE = ParagraphStyle('SchemeSubtitle', parent=_base['Normal'], fontName='Helvetica', fontSize=18, textColor=SLATE_500, alignment=TA_CENTER, spaceAfter=30, leading=24)
+SCHEME_LABEL = ParagraphStyle('SchemeLabel', parent=_base['Normal'], fontName='Helvetica-Bold', fontSize=9, textColor=SLATE_500, alignment=TA_CENTER, leading=12)
+SCHEME_VALUE = ParagraphStyle('SchemeValue', parent=_base['Normal'], fontName='Helvetica', fontSize=14, textColor=SLATE_900, alignment=TA_CENTER, leading=18)
+# Reduced font size to 8 and leading to 10 to fit more content
+TABLE_CELL = ParagraphStyle('TableCell', parent=_base['Normal'], fontName='Helvetica', fontSize=8, leading=10, spaceBefore=1, spaceAfter=1, textColor=SLATE_700)
+TABLE_HEADER = ParagraphStyle('TableHeader', parent=_base['Normal'], fontSize=8, textColor=WHITE, fontName='Helvetica-Bold', leading=10, alignment=TA_CENTER)
+
+# Lesson plan (portrait, sectioned)
+PLAN_TITLE = ParagraphStyle('PlanTitle', parent=_base['Heading1'], fontName='Helvetica-Bold', fontSize=24, textColor=SLATE_800, alignment=TA_CENTER, spaceAfter=4, leading=28)
+PLAN_SUBTITLE = ParagraphStyle('PlanSubtitle', parent=_base['Normal'], fontName='Helvetica-Oblique', fontSize=12, textColor=SLATE_500, alignment=TA_CENTER, spaceAfter=8, leading=16)
+PLAN_LABEL = ParagraphStyle('PlanLabel', parent=_base['Normal'], fontName='Helvetica-Bold', fontSize=8, textColor=SLATE_500, alignment=TA_CENTER, leading=10)
+PLAN_VALUE = ParagraphStyle('PlanValue', parent=_base['Normal'], fontName='Helvetica', fontSize=10, textColor=SLATE_900, alignment=TA_CENTER, leading=12)
+SECTION_TITLE = ParagraphStyle('SectionTitle', parent=_base['Heading2'], fontName='Helvetica-Bold', fontSize=10, textColor=BLUE_800, spaceBefore=5, spaceAfter=3, leading=12)
+BODY = ParagraphStyle('Body', parent=_base['Normal'], fontName='Helvetica', fontSize=9, textColor=GRAY_700, leading=11, spaceAfter=4)
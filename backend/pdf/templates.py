@@ -0,0 +1,106 @@
+"""
+Page templates and building blocks shared by the document renderers.
+"""
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from pdf import styles
+
+# Table styles that don't depend on the data, built once
+_DIVIDER_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), styles.INDIGO_600),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+])
+
+_SECTION_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('BOX', (0, 0), (-1, -1), 0.5, styles.GRAY_200),
+    ('BACKGROUND', (0, 0), (-1, -1), styles.WHITE),
+])
+
+_WRITING_SECTION_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 20),  # Extra space for writing
+    ('BOX', (0, 0), (-1, -1), 0.5, styles.GRAY_200),
+    ('BACKGROUND', (0, 0), (-1, -1), styles.WHITE),
+])
+
+_SIDE_BY_SIDE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('BOX', (0, 0), (0, 0), 0.5, styles.GRAY_200),
+    ('BOX', (1, 0), (1, 0), 0.5, styles.GRAY_200),
+    ('BACKGROUND', (0, 0), (-1, -1), styles.WHITE),
+])
+
+
+def landscape_document(target) -> SimpleDocTemplate:
+    """Landscape A4 with narrow margins, for wide tables (schemes, records of work)."""
+    return SimpleDocTemplate(target, pagesize=landscape(A4), leftMargin=0.25*cm, rightMargin=0.25*cm, topMargin=0.25*cm, bottomMargin=0.25*cm)
+
+
+def portrait_document(target) -> SimpleDocTemplate:
+    """Portrait A4, for lesson plans."""
+    return SimpleDocTemplate(target, pagesize=A4, leftMargin=0.8*cm, rightMargin=0.8*cm, topMargin=0.6*cm, bottomMargin=0.6*cm)
+
+
+def divider(width) -> Table:
+    line_table = Table([[""]], colWidths=[width], rowHeights=[2])
+    line_table.setStyle(_DIVIDER_STYLE)
+    return line_table
+
+
+def info_grid(rows, col_width, label_style, value_style, padding: int, border_width: float, spacer: int, side_padding: int = 10) -> Table:
+    """
+    Boxed grid of LABEL / value cells used on document headers.
+    `rows` is a list of rows of (label, value) pairs.
+    """
+    data = [
+        [[Paragraph(label, label_style), Spacer(1, spacer), Paragraph(value or "-", value_style)] for label, value in row]
+        for row in rows
+    ]
+    table = Table(data, colWidths=[col_width] * len(rows[0]))
+    table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), padding),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+        ('LEFTPADDING', (0, 0), (-1, -1), side_padding),
+        ('RIGHTPADDING', (0, 0), (-1, -1), side_padding),
+        ('LINEAFTER', (0, 0), (-2, -1), 0.5, styles.SLATE_300),  # Vertical lines between cols
+        ('LINEBELOW', (0, 0), (-1, -2), 0.5, styles.SLATE_300),  # Horizontal lines between rows
+        ('BOX', (0, 0), (-1, -1), border_width, styles.SLATE_400),
+        ('BACKGROUND', (0, 0), (-1, -1), styles.SLATE_50),
+    ]))
+    return table
+
+
+def section_box(title: str, markup: str, width, writing_space: bool = False) -> Table:
+    table = Table([[[Paragraph(title, styles.SECTION_TITLE), Paragraph(markup, styles.BODY)]]], colWidths=[width])
+    table.setStyle(_WRITING_SECTION_STYLE if writing_space else _SECTION_STYLE)
+    return table
+
+
+def side_by_side_boxes(left, right, col_width) -> Table:
+    """Two boxed cells in one row; `left`/`right` are (title, markup or None)."""
+    cells = []
+    for title, markup in (left, right):
+        cell = [Paragraph(title, styles.SECTION_TITLE)]
+        if markup:
+            cell.append(Paragraph(markup, styles.BODY))
+        cells.append(cell)
+    table = Table([cells], colWidths=[col_width, col_width])
+    table.setStyle(_SIDE_BY_SIDE_STYLE)
+    return table
@@ -0,0 +1,136 @@
+"""
+Rendered PDF Cache
+Keeps rendered documents on local disk, keyed by document kind and id plus a
+content version. The version is a hash of whatever the PDF is rendered from
+(row timestamps, header context), so an edited document never matches an old
+file. Eviction is least-recently-used once the directory exceeds its size
+budget; edits and deletes also drop a document's files explicitly.
+"""
+
+import glob
+import hashlib
+import os
+import uuid
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from config import settings
+
+# Bump when a PDF layout changes so previously rendered files stop matching
+TEMPLATE_VERSION = 1
+
+
+def content_version(*parts) -> str:
+    """Short stable hash of the values a rendered document depends on."""
+    digest = hashlib.sha1("|".join(str(p) for p in (TEMPLATE_VERSION, *parts)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class PdfCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, kind: str, doc_id: int, version: str) -> str:
+        return os.path.join(self.directory, f"{kind}_{doc_id}_{version}.pdf")
+
+    @staticmethod
+    def etag(kind: str, doc_id: int, version: str) -> str:
+        return f'"{kind}-{doc_id}-{version}"'
+
+    def get(self, kind: str, doc_id: int, version: str) -> Optional[str]:
+        """Path of the cached file, or None. A hit refreshes the file's LRU position."""
+        path = self._path(kind, doc_id, version)
+        try:
+            os.utime(path)
+            return path
+        except OSError:
+            return None
+
+    def put(self, kind: str, doc_id: int, version: str, pdf_bytes: bytes) -> Optional[str]:
+        """Store a rendered PDF, replacing older versions of the same document."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.invalidate(kind, doc_id)
+            path = self._path(kind, doc_id, version)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, path)
+            self._evict()
+            return path
+        except OSError as e:
+            print(f"PDF cache write error: {e}")
+            return None
+
+    def invalidate(self, kind: str, doc_id: int) -> int:
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, f"{kind}_{doc_id}_*.pdf")):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".pdf"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+        # Oldest access first
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+            if total <= self.max_bytes:
+                break
+
+
+pdf_cache = PdfCache(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_MB * 1024 * 1024)
+
+
+async def cached_pdf_response(
+    request: Request,
+    kind: str,
+    doc_id: int,
+    version: str,
+    filename: str,
+    render,
+) -> Response:
+    """
+    Serve a PDF from the cache when possible.
+
+    Returns 304 when the client's If-None-Match matches, streams the cached file
+    on a hit, and otherwise awaits `render()` (a coroutine function returning
+    the PDF bytes) and caches the result.
+    """
+    etag = PdfCache.etag(kind, doc_id, version)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename={filename}",
+    }
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+    path = pdf_cache.get(kind, doc_id, version)
+    if path:
+        return FileResponse(path, media_type="application/pdf", headers=headers)
+
+    pdf_bytes = await render()
+    pdf_cache.put(kind, doc_id, version, pdf_bytes)
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
@@ -0,0 +1,146 @@
+"""
+PDF Rendering Service
+Runs ReportLab document builds in a dedicated process pool so CPU-heavy
+renders never block the API event loop. Admission is bounded: requests are
+queued per user and dispatched round-robin across users, and when the queue
+(or a user's share of it) is full the request is rejected straight away with
+429 and a Retry-After estimate.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+from config import settings
+
+
+def snapshot_row(obj, **relations) -> SimpleNamespace:
+    """
+    Picklable copy of an ORM row's column values for use in a worker process.
+    Loaded relationships can be attached as keyword arguments.
+    """
+    values = {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+    values.update(relations)
+    return SimpleNamespace(**values)
+
+
+class PdfRenderService:
+    def __init__(self, workers: int, max_pending: int, max_pending_per_user: int):
+        self.workers = max(workers, 1)
+        self.max_pending = max(max_pending, self.workers)
+        self.max_pending_per_user = max(max_pending_per_user, 1)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # user_id -> deque of (future, func, args); insertion order is the round-robin order
+        self._queues: "OrderedDict[int, deque]" = OrderedDict()
+        self._per_user = Counter()
+        self._pending = 0
+        self._running = 0
+        self._avg_seconds = 2.0  # Moving average of render time, used for Retry-After
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: workers must not inherit the server's DB connections or event loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def retry_after_seconds(self) -> int:
+        return max(1, math.ceil(self._avg_seconds * self._pending / self.workers))
+
+    def _reject(self, detail: str):
+        raise HTTPException(
+            status_code=429,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after_seconds())}
+        )
+
+    async def render(self, user_id: int, func: Callable, *args) -> bytes:
+        """
+        Run `func(*args)` in the pool and return its result (the PDF bytes).
+
+        `func` must be a module-level function and `args` picklable; pass
+        `snapshot_row` copies rather than ORM objects.
+        """
+        if self._pending >= self.max_pending:
+            self._reject("PDF service is busy. Please try again shortly.")
+        if self._per_user[user_id] >= self.max_pending_per_user:
+            self._reject("You already have PDFs being prepared. Please wait for them to finish.")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending += 1
+        self._per_user[user_id] += 1
+        self._queues.setdefault(user_id, deque()).append((future, func, args))
+        self._dispatch(loop)
+
+        try:
+            return await future
+        finally:
+            self._pending -= 1
+            self._per_user[user_id] -= 1
+            if self._per_user[user_id] <= 0:
+                del self._per_user[user_id]
+
+    def _dispatch(self, loop):
+        while self._running < self.workers and self._queues:
+            user_id, queue = next(iter(self._queues.items()))
+            future, func, args = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+
+            if future.done():
+                # Client went away while queued
+                continue
+
+            self._running += 1
+            started = time.monotonic()
+            try:
+                job = loop.run_in_executor(self._get_executor(), func, *args)
+            except BrokenProcessPool as e:
+                # A worker died; start a fresh pool for the next render
+                self._running -= 1
+                self._executor = None
+                future.set_exception(e)
+                continue
+            job.add_done_callback(
+                lambda done, target=future, started=started: self._finished(loop, done, target, started)
+            )
+
+    def _finished(self, loop, done, target, started: float):
+        self._running -= 1
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.monotonic() - started)
+        if not target.done():
+            if done.cancelled():
+                target.cancel()
+            elif done.exception() is not None:
+                if isinstance(done.exception(), BrokenProcessPool):
+                    self._executor = None
+                target.set_exception(done.exception())
+            else:
+                target.set_result(done.result())
+        self._dispatch(loop)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pdf_renderer = PdfRenderService(
+    workers=settings.PDF_RENDER_WORKERS,
+    max_pending=settings.PDF_RENDER_QUEUE_SIZE,
+    max_pending_per_user=settings.PDF_RENDER_QUEUE_PER_USER,
+)
@@ -1,28 +1,191 @@
-from fastapi import Request, HTTPException
+"""
+Rate Limiter
+Token buckets shared by every worker through Redis. Each route class has a
+limit of "requests/seconds" (RATE_LIMITS): a bucket holds `requests` tokens
+and refills at requests/seconds per second, so short bursts up to the limit
+pass and sustained traffic is held to the average rate.
+
+A bucket is one small hash updated by an atomic Lua script that reads the
+clock on the Redis server, so workers with drifting clocks agree. It expires
+once it would have refilled, so idle clients cost nothing and memory stays
+proportional to the clients active within one window.
+
+Callers are identified by the user in their access token when there is one,
+otherwise by client IP. Credential routes (IP_KEYED_CLASSES) are always keyed
+by client IP: a token must not buy a fresh bucket per account there. Behind
+nginx the peer address is the proxy, so the forwarded headers are used when
+(and only when) the peer is a trusted proxy.
+
+If Redis is unavailable each worker falls back to its own buckets, capped at
+RATE_LIMIT_LOCAL_MAX_KEYS entries (least recently used dropped first).
+"""
+
+import hashlib
+import ipaddress
+import math
+import threading
 import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, HTTPException
+
+from auth import verify_token
+from cache_manager import cache
+from config import settings
+
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * capacity / window_ms)
+
+local retry_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_ms = math.ceil((1 - tokens) * window_ms / capacity)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], window_ms)
+return retry_ms
+"""
+
+
+def _parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    limits = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        try:
+            name, rate = entry.split("=", 1)
+            requests, seconds = rate.split("/", 1)
+            limits[name.strip()] = (int(requests), int(seconds))
+        except ValueError:
+            print(f"[WARN] Ignoring malformed rate limit '{entry.strip()}'")
+    return limits
+
+
+def _parse_networks(spec: str):
+    networks = []
+    for entry in spec.split(","):
+        if entry.strip():
+            try:
+                networks.append(ipaddress.ip_network(entry.strip(), strict=False))
+            except ValueError:
+                print(f"[WARN] Ignoring malformed trusted proxy '{entry.strip()}'")
+    return networks
+
+
+ROUTE_LIMITS = _parse_limits(settings.RATE_LIMITS)
+IP_KEYED_CLASSES = {"auth"}
+TRUSTED_PROXIES = _parse_networks(settings.RATE_LIMIT_TRUSTED_PROXIES)
 
-# Simple in-memory store: {ip: [timestamps]}
-request_history = {}
 
-def rate_limiter(limit: int = 5, window_seconds: int = 60):
+def _is_trusted_proxy(address: Optional[str]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """The caller's address, looking through trusted proxies."""
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted_proxy(peer):
+        return peer
+
+    real_ip = request.headers.get("x-real-ip", "").strip()
+    if real_ip:
+        return real_ip
+    # Each proxy appends the address it saw; the first untrusted one from the right is the client
+    forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return forwarded[0] if forwarded else peer
+
+
+def _identity(request: Request, route_class: str) -> str:
+    if route_class in IP_KEYED_CLASSES:
+        return "ip:" + client_ip(request)
+    token = request.cookies.get("access_token")
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip() or token
+    email = verify_token(token) if token else None
+    if email:
+        # Hashed so keys stay short and emails stay out of Redis
+        return "user:" + hashlib.sha1(email.lower().encode()).hexdigest()[:20]
+    return "ip:" + client_ip(request)
+
+
+class _LocalBuckets:
+    """Per-process token buckets, used only while Redis is unavailable."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, monotonic seconds)
+        self.lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, window_seconds: int) -> float:
+        now = time.monotonic()
+        with self.lock:
+            tokens, ts = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * capacity / window_seconds)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) * window_seconds / capacity
+            self.buckets[key] = (tokens, now)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return retry_after
+
+
+_local = _LocalBuckets(settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+_script = None
+
+
+def _take(key: str, capacity: int, window_seconds: int) -> float:
+    """Take a token from `key`; returns 0 if allowed, else seconds until one is available."""
+    global _script
+    client = cache.redis_client if cache.cache_enabled else None
+    if client is not None:
+        try:
+            if _script is None:
+                _script = client.register_script(TOKEN_BUCKET_LUA)
+            retry_ms = _script(keys=[key], args=[capacity, window_seconds * 1000])
+            return int(retry_ms) / 1000
+        except Exception as e:
+            print(f"[WARN] Rate limiter falling back to local buckets: {e}")
+    return _local.take(key, capacity, window_seconds)
+
+
+def rate_limiter(route_class: str):
     """
-    Rate limiter dependency.
-    limit: Max requests allowed in the window.
-    window_seconds: Time window in seconds.
+    Rate limiter dependency for the routes in `route_class`
+    (a key of RATE_LIMITS). Unknown classes are not limited.
     """
     def dependency(request: Request):
-        client_ip = request.client.host
-        now = time.time()
-        
-        if client_ip not in request_history:
-            request_history[client_ip] = []
-            
-        # Clean up old requests
-        request_history[client_ip] = [t for t in request_history[client_ip] if now - t < window_seconds]
-        
-        if len(request_history[client_ip]) >= limit:
-            raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
-            
-        request_history[client_ip].append(now)
-        
+        limit = ROUTE_LIMITS.get(route_class)
+        if not settings.RATE_LIMIT_ENABLED or not limit:
+            return
+        capacity, window_seconds = limit
+        retry_after = _take(f"ratelimit:{route_class}:{_identity(request, route_class)}", capacity, window_seconds)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
     return dependency
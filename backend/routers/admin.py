@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
+from sqlalchemy import func, select, union
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from database import get_db
 from models import (
@@ -20,6 +20,11 @@ from schemas import (
 from dependencies import get_current_user, get_current_super_admin, get_current_admin_user
 from config import settings
 from cache_manager import cache
+from live_counters import live_snapshot, track_signup
+from dashboard_snapshot import mark_dashboard_stale
+from payment_totals import payment_stats_from_totals, payment_stats_from_payments
+from admin_listing import keyset_page, cursor_for, search_clause, cached_total
+from admin_exports import stream_export, users_export, payments_export, schools_export
 from auth import create_access_token, get_password_hash
 import logging
 import traceback
@@ -84,6 +89,7 @@ class AdminPaymentsResponse(BaseModel):
     page: int
     limit: int
     total: int
+    next_cursor: Optional[str] = None
 
 
 class AdminPaymentStatsResponse(BaseModel):
@@ -105,6 +111,7 @@ router = APIRouter(
 def list_payments(
     page: int = 1,
     limit: int = 25,
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     q: Optional[str] = None,
     start_date: Optional[str] = None,
@@ -112,7 +119,9 @@ def list_payments(
     current_user: User = Depends(get_current_super_admin),
     db: Session = Depends(get_db),
 ):
-    """List payment transactions (Super Admin only)."""
+    """List payment transactions, newest first (Super Admin only).
+    Pass the previous response's `next_cursor` as `cursor` for the next page;
+    `page` still works but costs more the deeper it goes."""
     page = max(page, 1)
     limit = max(min(limit, 100), 1)
 
@@ -130,17 +139,18 @@ def list_payments(
             raise HTTPException(status_code=400, detail=f"Invalid status. Allowed: {sorted(list(allowed))}")
         query = query.filter(Payment.status == status_upper)
 
-    if q:
-        q_like = f"%{q.strip()}%"
-        query = query.filter(
-            or_(
-                Payment.phone_number.ilike(q_like),
-                Payment.transaction_code.ilike(q_like),
-                Payment.checkout_request_id.ilike(q_like),
-                User.email.ilike(q_like),
-                User.full_name.ilike(q_like),
-            )
-        )
+    if q and q.strip():
+        # Each table's FULLTEXT index finds its matches; the union of matching
+        # payment ids is materialized once and joined by primary key, instead of
+        # an OR across two tables that would scan payments
+        matching_users = select(User.id).where(search_clause(db, q, User.email, User.full_name, User.phone))
+        matches = union(
+            select(Payment.id).where(
+                search_clause(db, q, Payment.phone_number, Payment.transaction_code, Payment.checkout_request_id)
+            ),
+            select(Payment.id).where(Payment.user_id.in_(matching_users)),
+        ).subquery()
+        query = query.filter(Payment.id.in_(select(matches.c.id)))
 
     # Date filters (ISO date: YYYY-MM-DD)
     def _parse_date(value: Optional[str]) -> Optional[datetime]:
@@ -164,13 +174,19 @@ def list_payments(
             end_dt = end_dt + timedelta(days=1)
         query = query.filter(Payment.created_at < end_dt)
 
-    total = query.count()
-    items = (
-        query.order_by(Payment.created_at.desc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-        .all()
+    total = cached_total(
+        query, "payments", status=status, q=q, start_date=start_date, end_date=end_date
     )
+    if cursor:
+        items, next_cursor = keyset_page(query, Payment.created_at, Payment.id, cursor, limit)
+    else:
+        items = (
+            query.order_by(Payment.created_at.desc(), Payment.id.desc())
+            .offset((page - 1) * limit)
+            .limit(limit)
+            .all()
+        )
+        next_cursor = cursor_for(items, limit)
 
     def to_item(p: Payment) -> dict:
         return {
@@ -198,9 +214,31 @@ def list_payments(
         "page": page,
         "limit": limit,
         "total": total,
+        "next_cursor": next_cursor,
     }
 
 
+@router.get("/payments/export")
+def export_payments(
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: str = "csv",
+    current_user: User = Depends(get_current_super_admin),
+    db: Session = Depends(get_db),
+):
+    """Stream payments as CSV (default) or NDJSON; the date range is inclusive (Super Admin only)."""
+    if status and status.upper() not in {s.value for s in PaymentStatus}:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Allowed: {sorted(s.value for s in PaymentStatus)}")
+    export = payments_export(
+        db,
+        status=status,
+        start_date=datetime.combine(start_date, datetime.min.time()) if start_date else None,
+        end_date=datetime.combine(end_date + timedelta(days=1), datetime.min.time()) if end_date else None,
+    )
+    return stream_export("payments", export, format)
+
+
 @router.get("/payments/stats", response_model=AdminPaymentStatsResponse)
 @cache.cache_response(key_prefix="admin_payment_stats", ttl=300)
 def payment_stats(
@@ -209,46 +247,16 @@ def payment_stats(
 ):
     """Aggregate payment stats (Super Admin only)."""
     now = datetime.utcnow()
-    start_of_today = datetime(now.year, now.month, now.day)
-    start_of_month = datetime(now.year, now.month, 1)
-
-    completed = PaymentStatus.COMPLETED
-
-    total_revenue = (
-        db.query(func.coalesce(func.sum(Payment.amount), 0))
-        .filter(Payment.status == completed)
-        .scalar()
-        or 0
-    )
-    revenue_today = (
-        db.query(func.coalesce(func.sum(Payment.amount), 0))
-        .filter(Payment.status == completed)
-        .filter(Payment.created_at >= start_of_today)
-        .scalar()
-        or 0
-    )
-    revenue_this_month = (
-        db.query(func.coalesce(func.sum(Payment.amount), 0))
-        .filter(Payment.status == completed)
-        .filter(Payment.created_at >= start_of_month)
-        .scalar()
-        or 0
-    )
-
-    total_completed = db.query(Payment.id).filter(Payment.status == PaymentStatus.COMPLETED).count()
-    total_pending = db.query(Payment.id).filter(Payment.status == PaymentStatus.PENDING).count()
-    total_failed = db.query(Payment.id).filter(Payment.status == PaymentStatus.FAILED).count()
-    total_cancelled = db.query(Payment.id).filter(Payment.status == PaymentStatus.CANCELLED).count()
-
-    return {
-        "total_revenue": float(total_revenue),
-        "revenue_today": float(revenue_today),
-        "revenue_this_month": float(revenue_this_month),
-        "total_completed": total_completed,
-        "total_pending": total_pending,
-        "total_failed": total_failed,
-        "total_cancelled": total_cancelled,
-    }
+    stats = payment_stats_from_totals(db, now)
+    if stats is None:
+        # Daily totals not built yet; answer with one scan of payments and have them built
+        stats = payment_stats_from_payments(db, now)
+        try:
+            from celery_app import reconcile_payment_totals
+            reconcile_payment_totals.delay()
+        except Exception as e:
+            print(f"[WARN] Could not queue payment totals rebuild: {e}")
+    return stats
 
 
 @router.get("/pricing-config")
@@ -308,11 +316,36 @@ def update_pricing_config_admin(
 # ============================================================================
 
 @router.get("/stats")
-@cache.cache_response(key_prefix="admin_stats", ttl=300)
 def get_platform_stats(
+    live: bool = False,
     current_user: User = Depends(get_current_super_admin),
     db: Session = Depends(get_db)
 ):
+    """Platform totals. `live` answers from the Redis counters instead of SQL
+    (approximate between reconciliations); falls back to SQL when they are unavailable."""
+    if live:
+        snapshot = live_snapshot()
+        if snapshot:
+            totals = snapshot["totals"]
+            return {
+                "total_users": totals["users"],
+                "total_teachers": totals["teachers"],
+                "total_school_admins": totals["school_admins"],
+                "total_schools": totals["schools"],
+                "total_subjects": totals["subjects"],
+                "subscriptions": {
+                    "basic": totals["basic"],
+                    "premium": totals["premium"],
+                    "school_sponsored": totals["school_sponsored"]
+                },
+                "live": True,
+                "reconciled_at": snapshot["reconciled_at"]
+            }
+    # The cache key only covers the user, so the live branch stays outside it
+    return _platform_stats_from_sql(current_user=current_user, db=db)
+
+@cache.cache_response(key_prefix="admin_stats", ttl=300)
+def _platform_stats_from_sql(current_user: User, db: Session):
     total_users = db.query(User).count()
     total_schools = db.query(School).count()
     total_subjects = db.query(Subject).count()
@@ -343,6 +376,7 @@ def get_platform_stats(
 def get_all_schools(
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     subscription_status: Optional[str] = None,
     sort_by: str = "name",
@@ -350,49 +384,71 @@ def get_all_schools(
     current_user: User = Depends(get_current_super_admin),
     db: Session = Depends(get_db)
 ):
+    """Schools with their teacher counts. With `cursor` (a previous `next_cursor`)
+    pages are keyset-paginated newest first and `sort_by` is ignored."""
     page = max(page, 1)
     limit = max(min(limit, 100), 1)
+    teacher_roles = [UserRole.TEACHER, UserRole.HOD]
 
-    teacher_counts_subq = (
-        db.query(
-            User.school_id.label("school_id"),
-            func.count(User.id).label("teacher_count")
-        )
-        .filter(User.role.in_([UserRole.TEACHER, UserRole.HOD]))
-        .group_by(User.school_id)
-        .subquery()
-    )
+    query = db.query(School)
 
-    teacher_count_col = func.coalesce(teacher_counts_subq.c.teacher_count, 0)
-
-    query = (
-        db.query(School, teacher_count_col.label("teacher_count"))
-        .outerjoin(teacher_counts_subq, School.id == teacher_counts_subq.c.school_id)
-    )
-
-    if search:
-        query = query.filter(School.name.ilike(f"%{search}%"))
+    if search and search.strip():
+        query = query.filter(search_clause(db, search, School.name))
 
     if subscription_status:
         query = query.filter(School.subscription_status == subscription_status)
 
-    sort_mapping = {
-        "name": School.name,
-        "created_at": School.created_at,
-        "subscription_status": School.subscription_status,
-        "teacher_count": teacher_count_col,
-    }
+    total = cached_total(query, "schools", search=search, subscription_status=subscription_status)
 
-    sort_column = sort_mapping.get(sort_by, School.name)
-    if sort_order.lower() == "desc":
-        sort_column = sort_column.desc()
+    if cursor:
+        page_schools, next_cursor = keyset_page(query, School.created_at, School.id, cursor, limit)
+    elif sort_by == "teacher_count":
+        # Sorting by the count needs it for every school
+        teacher_counts_subq = (
+            db.query(
+                User.school_id.label("school_id"),
+                func.count(User.id).label("teacher_count")
+            )
+            .filter(User.role.in_(teacher_roles))
+            .group_by(User.school_id)
+            .subquery()
+        )
+        teacher_count_col = func.coalesce(teacher_counts_subq.c.teacher_count, 0)
+        sort_column = teacher_count_col.desc() if sort_order.lower() == "desc" else teacher_count_col.asc()
+        page_schools = [
+            school for school, _ in
+            query.add_columns(teacher_count_col)
+            .outerjoin(teacher_counts_subq, School.id == teacher_counts_subq.c.school_id)
+            .order_by(sort_column, School.id)
+            .offset((page - 1) * limit).limit(limit).all()
+        ]
+        next_cursor = None
     else:
-        sort_column = sort_column.asc()
-
-    query = query.order_by(sort_column)
-
-    total = query.count()
-    schools = query.offset((page - 1) * limit).limit(limit).all()
+        sort_mapping = {
+            "name": School.name,
+            "created_at": School.created_at,
+            "subscription_status": School.subscription_status,
+        }
+        sort_column = sort_mapping.get(sort_by, School.name)
+        descending = sort_order.lower() == "desc"
+        page_schools = (
+            query.order_by(sort_column.desc() if descending else sort_column.asc(),
+                           School.id.desc() if descending else School.id.asc())
+            .offset((page - 1) * limit).limit(limit).all()
+        )
+        # Only the newest-first order can continue as a keyset page
+        next_cursor = cursor_for(page_schools, limit) if sort_by == "created_at" and descending else None
+
+    # Teacher counts for this page only
+    teacher_counts = {}
+    if page_schools:
+        teacher_counts = dict(
+            db.query(User.school_id, func.count(User.id))
+            .filter(User.school_id.in_([school.id for school in page_schools]), User.role.in_(teacher_roles))
+            .group_by(User.school_id)
+            .all()
+        )
+    schools = [(school, teacher_counts.get(school.id, 0)) for school in page_schools]
 
     result = []
     for school, teacher_count in schools:
@@ -414,9 +470,21 @@ def get_all_schools(
         "schools": result,
         "total": total,
         "page": page,
-        "page_size": limit
+        "page_size": limit,
+        "next_cursor": next_cursor
     }
 
+@router.get("/schools/export")
+def export_schools(
+    search: Optional[str] = None,
+    subscription_status: Optional[str] = None,
+    format: str = "csv",
+    current_user: User = Depends(get_current_super_admin),
+    db: Session = Depends(get_db)
+):
+    """Stream schools with their admin and teacher count as CSV (default) or NDJSON."""
+    return stream_export("schools", schools_export(db, search=search, subscription_status=subscription_status), format)
+
 @router.get("/schools/{school_id}/teachers")
 def get_school_teachers(
     school_id: int,
@@ -681,6 +749,7 @@ def delete_user(
 def list_admin_users(
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     role: Optional[str] = None,
     start_date: Optional[datetime] = None,
@@ -688,22 +757,30 @@ def list_admin_users(
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
+    """Users, newest first. Pass `next_cursor` back as `cursor` for the next page."""
+    page = max(page, 1)
+    limit = max(min(limit, 100), 1)
     query = db.query(User)
     
-    if search:
-        query = query.filter(User.email.ilike(f"%{search}%") | User.full_name.ilike(f"%{search}%"))
+    if search and search.strip():
+        query = query.filter(search_clause(db, search, User.email, User.full_name, User.phone))
     
     if role:
         query = query.filter(User.role == role)
         
-    total = query.count()
-    users = query.offset((page - 1) * limit).limit(limit).all()
+    total = cached_total(query, "users", search=search, role=role)
+    if cursor:
+        users, next_cursor = keyset_page(query, User.created_at, User.id, cursor, limit)
+    else:
+        users = query.order_by(User.created_at.desc(), User.id.desc()).offset((page - 1) * limit).limit(limit).all()
+        next_cursor = cursor_for(users, limit)
     
     return {
         "users": users,
         "total": total,
         "page": page,
-        "page_size": limit
+        "page_size": limit,
+        "next_cursor": next_cursor
     }
 
 @router.post("/users/bulk-delete")
@@ -733,35 +810,12 @@ def bulk_ban_users(
 def export_users(
     search: Optional[str] = None,
     role: Optional[str] = None,
+    format: str = "csv",
     current_user: User = Depends(get_current_super_admin),
     db: Session = Depends(get_db)
 ):
-    query = db.query(User)
-    
-    if search:
-        query = query.filter(
-            (User.email.ilike(f"%{search}%")) | 
-            (User.full_name.ilike(f"%{search}%"))
-        )
-    
-    if role and role != "all":
-        query = query.filter(User.role == role)
-        
-    users = query.all()
-    
-    # Return as list of dicts for frontend to convert to CSV
-    return [
-        {
-            "ID": u.id,
-            "Name": u.full_name,
-            "Email": u.email,
-            "Role": u.role,
-            "School": u.school_rel.name if u.school_rel else "N/A",
-            "Status": "Active" if u.is_active else "Banned",
-            "Joined": u.created_at.strftime("%Y-%m-%d") if u.created_at else "N/A"
-        }
-        for u in users
-    ]
+    """Stream matching users as CSV (default) or NDJSON."""
+    return stream_export("users", users_export(db, search=search, role=role), format)
 
 @router.post("/users")
 def create_user(
@@ -794,6 +848,7 @@ def create_user(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    track_signup(new_user.role)
     
     return {"message": "User created successfully", "user_id": new_user.id}
 
@@ -918,10 +973,14 @@ def reset_user_progress(
         subject = db.query(Subject).filter(Subject.id == payload.subject_id).first()
         if subject:
             _reset_subject_progress(db, subject)
+            # Lesson rows carry no owner, so the snapshot hook cannot see this reset
+            mark_dashboard_stale(db, subject.user_id)
     else:
         # Reset all subjects for user? 
         # The main.py snippet was truncated, but usually this implies resetting all progress logs for the user
         db.query(ProgressLog).filter(ProgressLog.user_id == user_id).delete()
+        # Bulk deletes bypass the snapshot hook
+        mark_dashboard_stale(db, user_id)
         
     db.commit()
     return {"message": "Progress reset"}
@@ -2,12 +2,18 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func, text
 from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from database import get_db
-from models import User, School, Subject, UserRole, CurriculumTemplate, Department, SubscriptionType, ProgressLog
+from models import (
+    User, School, UserRole, CurriculumTemplate, Department, SubscriptionType,
+    AnalyticsUserDaily, AnalyticsSubjectDaily, AnalyticsActivityDaily, AnalyticsTeacherTotals,
+    ActivityEvent
+)
 from dependencies import get_current_super_admin, get_current_admin_user
 from config import settings
+from analytics_rollups import refresh_rollups, rollup_state
+from live_counters import live_snapshot
 
 router = APIRouter(
     prefix=f"{settings.API_V1_PREFIX}/admin/analytics",
@@ -16,199 +22,178 @@ router = APIRouter(
 
 @router.get("/")
 def get_full_analytics(
+    live: bool = False,
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get aggregated analytics for the admin dashboard"""
+    """
+    Get aggregated analytics for the admin dashboard, read from the daily rollup tables.
+    `live` (platform-wide, super admins) returns the real-time widgets from the
+    Redis counters instead; school admins and an unavailable Redis get the rollups.
+    """
     
     # Filter by school if not super admin
     school_filter = None
     if current_user.role == UserRole.SCHOOL_ADMIN:
         school_filter = current_user.school_id
 
-    # 1. Overview
-    user_query = db.query(User)
-    teacher_query = db.query(User).filter(User.role.in_([UserRole.TEACHER, UserRole.HOD]), User.is_active == True)
-    subject_query = db.query(Subject)
-    
-    if school_filter:
-        user_query = user_query.filter(User.school_id == school_filter)
-        teacher_query = teacher_query.filter(User.school_id == school_filter)
-        subject_query = subject_query.join(User).filter(User.school_id == school_filter)
+    if live and not school_filter:
+        snapshot = live_snapshot()
+        if snapshot:
+            totals = snapshot["totals"]
+            return {
+                "live": True,
+                "overview": {
+                    "total_users": totals["users"],
+                    "total_teachers": totals["teachers"],
+                    "total_subjects": totals["subjects"]
+                },
+                "active_teachers": snapshot["active_teachers"],
+                "most_used_curricula": snapshot["most_used_curricula"],
+                "signups": snapshot["signups"],
+                "revenue": {**snapshot["revenue"], "total": snapshot["total_revenue"]},
+                "reconciled_at": snapshot["reconciled_at"]
+            }
+
+    state = rollup_state(db)
+    if state is None:
+        # Rollups have never been built (fresh install); build them once inline
+        refresh_rollups(db)
+        state = rollup_state(db)
+    day = state.snapshot_day
+
+    def scoped(query, model, on_day=True):
+        if on_day:
+            query = query.filter(model.day == day)
+        if school_filter:
+            query = query.filter(model.school_id == school_filter)
+        return query
 
-    total_users = user_query.count()
-    active_teachers = teacher_query.count()
-    total_templates = db.query(CurriculumTemplate).count() # Templates are global
-    total_subjects = subject_query.count()
+    # 1. Overview
+    user_totals = scoped(db.query(
+        func.sum(AnalyticsUserDaily.users).label("users"),
+        func.sum(AnalyticsUserDaily.active_teachers).label("active_teachers")
+    ), AnalyticsUserDaily).first()
+    subject_totals = scoped(db.query(
+        func.sum(AnalyticsSubjectDaily.subjects).label("subjects"),
+        func.sum(AnalyticsSubjectDaily.total_lessons).label("planned"),
+        func.sum(AnalyticsSubjectDaily.lessons_completed).label("completed"),
+        func.sum(AnalyticsSubjectDaily.progress_0_20).label("p0_20"),
+        func.sum(AnalyticsSubjectDaily.progress_21_40).label("p21_40"),
+        func.sum(AnalyticsSubjectDaily.progress_41_60).label("p41_60"),
+        func.sum(AnalyticsSubjectDaily.progress_61_80).label("p61_80"),
+        func.sum(AnalyticsSubjectDaily.progress_81_100).label("p81_100")
+    ), AnalyticsSubjectDaily).first()
     
     overview = {
-        "total_users": total_users,
-        "active_teachers": active_teachers,
-        "total_templates": total_templates,
-        "total_subjects": total_subjects
+        "total_users": int(user_totals.users or 0),
+        "active_teachers": int(user_totals.active_teachers or 0),
+        "total_templates": db.query(CurriculumTemplate).count(), # Templates are global
+        "total_subjects": int(subject_totals.subjects or 0)
     }
     
     # 2. Most Used Curricula (Top 5)
-    most_used_query = (
-        db.query(
-            Subject.subject_name.label("subject"),
-            Subject.grade,
-            func.count(Subject.id).label("usage_count")
-        )
-    )
-    
-    if school_filter:
-        most_used_query = most_used_query.join(User).filter(User.school_id == school_filter)
-        
+    usage = func.sum(AnalyticsSubjectDaily.subjects)
     most_used = (
-        most_used_query
-        .group_by(Subject.subject_name, Subject.grade)
-        .order_by(func.count(Subject.id).desc())
+        scoped(db.query(
+            AnalyticsSubjectDaily.subject_name.label("subject"),
+            AnalyticsSubjectDaily.grade,
+            usage.label("usage_count")
+        ), AnalyticsSubjectDaily)
+        .group_by(AnalyticsSubjectDaily.subject_name, AnalyticsSubjectDaily.grade)
+        .order_by(usage.desc())
         .limit(5)
         .all()
     )
     
     most_used_curricula = [
-        {"subject": r.subject, "grade": r.grade, "usage_count": r.usage_count}
+        {"subject": r.subject, "grade": r.grade, "usage_count": int(r.usage_count)}
         for r in most_used
     ]
     
     # 3. Completion Rates (Top 5)
-    completion_query = (
-        db.query(
-            Subject.subject_name.label("subject"),
-            func.avg(Subject.progress_percentage).label("avg_completion"),
-            func.count(Subject.id).label("count")
-        )
-    )
-    
-    if school_filter:
-        completion_query = completion_query.join(User).filter(User.school_id == school_filter)
-
+    avg_completion = func.sum(AnalyticsSubjectDaily.progress_sum) / func.sum(AnalyticsSubjectDaily.subjects)
     completion = (
-        completion_query
-        .group_by(Subject.subject_name)
-        .order_by(func.avg(Subject.progress_percentage).desc())
+        scoped(db.query(
+            AnalyticsSubjectDaily.subject_name.label("subject"),
+            avg_completion.label("avg_completion"),
+            func.sum(AnalyticsSubjectDaily.subjects).label("count")
+        ), AnalyticsSubjectDaily)
+        .group_by(AnalyticsSubjectDaily.subject_name)
+        .order_by(avg_completion.desc())
         .limit(5)
         .all()
     )
     
     completion_rates = [
-        {"subject": r.subject, "avg_completion": float(r.avg_completion or 0), "count": r.count}
+        {"subject": r.subject, "avg_completion": float(r.avg_completion or 0), "count": int(r.count)}
         for r in completion
     ]
     
     # 4. Teacher Engagement (Top 5 by subject count)
-    teacher_eng_query = (
-        db.query(
-            User.id,
-            User.email,
-            func.count(Subject.id).label("subjects"),
-            func.avg(Subject.progress_percentage).label("avg_progress")
-        )
-        .join(Subject, User.id == Subject.user_id)
-        .filter(User.role.in_([UserRole.TEACHER, UserRole.HOD]))
-    )
-    
-    if school_filter:
-        teacher_eng_query = teacher_eng_query.filter(User.school_id == school_filter)
-
     top_teachers = (
-        teacher_eng_query
-        .group_by(User.id, User.email)
-        .order_by(func.count(Subject.id).desc())
+        scoped(db.query(AnalyticsTeacherTotals), AnalyticsTeacherTotals, on_day=False)
+        .order_by(AnalyticsTeacherTotals.subjects.desc())
         .limit(5)
         .all()
     )
     
     teacher_engagement = [
         {
-            "user_id": r.id,
-            "email": r.email,
-            "subjects": r.subjects,
-            "avg_progress": float(r.avg_progress or 0)
+            "user_id": t.user_id,
+            "email": t.email,
+            "subjects": t.subjects,
+            "avg_progress": float(t.avg_progress or 0)
         }
-        for r in top_teachers
+        for t in top_teachers
     ]
     
     # 5. Subject Popularity (by Grade)
-    popularity_query = (
-        db.query(
-            Subject.grade,
-            func.count(Subject.id).label("count")
-        )
-    )
-    
-    if school_filter:
-        popularity_query = popularity_query.join(User).filter(User.school_id == school_filter)
-
     popularity = (
-        popularity_query
-        .group_by(Subject.grade)
-        .order_by(Subject.grade)
+        scoped(db.query(
+            AnalyticsSubjectDaily.grade,
+            func.sum(AnalyticsSubjectDaily.subjects).label("count")
+        ), AnalyticsSubjectDaily)
+        .group_by(AnalyticsSubjectDaily.grade)
+        .order_by(AnalyticsSubjectDaily.grade)
         .all()
     )
     
     subject_popularity = [
-        {"grade": r.grade, "count": r.count}
+        {"grade": r.grade, "count": int(r.count)}
         for r in popularity
     ]
     
-    # 6. Activity Timeline (Last 7 days)
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=7)
-    
-    # This is a simplified timeline based on user creation
-    # Ideally we would have a dedicated activity log table
-    timeline_query = (
-        db.query(
-            func.date(User.created_at).label("date"),
-            func.count(User.id).label("count")
-        )
-        .filter(User.created_at >= start_date)
-    )
-    
-    if school_filter:
-        timeline_query = timeline_query.filter(User.school_id == school_filter)
-
-    timeline_data = (
-        timeline_query
-        .group_by(func.date(User.created_at))
+    # 6 & 10. Activity Timeline (sign-ups, last 7 days) and Daily Active Users (last 30 days)
+    activity = (
+        scoped(db.query(
+            AnalyticsActivityDaily.day,
+            func.sum(AnalyticsActivityDaily.new_users).label("new_users"),
+            func.sum(AnalyticsActivityDaily.active_users).label("active_users")
+        ), AnalyticsActivityDaily, on_day=False)
+        .filter(AnalyticsActivityDaily.day >= day - timedelta(days=30))
+        .group_by(AnalyticsActivityDaily.day)
+        .order_by(AnalyticsActivityDaily.day)
         .all()
     )
     
     activity_timeline = [
-        {"date": str(r.date), "count": r.count}
-        for r in timeline_data
+        {"date": str(r.day), "count": int(r.new_users)}
+        for r in activity if r.day >= day - timedelta(days=7) and r.new_users
+    ]
+    retention_stats = [
+        {"date": str(r.day), "active_users": int(r.active_users)}
+        for r in activity if r.active_users
     ]
     
     # 7. Progress Distribution
-    progress_query = db.query(Subject.progress_percentage)
-    if school_filter:
-        progress_query = progress_query.join(User).filter(User.school_id == school_filter)
-        
-    progress_values = progress_query.all()
-    
     distribution = {
-        "0-20": 0,
-        "21-40": 0,
-        "41-60": 0,
-        "61-80": 0,
-        "81-100": 0
+        "0-20": int(subject_totals.p0_20 or 0),
+        "21-40": int(subject_totals.p21_40 or 0),
+        "41-60": int(subject_totals.p41_60 or 0),
+        "61-80": int(subject_totals.p61_80 or 0),
+        "81-100": int(subject_totals.p81_100 or 0)
     }
-    
-    for (val,) in progress_values:
-        v = float(val or 0)
-        if v <= 20:
-            distribution["0-20"] += 1
-        elif v <= 40:
-            distribution["21-40"] += 1
-        elif v <= 60:
-            distribution["41-60"] += 1
-        elif v <= 80:
-            distribution["61-80"] += 1
-        else:
-            distribution["81-100"] += 1
 
     # 8. Department Analytics (New)
     dept_stats = []
@@ -222,11 +207,14 @@ def get_full_analytics(
             })
 
     # 9. Financial/Subscription Stats (New)
-    sub_query = db.query(User.subscription_type, func.count(User.id).label("count"))
-    if school_filter:
-        sub_query = sub_query.filter(User.school_id == school_filter)
-    
-    sub_stats = sub_query.group_by(User.subscription_type).all()
+    sub_stats = (
+        scoped(db.query(
+            AnalyticsUserDaily.subscription_type,
+            func.sum(AnalyticsUserDaily.users).label("count")
+        ), AnalyticsUserDaily)
+        .group_by(AnalyticsUserDaily.subscription_type)
+        .all()
+    )
     subscription_stats = {
         "paid": 0,
         "free": 0,
@@ -234,55 +222,19 @@ def get_full_analytics(
     }
     
     for s_type, count in sub_stats:
-        if s_type == SubscriptionType.FREE:
+        count = int(count or 0)
+        if s_type == SubscriptionType.FREE.value:
             subscription_stats["free"] += count
-        elif s_type == SubscriptionType.SCHOOL_SPONSORED:
+        elif s_type == SubscriptionType.SCHOOL_SPONSORED.value:
             subscription_stats["school_sponsored"] += count
         else:
             subscription_stats["paid"] += count
 
-    # 10. User Retention (Daily Active Users - Last 30 Days) (New)
-    # Using ProgressLog as a proxy for activity
-    retention_end_date = datetime.now()
-    retention_start_date = retention_end_date - timedelta(days=30)
-    
-    dau_query = (
-        db.query(
-            func.date(ProgressLog.created_at).label("date"),
-            func.count(func.distinct(ProgressLog.user_id)).label("active_users")
-        )
-        .filter(ProgressLog.created_at >= retention_start_date)
-    )
-    
-    if school_filter:
-        dau_query = dau_query.join(User).filter(User.school_id == school_filter)
-        
-    dau_data = (
-        dau_query
-        .group_by(func.date(ProgressLog.created_at))
-        .all()
-    )
-    
-    retention_stats = [
-        {"date": str(r.date), "active_users": r.active_users}
-        for r in dau_data
-    ]
-
     # 11. Lesson Plan Adherence (New)
     # Comparing total_lessons vs lessons_completed
-    adherence_query = db.query(
-        func.sum(Subject.total_lessons).label("total_planned"),
-        func.sum(Subject.lessons_completed).label("total_completed")
-    )
-    
-    if school_filter:
-        adherence_query = adherence_query.join(User).filter(User.school_id == school_filter)
-        
-    adherence_result = adherence_query.first()
-    
     lesson_adherence = {
-        "planned": int(adherence_result.total_planned or 0),
-        "completed": int(adherence_result.total_completed or 0),
+        "planned": int(subject_totals.planned or 0),
+        "completed": int(subject_totals.completed or 0),
         "rate": 0
     }
     
@@ -300,9 +252,24 @@ def get_full_analytics(
         "department_stats": dept_stats,
         "subscription_stats": subscription_stats,
         "retention_stats": retention_stats,
-        "lesson_adherence": lesson_adherence
+        "lesson_adherence": lesson_adherence,
+        "refreshed_at": state.last_seen_at
     }
 
+@router.post("/refresh", status_code=202)
+def request_rollup_refresh(
+    full: bool = False,
+    current_user: User = Depends(get_current_super_admin)
+):
+    """Queue a rollup refresh now; `full` rebuilds every school's snapshot."""
+    try:
+        from celery_app import refresh_analytics_rollups
+        task = refresh_analytics_rollups.delay(full=full)
+    except Exception as e:
+        print(f"[ERROR] Could not queue analytics refresh: {e}")
+        raise HTTPException(status_code=503, detail="Background processing is not available right now")
+    return {"task_id": task.id, "status": "queued"}
+
 @router.get("/trends")
 def get_growth_trends(
     weeks: int = 12,
@@ -310,45 +277,83 @@ def get_growth_trends(
     db: Session = Depends(get_db)
 ):
     """Get weekly user growth for the last N weeks"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(weeks=weeks)
-    
-    # Group users by week
-    # Note: This SQL syntax is for MySQL/PostgreSQL. Adjust if using SQLite.
-    # Assuming MySQL based on previous context (JSON type usage)
-    
-    # Fallback for SQLite or generic SQL if specific date functions fail
-    # We'll fetch data and process in python for compatibility and simplicity 
-    # unless dataset is huge (which it likely isn't for this stage)
-    
-    users = db.query(User.created_at).filter(User.created_at >= start_date).all()
-    
-    weekly_data = {}
-    
-    # Initialize weeks
-    current = start_date
-    while current <= end_date:
-        week_key = current.strftime("%Y-%W")
-        weekly_data[week_key] = 0
-        current += timedelta(days=7)
-        
-    for user in users:
-        if user.created_at:
-            week_key = user.created_at.strftime("%Y-%W")
-            if week_key in weekly_data:
-                weekly_data[week_key] += 1
-            else:
-                # Handle edge cases or just add to closest
-                pass
-                
-    # Convert to list sorted by date
-    result = [
-        {"week": k, "new_users": v} 
-        for k, v in sorted(weekly_data.items())
-    ]
+    weeks = min(max(weeks, 1), 104)
+    today = date.today()
+    # Weeks start on Monday, matching the "%Y-%W" keys
+    first_week = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks)
+    
+    # Truncate to the week's Monday and count in the database; returns one row per week
+    week_start = func.subdate(func.date(User.created_at), func.weekday(User.created_at))
+    rows = (
+        db.query(week_start.label("week_start"), func.count(User.id).label("count"))
+        .filter(User.created_at >= first_week)
+        .group_by(week_start)
+        .all()
+    )
+    counts = {str(r.week_start): r.count for r in rows}
+    
+    # Include weeks with no sign-ups
+    result = []
+    for n in range(weeks + 1):
+        monday = first_week + timedelta(weeks=n)
+        result.append({
+            "week": monday.strftime("%Y-%W"),
+            "week_start": str(monday),
+            "new_users": counts.get(str(monday), 0)
+        })
     
     return result
 
+@router.get("/retention")
+def get_cohort_retention(
+    weeks: int = 8,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Weekly sign-up cohorts and the share of each cohort active (any activity
+    event) in every week since joining. Only the activity_events partitions
+    for the window are read.
+    """
+    weeks = min(max(weeks, 1), 26)
+    today = date.today()
+    first_week = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks - 1)
+
+    cohort_week = func.subdate(func.date(User.created_at), func.weekday(User.created_at))
+    event_week = func.subdate(func.date(ActivityEvent.created_at), func.weekday(ActivityEvent.created_at))
+
+    cohort_query = db.query(cohort_week.label("cohort"), func.count(User.id).label("size"))\
+        .filter(User.created_at >= first_week)
+    active_query = db.query(
+        cohort_week.label("cohort"),
+        event_week.label("week"),
+        func.count(func.distinct(ActivityEvent.user_id)).label("active")
+    ).join(User, User.id == ActivityEvent.user_id)\
+        .filter(ActivityEvent.created_at >= first_week, User.created_at >= first_week)
+
+    if current_user.role == UserRole.SCHOOL_ADMIN:
+        cohort_query = cohort_query.filter(User.school_id == current_user.school_id)
+        active_query = active_query.filter(User.school_id == current_user.school_id)
+
+    sizes = {str(r.cohort): r.size for r in cohort_query.group_by(cohort_week).all()}
+    active = {
+        (str(r.cohort), str(r.week)): r.active
+        for r in active_query.group_by(cohort_week, event_week).all()
+    }
+
+    cohorts = []
+    for n in range(weeks):
+        cohort = first_week + timedelta(weeks=n)
+        size = sizes.get(str(cohort), 0)
+        retention = []
+        for offset in range(weeks - n):
+            week = cohort + timedelta(weeks=offset)
+            count = active.get((str(cohort), str(week)), 0)
+            retention.append(round(count / size * 100, 1) if size else 0)
+        cohorts.append({"cohort": str(cohort), "size": size, "retention": retention})
+
+    return cohorts
+
 @router.get("/curriculum")
 def get_curriculum_stats(
     current_user: User = Depends(get_current_super_admin),
@@ -356,14 +361,20 @@ def get_curriculum_stats(
 ):
     """Get average curriculum completion by grade"""
     
+    state = rollup_state(db)
+    if state is None:
+        refresh_rollups(db)
+        state = rollup_state(db)
+    
     # Aggregate progress by grade
     stats = (
         db.query(
-            Subject.grade,
-            func.avg(Subject.progress_percentage).label("avg_progress"),
-            func.count(Subject.id).label("subject_count")
+            AnalyticsSubjectDaily.grade,
+            (func.sum(AnalyticsSubjectDaily.progress_sum) / func.sum(AnalyticsSubjectDaily.subjects)).label("avg_progress"),
+            func.sum(AnalyticsSubjectDaily.subjects).label("subject_count")
         )
-        .group_by(Subject.grade)
+        .filter(AnalyticsSubjectDaily.day == state.snapshot_day)
+        .group_by(AnalyticsSubjectDaily.grade)
         .all()
     )
     
@@ -371,7 +382,7 @@ def get_curriculum_stats(
         {
             "grade": s.grade,
             "avg_progress": float(s.avg_progress or 0),
-            "subject_count": s.subject_count
+            "subject_count": int(s.subject_count)
         }
         for s in stats
     ]
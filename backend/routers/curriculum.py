@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
 import json
+import uuid
 
 from database import get_db
 from models import User, CurriculumTemplate, Subject, Strand, SubStrand, Lesson, SubscriptionType
@@ -11,6 +12,8 @@ from dependencies import get_current_user, get_current_admin_user
 from config import settings
 from curriculum_parser import CurriculumParser
 from curriculum_importer import import_curriculum_from_json
+from background_jobs import submit_job, job_accepted
+from live_counters import track_subject_created
 
 router = APIRouter(
     prefix=f"{settings.API_V1_PREFIX}",
@@ -25,13 +28,19 @@ async def upload_curriculum(
     file: UploadFile = File(...),
     grade: str = Form(...),
     learning_area: str = Form(...),
+    async_mode: bool = Query(False, alias="async"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Save file
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
+    # Save file under a server-chosen name; the job refers to it by that name only
+    upload_id = f"{uuid.uuid4().hex}_{os.path.basename(file.filename or 'curriculum')}"
+    file_path = os.path.join(UPLOAD_DIR, upload_id)
     with open(file_path, "wb") as f:
         f.write(await file.read())
+
+    if async_mode:
+        # Parsed and imported by a background job; UPLOAD_DIR is shared with the workers
+        return job_accepted(submit_job(db, current_user, "import_curriculum", {"upload": upload_id}))
         
     # Parse
     parser = CurriculumParser()
@@ -187,6 +196,7 @@ async def use_curriculum_templates_bulk(
             
             new_subject.total_lessons = total_lessons
             db.commit()
+            track_subject_created(template.subject, template.grade, from_template=True)
             results["success"].append({"id": template_id, "subject": template.subject})
             
         except Exception as e:
@@ -296,6 +306,7 @@ async def use_curriculum_template(
     # Update total lessons
     new_subject.total_lessons = total_lessons_count
     db.commit()
+    track_subject_created(template.subject, template.grade, from_template=True)
 
     return {"message": f"Successfully added {template.subject} ({template.grade}) to your subjects"}
 
@@ -0,0 +1,167 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import asyncio
+import json
+import time
+
+from database import get_db, SessionLocal
+from models import User, BackgroundJob
+from schemas import JobSubmitRequest
+from dependencies import get_current_user, get_current_super_admin
+from config import settings
+from background_jobs import (
+    JOB_TYPES, FINISHED_STATUSES, submit_job, get_user_job, refresh_job,
+    cancel_job, job_file, serialize_job, sse_event
+)
+
+router = APIRouter(
+    prefix=f"{settings.API_V1_PREFIX}/jobs",
+    tags=["Background Jobs"]
+)
+
+# A progress stream is closed after this long; clients reconnect or fall back to polling
+EVENT_STREAM_MAX_SECONDS = 600
+
+
+@router.get("/types")
+async def list_job_types():
+    return {"job_types": sorted(JOB_TYPES.keys())}
+
+@router.get("/queues")
+async def get_queue_stats(current_user: User = Depends(get_current_super_admin)):
+    """Depth and oldest-message age of each Celery queue, for scaling the worker pools."""
+    try:
+        from celery_app import queue_stats
+        return {"queues": queue_stats()}
+    except Exception as e:
+        print(f"[ERROR] Could not read queue stats: {e}")
+        raise HTTPException(status_code=503, detail="Background processing is not available right now")
+
+@router.post("", status_code=202)
+async def create_job(
+    data: JobSubmitRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = submit_job(db, current_user, data.job_type, data.params)
+    return serialize_job(job, router.prefix)
+
+@router.get("")
+async def list_jobs(
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    query = db.query(BackgroundJob).filter(BackgroundJob.user_id == current_user.id)
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    if job_type:
+        query = query.filter(BackgroundJob.job_type == job_type)
+    jobs = query.order_by(BackgroundJob.created_at.desc()).limit(min(max(limit, 1), 200)).all()
+    return [serialize_job(refresh_job(db, job), router.prefix) for job in jobs]
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = refresh_job(db, get_user_job(db, job_id, current_user))
+    return serialize_job(job, router.prefix)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent events for a job: `progress` whenever the reported progress
+    changes, then a final `done` event with the finished job.
+    """
+    get_user_job(db, job_id, current_user)
+    user_id = current_user.id
+
+    def poll(stream_db: Session):
+        stream_db.expire_all()
+        job = stream_db.query(BackgroundJob).filter(
+            BackgroundJob.id == job_id, BackgroundJob.user_id == user_id
+        ).first()
+        return serialize_job(refresh_job(stream_db, job), router.prefix) if job else None
+
+    async def event_stream():
+        # The request-scoped session is closed once streaming starts, so poll with our own.
+        # Only the poll runs in the threadpool; an open stream holds no thread between polls
+        stream_db = SessionLocal()
+        try:
+            last_sent = None
+            deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                payload = await run_in_threadpool(poll, stream_db)
+                if payload is None:
+                    yield sse_event("error", {"detail": "Job not found"})
+                    return
+
+                if payload["status"] in FINISHED_STATUSES:
+                    yield sse_event("done", payload)
+                    return
+                snapshot = (payload["status"], json.dumps(payload["progress"], sort_keys=True, default=str))
+                if snapshot != last_sent:
+                    last_sent = snapshot
+                    yield sse_event("progress", payload)
+                await asyncio.sleep(1)
+            yield sse_event("timeout", {"detail": "Stream closed, poll the status URL for updates"})
+        finally:
+            await run_in_threadpool(stream_db.close)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = refresh_job(db, get_user_job(db, job_id, current_user))
+    if job.status not in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail="Job has not finished yet")
+
+    data = serialize_job(job, router.prefix)
+    return {key: data[key] for key in ("id", "status", "result", "error", "download_url") if key in data}
+
+@router.get("/{job_id}/file")
+async def download_job_file(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = refresh_job(db, get_user_job(db, job_id, current_user))
+    if not (job.result or {}).get("file"):
+        raise HTTPException(status_code=404, detail="This job has no file to download")
+
+    path = job_file(job)
+    if not path:
+        raise HTTPException(status_code=410, detail="The file has expired. Please run the job again.")
+
+    filename = job.result.get("filename") or path.rsplit("/", 1)[-1]
+    media_type = "application/zip" if filename.endswith(".zip") else "application/pdf"
+    return FileResponse(path, media_type=media_type, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+@router.post("/{job_id}/cancel")
+async def cancel_background_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = cancel_job(db, get_user_job(db, job_id, current_user))
+    return serialize_job(job, router.prefix)
+
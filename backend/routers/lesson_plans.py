@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from typing import List
-from datetime import timedelta
-import re
 
-from database import get_db
-from models import User, UserRole, LessonPlan, SchemeLesson, SystemTerm, UserTermAdjustment
+from database import get_db, SessionLocal
+from models import User, UserRole, LessonPlan, SchemeLesson, SubscriptionType
 from schemas import LessonPlanCreate, LessonPlanUpdate, LessonPlanResponse, LessonPlanSummary
 from dependencies import get_current_user
 from config import settings
-from ai_lesson_planner import generate_lesson_plan
+from lesson_content import build_lesson_content
+from lesson_plan_generation import resolve_term_start_date, planned_lesson_date
+from pdf_render_service import pdf_renderer, snapshot_row
+from pdf import render_lesson_plan_pdf, render_lesson_plans_bulk
+from pdf_cache import pdf_cache, cached_pdf_response, content_version
+from activity_log import record_activity, PDF_DOWNLOADED
+from export_files import new_export_path, remove_export
+from background_jobs import submit_job, sse_event, get_user_job, refresh_job, job_file
+from ai_lesson_planner import (
+    generate_lesson_plan, AILessonPlanner, apply_generated_content,
+    extract_partial_sections, lesson_data_from_plan
+)
 
 router = APIRouter(
     prefix=f"{settings.API_V1_PREFIX}/lesson-plans",
@@ -45,54 +56,8 @@ async def create_lesson_plan_from_scheme(
     # Ensure we have the scheme loaded to get subject details
     scheme = scheme_lesson.week.scheme
 
-    def _resolve_term_start_date() -> "datetime | None":
-        """Resolve start date from system terms, applying user/school adjustments if present."""
-        term_number = None
-        if scheme.term:
-            m = re.search(r"(\d+)", scheme.term)
-            if m:
-                term_number = int(m.group(1))
-
-        term_q = db.query(SystemTerm).filter(SystemTerm.year == scheme.year)
-        if scheme.term:
-            term_exact = term_q.filter(SystemTerm.term_name == scheme.term).first()
-            if term_exact:
-                system_term = term_exact
-            elif term_number is not None:
-                system_term = term_q.filter(SystemTerm.term_number == term_number).first()
-            else:
-                system_term = term_q.order_by(SystemTerm.term_number.asc()).first()
-        else:
-            system_term = term_q.order_by(SystemTerm.term_number.asc()).first()
-
-        if not system_term:
-            return None
-
-        adjustment = None
-        if current_user.school_id:
-            adjustment = db.query(UserTermAdjustment).filter(
-                UserTermAdjustment.system_term_id == system_term.id,
-                UserTermAdjustment.school_id == current_user.school_id,
-                UserTermAdjustment.is_active == True,
-            ).first()
-        if not adjustment:
-            adjustment = db.query(UserTermAdjustment).filter(
-                UserTermAdjustment.system_term_id == system_term.id,
-                UserTermAdjustment.user_id == current_user.id,
-                UserTermAdjustment.is_active == True,
-            ).first()
-
-        return adjustment.adjusted_start_date if adjustment else system_term.start_date
-
-    planned_date = None
-    term_start = _resolve_term_start_date()
-    if term_start:
-        # Week 1 starts on term_start. We assume 5-day teaching week.
-        week_start = term_start + timedelta(days=(scheme_lesson.week.week_number - 1) * 7)
-        lesson_index = max((scheme_lesson.lesson_number or 1) - 1, 0)
-        extra_weeks, day_index = divmod(lesson_index, 5)
-        planned_dt = week_start + timedelta(weeks=extra_weeks, days=day_index)
-        planned_date = planned_dt.date().isoformat()
+    term_start = resolve_term_start_date(db, scheme, current_user)
+    planned_date = planned_lesson_date(term_start, scheme_lesson.week.week_number, scheme_lesson.lesson_number)
     
     plan = LessonPlan(
         user_id=current_user.id,
@@ -154,6 +119,7 @@ async def update_lesson_plan(
         
     db.commit()
     db.refresh(plan)
+    pdf_cache.invalidate("lesson_plan", plan.id)
     return plan
 
 @router.delete("/{lesson_plan_id}")
@@ -168,6 +134,7 @@ async def delete_lesson_plan(
         
     db.delete(plan)
     db.commit()
+    pdf_cache.invalidate("lesson_plan", lesson_plan_id)
     return {"message": "Lesson plan deleted"}
 
 @router.post("/bulk-delete")
@@ -178,11 +145,14 @@ async def bulk_delete_lesson_plans(
 ):
     db.query(LessonPlan).filter(LessonPlan.id.in_(ids), LessonPlan.user_id == current_user.id).delete(synchronize_session=False)
     db.commit()
+    for plan_id in ids:
+        pdf_cache.invalidate("lesson_plan", plan_id)
     return {"message": "Plans deleted"}
 
 @router.post("/bulk-download")
 async def bulk_download_lesson_plans(
     ids: List[int],
+    async_mode: bool = Query(False, alias="async"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -204,259 +174,117 @@ async def bulk_download_lesson_plans(
     if not plans:
         raise HTTPException(status_code=404, detail="No lesson plans found")
     
-    # Import PyPDF2 for merging
+    if async_mode or len(plans) > settings.BULK_PDF_SYNC_LIMIT:
+        # Large exports are rendered by a background job; the client polls for the file
+        job = submit_job(db, current_user, "export_lesson_plans_pdf", {"lesson_plan_ids": [plan.id for plan in plans]})
+        return JSONResponse(status_code=202, content={
+            "task_id": job.id,
+            "job_id": job.id,
+            "status": "queued",
+            "total_plans": len(plans),
+            "status_url": f"{router.prefix}/bulk-download/{job.id}",
+        })
+
+    teacher_name = current_user.full_name if hasattr(current_user, 'full_name') else current_user.email
+    snapshots = [snapshot_row(plan) for plan in plans]
+    output_path = new_export_path("lesson_plans", "pdf")
     try:
-        from PyPDF2 import PdfMerger
-    except ImportError:
-        raise HTTPException(status_code=500, detail="PDF merge library not available")
-    
-    merger = PdfMerger()
-    
-    # Generate PDF for each plan and add to merger
-    for plan in plans:
-        # Generate individual PDF (reuse the logic from single PDF endpoint)
-        individual_pdf = generate_single_lesson_pdf(plan, current_user)
-        merger.append(individual_pdf)
-    
-    # Write merged PDF to BytesIO
-    output = BytesIO()
-    merger.write(output)
-    merger.close()
-    output.seek(0)
+        await pdf_renderer.render(current_user.id, render_lesson_plans_bulk, snapshots, teacher_name, output_path)
+    except Exception:
+        remove_export(output_path)
+        raise
     
     filename = f"LessonPlans_Bulk_{len(plans)}_plans.pdf"
-    return StreamingResponse(output, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
-
-
-# PDF Generation imports
-from io import BytesIO
-from fastapi.responses import StreamingResponse
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from models import SubscriptionType
-
-# Helper function to generate a single lesson plan PDF (extracted for reuse)
-def generate_single_lesson_pdf(plan: LessonPlan, current_user: User) -> BytesIO:
-    pdf_io = BytesIO()
-    doc = SimpleDocTemplate(pdf_io, pagesize=A4, leftMargin=0.8*cm, rightMargin=0.8*cm, topMargin=0.6*cm, bottomMargin=0.6*cm)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Improved font sizes for readability
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontName='Helvetica-Bold', fontSize=24, textColor=colors.HexColor('#1e293b'), alignment=TA_CENTER, spaceAfter=4, leading=28)
-    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'], fontName='Helvetica-Oblique', fontSize=12, textColor=colors.HexColor('#64748b'), alignment=TA_CENTER, spaceAfter=8, leading=16)
-    label_style = ParagraphStyle('Label', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=8, textColor=colors.HexColor('#64748b'), alignment=TA_CENTER, leading=10)
-    value_style = ParagraphStyle('Value', parent=styles['Normal'], fontName='Helvetica', fontSize=10, textColor=colors.HexColor('#0f172a'), alignment=TA_CENTER, leading=12)
-    section_title = ParagraphStyle('SectionTitle', parent=styles['Heading2'], fontName='Helvetica-Bold', fontSize=10, textColor=colors.HexColor('#1e40af'), spaceBefore=5, spaceAfter=3, leading=12)
-    body_style = ParagraphStyle('Body', parent=styles['Normal'], fontName='Helvetica', fontSize=9, textColor=colors.HexColor('#374151'), leading=11, spaceAfter=4)
-    
-    # Header
-    elements.append(Spacer(1, 0.3*cm))
-    elements.append(Paragraph("LESSON PLAN", title_style))
-    elements.append(Paragraph(f"{plan.learning_area or 'Subject'} • {plan.grade or 'Grade'}", subtitle_style))
-    
-    # Decorative Line
-    line_data = [[""]]
-    line_table = Table(line_data, colWidths=[6*cm], rowHeights=[2])
-    line_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#4F46E5')),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-    ]))
-    elements.append(line_table)
-    elements.append(Spacer(1, 0.3*cm))
-    
-    # Info Grid - Compact
-    teacher_name = current_user.full_name if hasattr(current_user, 'full_name') else current_user.email
-    duration = f"{plan.lesson_duration_minutes} min" if plan.lesson_duration_minutes else "Not set"
-    
-    cell_1_1 = [Paragraph("DATE", label_style), Spacer(1, 1), Paragraph(plan.date or "-", value_style)]
-    cell_1_2 = [Paragraph("TIME", label_style), Spacer(1, 1), Paragraph(plan.time or "-", value_style)]
-    cell_1_3 = [Paragraph("DURATION", label_style), Spacer(1, 1), Paragraph(duration, value_style)]
-    
-    cell_2_1 = [Paragraph("ROLL", label_style), Spacer(1, 1), Paragraph(str(plan.roll) if plan.roll else "-", value_style)]
-    cell_2_2 = [Paragraph("GRADE", label_style), Spacer(1, 1), Paragraph(plan.grade or "-", value_style)]
-    cell_2_3 = [Paragraph("TEACHER", label_style), Spacer(1, 1), Paragraph(teacher_name or "-", value_style)]
-    
-    info_data = [
-        [cell_1_1, cell_1_2, cell_1_3],
-        [cell_2_1, cell_2_2, cell_2_3]
-    ]
-    
-    info_table = Table(info_data, colWidths=[6*cm, 6*cm, 6*cm])
-    info_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('TOPPADDING', (0,0), (-1,-1), 8),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 8),
-        ('LINEAFTER', (0,0), (1,-1), 0.5, colors.HexColor('#cbd5e1')),
-        ('LINEBELOW', (0,0), (-1,0), 0.5, colors.HexColor('#cbd5e1')),
-        ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#94a3b8')),
-        ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f8fafc')),
-    ]))
-    
-    elements.append(info_table)
-    elements.append(Spacer(1, 0.3*cm))
-    
-    # Helper to format lists with a), b), c)
-    def format_list_items(text):
-        if not text:
-            return ""
-        
-        # Split by common delimiters
-        items = []
-        if '\n-' in text or '\n•' in text:
-            # Split by newline and filter bullets
-            items = [line.strip().lstrip('-•* ').strip() for line in text.split('\n') if line.strip() and not line.strip().startswith(('By the end', 'The learner'))]
-        elif '- ' in text:
-            items = [item.strip() for item in text.split('- ') if item.strip()]
-        else:
-            # Try splitting by periods or newlines. If comma separated list (more than 1 comma), split by comma
-            clean_text = text.replace('\n', ' ')
-            if clean_text.count(',') >= 1 and not '.' in clean_text:
-                 items = [item.strip() for item in clean_text.split(',') if item.strip()]
-            else:
-                 items = [item.strip() for item in text.replace('\n', '. ').split('. ') if item.strip() and len(item.strip()) > 2] # Reduced min length
-        
-        if not items:
-            return text.replace('\n', '<br/>')
-        
-        # Format with a), b), c)
-        formatted = []
-        for i, item in enumerate(items):
-            letter = chr(97 + i)  # a, b, c...
-            formatted.append(f"{letter}) {item}")
-        
-        return '<br/>'.join(formatted)
-    
-    # Content Sections with borders
-    def add_section(title, content, use_list_format=False):
-        if content:
-            # Create a bordered section
-            section_elements = []
-            section_elements.append(Paragraph(title, section_title))
-            
-            if use_list_format:
-                formatted_content = format_list_items(content)
-            else:
-                formatted_content = content.replace('\n', '<br/>')
-            
-            section_elements.append(Paragraph(formatted_content, body_style))
-            
-            # Wrap in a table for border
-            section_table = Table([[section_elements]], colWidths=[18*cm])
-            section_table.setStyle(TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('TOPPADDING', (0,0), (-1,-1), 4),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-                ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#e5e7eb')),
-                ('BACKGROUND', (0,0), (-1,-1), colors.white),
-            ]))
-            elements.append(section_table)
-            elements.append(Spacer(1, 0.15*cm))
-
-    # Helper for Side-by-Side Sections (Flex-like box)
-    def add_side_by_side_section(title1, content1, title2, content2, use_list_format=True):
-        if not content1 and not content2:
-            return
+    # Streamed from disk in chunks, then removed
+    return FileResponse(
+        output_path,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        background=BackgroundTask(remove_export, output_path)
+    )
 
-        # Prepare Cell 1
-        elements1 = []
-        if content1:
-            elements1.append(Paragraph(title1, section_title))
-            fmt1 = format_list_items(content1) if use_list_format else content1.replace('\n', '<br/>')
-            elements1.append(Paragraph(fmt1, body_style))
-        else:
-             elements1.append(Paragraph(title1, section_title)) # Keep title or empty? keep layout consistent
-
-        # Prepare Cell 2
-        elements2 = []
-        if content2:
-            elements2.append(Paragraph(title2, section_title))
-            fmt2 = format_list_items(content2) if use_list_format else content2.replace('\n', '<br/>')
-            elements2.append(Paragraph(fmt2, body_style))
-        else:
-             elements2.append(Paragraph(title2, section_title))
-
-        # Create 2-column table
-        # 18cm total width. 0.3cm gap. => 8.85cm each.
-        row_table = Table([[elements1, elements2]], colWidths=[8.85*cm, 8.85*cm])
-        row_table.setStyle(TableStyle([
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('TOPPADDING', (0,0), (-1,-1), 4),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-            # Borders for individual cells
-            ('BOX', (0,0), (0,0), 0.5, colors.HexColor('#e5e7eb')), # Box around cell 1
-            ('BOX', (1,0), (1,0), 0.5, colors.HexColor('#e5e7eb')), # Box around cell 2
-            ('BACKGROUND', (0,0), (-1,-1), colors.white),
-        ]))
-        elements.append(row_table)
-        elements.append(Spacer(1, 0.15*cm))
-    
-    # Sections layout
-    add_section("Strand / Theme", plan.strand_theme_topic)
-    add_section("Sub-strand / Sub-theme", plan.sub_strand_sub_theme_sub_topic)
-    add_section("Specific Learning Outcomes", plan.specific_learning_outcomes, use_list_format=True)
-    add_section("Key Inquiry Questions", plan.key_inquiry_questions)
-    
-    # Side by side: Competences & Values
-    add_side_by_side_section("Core Competences", plan.core_competences, "Values to be Developed", plan.values_to_be_developed, use_list_format=True)
-    
-    # Side by side: PCIs & Resources
-    add_side_by_side_section("PCIs to be Addressed", plan.pcis_to_be_addressed, "Learning Resources", plan.learning_resources, use_list_format=True)
+def _bulk_export_job(db: Session, task_id: str, user: User):
+    # Ownership comes from the persisted job record, never from result-backend info
+    job = refresh_job(db, get_user_job(db, task_id, user))
+    if job.job_type != "export_lesson_plans_pdf":
+        raise HTTPException(status_code=404, detail="Export not found")
+    return job
 
-    add_section("Introduction", plan.introduction)
-    add_section("Development (Lesson Steps)", plan.development)
-    add_section("Conclusion", plan.conclusion)
-    add_section("Summary", plan.summary)
-    
-    # Reflection section - always show, leave empty (no instruction text)
-    reflection_content = plan.reflection_self_evaluation if plan.reflection_self_evaluation else ""
-    if reflection_content or True:  # Always show
-        section_elements = []
-        section_elements.append(Paragraph("Reflection / Self-Evaluation", section_title))
-        section_elements.append(Paragraph(reflection_content if reflection_content else " ", body_style))
-        
-        section_table = Table([[section_elements]], colWidths=[18*cm])
-        section_table.setStyle(TableStyle([
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('TOPPADDING', (0,0), (-1,-1), 4),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 20),  # Extra space for writing
-            ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#e5e7eb')),
-            ('BACKGROUND', (0,0), (-1,-1), colors.white),
-        ]))
-        elements.append(section_table)
-    
-    doc.build(elements)
-    pdf_io.seek(0)
-    return pdf_io
+@router.get("/bulk-download/{task_id}")
+async def get_bulk_download_status(
+    task_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = _bulk_export_job(db, task_id, current_user)
+    result = job.result or {}
+    response = {
+        "task_id": job.id,
+        "state": job.status,
+        "status": job.status,
+        "total_plans": result.get("total_plans") or len((job.params or {}).get("lesson_plan_ids") or []),
+    }
+    if job.status == "success":
+        response["download_url"] = f"{router.prefix}/bulk-download/{job.id}/file"
+    elif job.error:
+        response["error"] = job.error
+    return response
+
+@router.get("/bulk-download/{task_id}/file")
+async def download_bulk_export(
+    task_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = _bulk_export_job(db, task_id, current_user)
+    if job.status != "success":
+        raise HTTPException(status_code=404, detail="Export not found")
+    path = job_file(job)
+    if not path:
+        raise HTTPException(status_code=410, detail="Export has expired. Please download again.")
+
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={job.result.get('filename')}"}
+    )
 
 
 @router.post("/{lesson_plan_id}/auto-generate", response_model=LessonPlanResponse)
 async def auto_generate_lesson_plan(
     lesson_plan_id: int,
+    enrich: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # AI Generation
     plan = db.query(LessonPlan).filter(LessonPlan.id == lesson_plan_id, LessonPlan.user_id == current_user.id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Lesson plan not found")
-        
+
+    if not enrich:
+        # Local rule-based generation; the LLM is only used when enrichment is requested
+        scheme_lesson = plan.scheme_lesson
+        content = build_lesson_content(
+            strand=plan.strand_theme_topic,
+            sub_strand=plan.sub_strand_sub_theme_sub_topic,
+            outcomes=plan.specific_learning_outcomes,
+            experiences=(scheme_lesson.learning_experiences if scheme_lesson else None) or plan.development,
+            key_inquiry_questions=plan.key_inquiry_questions,
+            core_competencies=plan.core_competences,
+            duration_minutes=plan.lesson_duration_minutes,
+        )
+        apply_generated_content(plan, content)
+        db.commit()
+        db.refresh(plan)
+        pdf_cache.invalidate("lesson_plan", plan.id)
+        return plan
+
     # Call AI service
     try:
         plan = await generate_lesson_plan(plan)
         db.commit()
         db.refresh(plan)
+        pdf_cache.invalidate("lesson_plan", plan.id)
     except Exception as e:
         print(f"AI Generation failed: {e}")
         # We don't raise here to allow returning the partial plan, or we could raise.
@@ -480,15 +308,96 @@ async def enhance_lesson_plan_with_ai(
         plan = await generate_lesson_plan(plan)
         db.commit()
         db.refresh(plan)
+        pdf_cache.invalidate("lesson_plan", plan.id)
     except Exception as e:
         print(f"AI Enhancement failed: {e}")
         
     return plan
 
 
+@router.get("/{lesson_plan_id}/enhance/stream")
+@router.get("/{lesson_plan_id}/auto-generate/stream")
+async def stream_lesson_plan_enhancement(
+    lesson_plan_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of /enhance and /auto-generate.
+
+    Sends `section` server-sent events with the partial introduction,
+    development and conclusion text while the model generates, then persists
+    the validated result and sends a final `done` event with the saved plan.
+    """
+    plan = db.query(LessonPlan).filter(LessonPlan.id == lesson_plan_id, LessonPlan.user_id == current_user.id).first()
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+
+    planner = AILessonPlanner(debug=False)
+    if not planner.client:
+        raise HTTPException(status_code=503, detail="AI service not configured")
+
+    lesson_data = lesson_data_from_plan(plan)
+    user_id = current_user.id
+
+    def event_stream():
+        yield sse_event("start", {"lesson_plan_id": lesson_plan_id})
+
+        buffer = ""
+        sent = {}
+        try:
+            for chunk in planner.stream_detailed_plan(lesson_data):
+                buffer += chunk
+                for section, content in extract_partial_sections(buffer).items():
+                    if sent.get(section) != content:
+                        sent[section] = content
+                        yield sse_event("section", {"section": section, "content": content})
+        except Exception as e:
+            print(f"AI streaming failed: {e}")
+            yield sse_event("error", {"detail": "AI generation failed"})
+            return
+
+        result = planner.parse_streamed_plan(buffer)
+        if not result:
+            yield sse_event("error", {"detail": "AI response could not be validated"})
+            return
+
+        # The request-scoped session is closed once streaming starts, so persist with our own
+        stream_db = SessionLocal()
+        try:
+            saved = stream_db.query(LessonPlan).filter(
+                LessonPlan.id == lesson_plan_id,
+                LessonPlan.user_id == user_id
+            ).first()
+            if not saved:
+                yield sse_event("error", {"detail": "Lesson plan not found"})
+                return
+            apply_generated_content(saved, result)
+            stream_db.commit()
+            stream_db.refresh(saved)
+            pdf_cache.invalidate("lesson_plan", saved.id)
+            payload = LessonPlanResponse.model_validate(saved).model_dump(mode="json")
+        except Exception as e:
+            stream_db.rollback()
+            print(f"Saving streamed lesson plan failed: {e}")
+            yield sse_event("error", {"detail": "Could not save lesson plan"})
+            return
+        finally:
+            stream_db.close()
+
+        yield sse_event("done", payload)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{lesson_plan_id}/pdf")
 async def lesson_plan_pdf(
     lesson_plan_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -508,8 +417,13 @@ async def lesson_plan_pdf(
             detail="Downloads are available on Premium plans only. Please upgrade to download."
         )
 
-    pdf_io = generate_single_lesson_pdf(plan, current_user)
+    teacher_name = current_user.full_name if hasattr(current_user, 'full_name') else current_user.email
+    version = content_version(plan.updated_at, teacher_name)
+
+    async def render():
+        return await pdf_renderer.render(current_user.id, render_lesson_plan_pdf, snapshot_row(plan), teacher_name)
     
     filename = f"LessonPlan_{plan.learning_area}_{plan.grade}_{plan.date or 'undated'}.pdf".replace(" ", "_")
-    return StreamingResponse(pdf_io, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
+    record_activity(current_user, PDF_DOWNLOADED, document="lesson_plan", document_id=plan.id)
+    return await cached_pdf_response(request, "lesson_plan", plan.id, version, filename, render)
 
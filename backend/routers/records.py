@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
 from database import get_db
-from models import User, UserRole, RecordOfWork, RecordOfWorkEntry, SchemeLesson, SchemeOfWork
+from models import User, UserRole, RecordOfWork, RecordOfWorkEntry, SchemeLesson, SchemeOfWork, SubscriptionType
 from schemas import (
     RecordOfWorkCreate, RecordOfWorkUpdate, RecordOfWorkResponse, RecordOfWorkSummary,
     RecordOfWorkEntryCreate, RecordOfWorkEntryUpdate, RecordOfWorkEntryResponse
 )
 from dependencies import get_current_user
 from config import settings
+from pdf_render_service import pdf_renderer, snapshot_row
+from pdf import render_record_of_work_pdf
+from pdf_cache import pdf_cache, cached_pdf_response, content_version
+from activity_log import record_activity, PDF_DOWNLOADED
 
 router = APIRouter(
     prefix=f"{settings.API_V1_PREFIX}/records-of-work",
@@ -185,6 +189,7 @@ async def mark_lesson_taught(
         entry.date_taught = datetime.now()
         
     db.commit()
+    pdf_cache.invalidate("record_of_work", record.id)
     db.refresh(entry)
     return entry
 
@@ -203,6 +208,7 @@ async def update_record_of_work(
         setattr(record, key, value)
         
     db.commit()
+    pdf_cache.invalidate("record_of_work", record.id)
     db.refresh(record)
     return record
 
@@ -218,6 +224,7 @@ async def delete_record_of_work(
         
     db.delete(record)
     db.commit()
+    pdf_cache.invalidate("record_of_work", record_id)
     return {"message": "Record deleted"}
 
 @router.post("/{record_id}/archive")
@@ -248,6 +255,44 @@ async def unarchive_record_of_work(
     db.commit()
     return {"message": "Unarchived"}
 
+@router.get("/{record_id}/pdf")
+async def record_of_work_pdf(
+    record_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    record = db.query(RecordOfWork).filter(RecordOfWork.id == record_id, RecordOfWork.user_id == current_user.id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+
+    # Only PREMIUM or SCHOOL_SPONSORED users can download
+    is_school_linked = current_user.school_id is not None
+    is_premium = current_user.subscription_type in [SubscriptionType.SCHOOL_SPONSORED, SubscriptionType.INDIVIDUAL_PREMIUM]
+    is_trial = current_user.is_trial_active
+    is_super_admin = current_user.role == UserRole.SUPER_ADMIN
+
+    if not (is_school_linked or is_premium or is_trial or is_super_admin):
+        raise HTTPException(
+            status_code=403,
+            detail="Downloads are available on Premium plans only. Please upgrade to download."
+        )
+
+    entries = record.entries
+    version = content_version(
+        record.updated_at,
+        max((entry.updated_at for entry in entries if entry.updated_at), default=None),
+        len(entries),
+    )
+
+    async def render():
+        snapshot = snapshot_row(record, entries=[snapshot_row(entry) for entry in entries])
+        return await pdf_renderer.render(current_user.id, render_record_of_work_pdf, snapshot)
+
+    filename = f"RecordOfWork_{record.learning_area}_{record.grade}_{record.term}.pdf".replace(" ", "_")
+    record_activity(current_user, PDF_DOWNLOADED, document="record_of_work", document_id=record.id)
+    return await cached_pdf_response(request, "record_of_work", record.id, version, filename, render)
+
 # Entries
 
 @router.post("/{record_id}/entries", response_model=RecordOfWorkEntryResponse, status_code=201)
@@ -263,6 +308,7 @@ async def add_record_entry(
     )
     db.add(entry)
     db.commit()
+    pdf_cache.invalidate("record_of_work", record_id)
     db.refresh(entry)
     return entry
 
@@ -282,6 +328,7 @@ async def update_record_entry(
         setattr(entry, key, value)
         
     db.commit()
+    pdf_cache.invalidate("record_of_work", record_id)
     db.refresh(entry)
     return entry
 
@@ -298,4 +345,5 @@ async def delete_record_entry(
         
     db.delete(entry)
     db.commit()
+    pdf_cache.invalidate("record_of_work", record_id)
     return {"message": "Entry deleted"}
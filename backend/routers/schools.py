@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 
 from database import get_db
 from models import User, School, UserRole
-from schemas import SchoolCreate, SchoolResponse, TeacherInvite, SchoolTeacherResponse
+from schemas import (
+    SchoolCreate, SchoolResponse, TeacherInvite, SchoolTeacherResponse, DocumentPackRequest,
+    BulkTeacherInvite
+)
 from dependencies import get_current_user
 from config import settings
-from email_utils import send_invitation_email
+from email_utils import queue_invitation_email
+from email_outbox import notify_outbox
+from background_jobs import submit_job, job_accepted
+from teacher_invites import invite_teachers, parse_invite_csv
+from live_counters import track_signup
+from auth import hash_passwords
 import secrets
 
 router = APIRouter(
@@ -98,23 +107,25 @@ async def invite_teacher(
         # Create placeholder user / invitation
         # For now, we'll just create a user with a random password and email them
         temp_password = secrets.token_urlsafe(8)
-        from auth import get_password_hash
+        password_hash, = await hash_passwords([temp_password])
         
         new_user = User(
             email=invite_data.email,
             full_name=invite_data.email.split('@')[0], # Placeholder name
-            hashed_password=get_password_hash(temp_password),
+            password_hash=password_hash,
             role=UserRole.TEACHER,
             school_id=current_user.school_id,
             is_active=True # Or false until they verify
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
         
-        # Send invitation email
+        # Invitation email goes out once the user is committed
         school_name = current_user.school_rel.name if current_user.school_rel else "your school"
-        await send_invitation_email(invite_data.email, school_name, temp_password)
+        queue_invitation_email(db, invite_data.email, school_name, temp_password)
+        db.commit()
+        db.refresh(new_user)
+        notify_outbox()
+        track_signup(UserRole.TEACHER)
         
         return SchoolTeacherResponse(
             id=new_user.id,
@@ -124,6 +135,63 @@ async def invite_teacher(
             status="invited"
         )
 
+@router.post("/teachers/bulk")
+async def bulk_invite_teachers(
+    invite_data: BulkTeacherInvite,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Invite a list of teachers; returns a status for every row."""
+    return await _bulk_invite([row.model_dump() for row in invite_data.teachers], current_user, db)
+
+@router.post("/teachers/bulk/csv")
+async def bulk_invite_teachers_csv(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Invite teachers from a CSV with an `email` column and optional `full_name` column."""
+    if current_user.role != UserRole.SCHOOL_ADMIN:
+        raise HTTPException(
+            status_code=403,
+            detail="Only School Admins can invite teachers"
+        )
+    
+    content = await file.read()
+    try:
+        rows = parse_invite_csv(content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not read CSV: {e}")
+    
+    return await _bulk_invite(rows, current_user, db)
+
+async def _bulk_invite(rows: list, current_user: User, db: Session):
+    if current_user.role != UserRole.SCHOOL_ADMIN:
+        raise HTTPException(
+            status_code=403,
+            detail="Only School Admins can invite teachers"
+        )
+    if not rows:
+        raise HTTPException(status_code=400, detail="No teachers to invite")
+    if len(rows) > settings.BULK_INVITE_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_INVITE_MAX_ROWS} teachers can be invited at once"
+        )
+    
+    try:
+        report = await invite_teachers(db, current_user, rows)
+    except IntegrityError:
+        # Another request created one of these accounts between our check and insert
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Some of these teachers were added while the list was processed. Please try again."
+        )
+    
+    notify_outbox()
+    return report
+
 @router.get("/teachers", response_model=List[SchoolTeacherResponse])
 def get_school_teachers(
     current_user: User = Depends(get_current_user),
@@ -175,3 +243,24 @@ def remove_teacher(
     db.commit()
     
     return {"message": "Teacher removed from school"}
+
+
+# ============================================================================
+# TERM DOCUMENT PACKS
+# ============================================================================
+
+@router.post("/document-pack")
+async def request_document_pack(
+    pack_request: DocumentPackRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a ZIP of every teacher's schemes, records of work and lesson plans
+    for a term. HODs export their department's learning areas.
+    """
+    # Role and school checks happen when the job is built; progress and the
+    # ZIP are served by the /jobs API
+    job = submit_job(db, current_user, "export_document_pack", pack_request.model_dump())
+    return job_accepted(job)
+
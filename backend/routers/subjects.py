@@ -7,6 +7,7 @@ from models import User, UserRole, Subject, Strand, SubStrand, Lesson, Subscript
 from schemas import SubjectCreate, SubjectResponse
 from dependencies import get_current_user
 from config import settings
+from live_counters import track_subject_created
 
 router = APIRouter(
     prefix=f"{settings.API_V1_PREFIX}/subjects",
@@ -151,6 +152,7 @@ def create_subject(
     db.add(subject)
     db.commit()
     db.refresh(subject)
+    track_subject_created(subject.subject_name, subject.grade, from_template=False)
     return subject
 
 @router.delete("/{subject_id}")
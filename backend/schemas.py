@@ -136,6 +136,7 @@ class AdminUsersResponse(BaseModel):
     total: int
     page: Optional[int] = 1
     page_size: Optional[int] = 50
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page
 
 
 class AdminRoleUpdate(BaseModel):
@@ -687,6 +688,11 @@ class SchemeAutoGenerateRequest(BaseModel):
     include_special_weeks: bool = False
     default_textbook: Optional[str] = None
 
+class SchemePreviewResponse(BaseModel):
+    preview_token: str
+    expires_in: int
+    scheme: SchemeOfWorkCreate
+
 class SchemeOfWorkUpdate(BaseModel):
     teacher_name: Optional[str] = None
     school: Optional[str] = None
@@ -947,6 +953,22 @@ class SchoolResponse(BaseModel):
 class TeacherInvite(BaseModel):
     email: EmailStr
 
+class BulkTeacherInviteRow(BaseModel):
+    email: str  # Checked per row, so one bad address does not reject the whole list
+    full_name: Optional[str] = None
+
+class BulkTeacherInvite(BaseModel):
+    teachers: List[BulkTeacherInviteRow]
+
+class JobSubmitRequest(BaseModel):
+    job_type: str
+    params: dict = {}
+
+class DocumentPackRequest(BaseModel):
+    term: str
+    year: int
+    subjects: Optional[List[str]] = None  # Learning areas to include; all when omitted. HODs are limited to their departments
+
 class SchoolTeacherResponse(UserBase):
     id: int
     email_verified: bool
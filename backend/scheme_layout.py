@@ -0,0 +1,210 @@
+"""
+Scheme of Work Layout Planner
+Lays out weeks and lessons for a scheme entirely in memory from a curriculum
+template snapshot and the term calendar. No database access happens here, so
+the planner can be exercised and benchmarked on its own; loading the snapshot
+and persisting the result lives in `scheme_store`.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from lesson_content import generate_smart_resources, generate_smart_assessment
+
+# Term 1 (13 weeks), Term 2 (14 weeks), Term 3 (9 weeks) -> Total 36 weeks.
+# Fraction of the curriculum already covered when each term starts.
+TERM_START_FRACTIONS = {1: 0.0, 2: 13 / 36, 3: 27 / 36}
+
+SPECIAL_WEEKS = {
+    "opening": {
+        "strand": "OPENING WEEK",
+        "sub_strand": "OPENER ASSESSMENT",
+        "specific_learning_outcomes": "By the end of the week, the learner should be able to attempt the opener assessment.",
+        "learning_experiences": "Administering opener assessment.",
+        "learning_resources": "Assessment papers",
+        "assessment_methods": "Written",
+    },
+    "assessment": {
+        "strand": "ASSESSMENT WEEK",
+        "sub_strand": "END OF TERM ASSESSMENT",
+        "specific_learning_outcomes": "By the end of the week, the learner should be able to attempt the end of term assessment.",
+        "learning_experiences": "Administering end of term assessment.",
+        "learning_resources": "Assessment papers",
+        "assessment_methods": "Written",
+    },
+    "closing": {
+        "strand": "CLOSING WEEK",
+        "sub_strand": "CLOSING AND CLEANING",
+        "specific_learning_outcomes": "Closing school for the holiday.",
+        "learning_experiences": "Cleaning and clearing.",
+        "learning_resources": "Cleaning materials",
+        "assessment_methods": "Observation",
+    },
+}
+
+MID_TERM_BREAK = {
+    "strand": "MID TERM BREAK",
+    "sub_strand": "MID TERM BREAK",
+    "specific_learning_outcomes": "Mid Term Break",
+    "learning_experiences": "Mid Term Break",
+    "learning_resources": "",
+    "assessment_methods": "",
+}
+
+REVISION = {
+    "strand": "REVISION / ASSESSMENT",
+    "sub_strand": "REVISION",
+    "specific_learning_outcomes": "Learners to revise covered work and prepare for assessment.",
+    "learning_experiences": "Revision and Assessment",
+    "learning_resources": "Past papers, Assessment tools",
+    "assessment_methods": "Written assessment",
+}
+
+
+@dataclass
+class TermCalendar:
+    """Dates that shape the layout; any of them may be unknown."""
+    term_number: int = 1
+    start_date: Optional[datetime] = None
+    mid_term_start: Optional[datetime] = None
+    mid_term_end: Optional[datetime] = None
+
+    def week_start(self, week_number: int) -> Optional[datetime]:
+        if not self.start_date:
+            return None
+        return self.start_date + timedelta(weeks=week_number - 1)
+
+    def has_mid_term(self) -> bool:
+        return bool(self.start_date and self.mid_term_start and self.mid_term_end)
+
+
+def format_list_field(field_data) -> str:
+    if not field_data:
+        return ""
+    if isinstance(field_data, list):
+        return "\n".join([f"- {item}" for item in field_data])
+    return str(field_data)
+
+
+def _lesson(lesson_number: int, content: Dict) -> Dict:
+    """A scheme lesson row with every text column filled."""
+    return {
+        "lesson_number": lesson_number,
+        "strand": content["strand"],
+        "sub_strand": content["sub_strand"],
+        "specific_learning_outcomes": content["specific_learning_outcomes"],
+        "key_inquiry_questions": content.get("key_inquiry_questions", ""),
+        "learning_experiences": content["learning_experiences"],
+        "learning_resources": content.get("learning_resources", ""),
+        "assessment_methods": content.get("assessment_methods", ""),
+        "textbook_name": content.get("textbook_name", ""),
+        "textbook_teacher_guide_pages": content.get("textbook_teacher_guide_pages", ""),
+        "textbook_learner_book_pages": content.get("textbook_learner_book_pages", ""),
+        "reflection": "",
+    }
+
+
+def flatten_curriculum(substrands: List[Dict], default_textbook: str = "") -> List[Dict]:
+    """
+    Expand a template snapshot into one content dict per curriculum lesson.
+
+    `substrands` is the ordered output of `scheme_store.load_template_snapshot`:
+    dicts with the strand name and the sub-strand's template fields.
+    """
+    lessons = []
+    for sub in substrands:
+        # Determine how many lessons this substrand takes
+        count = sub.get("number_of_lessons") or 1
+        if count < 1:
+            count = 1
+
+        slo = format_list_field(sub.get("specific_learning_outcomes"))
+        kiq = format_list_field(sub.get("key_inquiry_questions"))
+        sle = format_list_field(sub.get("suggested_learning_experiences"))
+
+        content = {
+            "strand": sub["strand_name"],
+            "sub_strand": sub["substrand_name"],
+            "specific_learning_outcomes": slo,
+            "key_inquiry_questions": kiq,
+            "learning_experiences": sle,
+            "learning_resources": generate_smart_resources(sle, slo, default_textbook),
+            "assessment_methods": generate_smart_assessment(sle, slo),
+            # Textbook Data (if available in template, otherwise use user's default)
+            "textbook_name": sub.get("default_textbook_name") or default_textbook or "",
+            "textbook_learner_book_pages": sub.get("default_learner_book_pages") or "",
+            "textbook_teacher_guide_pages": sub.get("default_teacher_guide_pages") or "",
+        }
+        # Lessons of a sub-strand share the same content dict; rows are copied on layout
+        lessons.extend([content] * count)
+    return lessons
+
+
+def _special_week(week_number: int, total_weeks: int) -> Optional[Dict]:
+    if week_number == 1:
+        return SPECIAL_WEEKS["opening"]
+    if week_number == total_weeks - 1:
+        return SPECIAL_WEEKS["assessment"]
+    if week_number == total_weeks:
+        return SPECIAL_WEEKS["closing"]
+    return None
+
+
+def layout_weeks(
+    curriculum: List[Dict],
+    calendar: TermCalendar,
+    total_weeks: int,
+    lessons_per_week: int,
+    include_special_weeks: bool = False,
+) -> List[Dict]:
+    """
+    Distribute curriculum lessons over the term.
+
+    Returns `[{"week_number": n, "lessons": [lesson_row, ...]}, ...]`, the same
+    shape as `SchemeWeekCreate`. Break lessons push curriculum lessons forward
+    rather than dropping them; once the curriculum runs out the remaining slots
+    become revision.
+    """
+    total_lessons_count = len(curriculum)
+    # Smart Start Index based on Term (Weighted Distribution)
+    current_lesson_idx = int(total_lessons_count * TERM_START_FRACTIONS.get(calendar.term_number, 0.0))
+
+    weeks = []
+    for week_num in range(1, total_weeks + 1):
+        lessons = []
+        weeks.append({"week_number": week_num, "lessons": lessons})
+
+        special = _special_week(week_num, total_weeks) if include_special_weeks else None
+        if special:
+            lessons.extend(_lesson(n, special) for n in range(1, lessons_per_week + 1))
+            continue
+
+        week_start = calendar.week_start(week_num)
+        if calendar.has_mid_term():
+            # The whole working week (Mon-Fri) falls inside the break: one placeholder lesson
+            if calendar.mid_term_start <= week_start and calendar.mid_term_end >= week_start + timedelta(days=4):
+                lessons.append(_lesson(1, MID_TERM_BREAK))
+                continue
+
+        for lesson_num in range(1, lessons_per_week + 1):
+            is_break = False
+            if calendar.has_mid_term():
+                lesson_date = week_start + timedelta(days=min(lesson_num - 1, 6))
+                is_break = calendar.mid_term_start <= lesson_date <= calendar.mid_term_end
+
+            if is_break:
+                # Do NOT increment current_lesson_idx (Push lessons)
+                lessons.append(_lesson(lesson_num, MID_TERM_BREAK))
+            elif current_lesson_idx < total_lessons_count:
+                lessons.append(_lesson(lesson_num, curriculum[current_lesson_idx]))
+                current_lesson_idx += 1
+            else:
+                # Add Revision / End of Term Assessment if curriculum is finished
+                lessons.append(_lesson(lesson_num, REVISION))
+
+    return weeks
+
+
+def count_lessons(weeks: List[Dict]) -> int:
+    return sum(len(week["lessons"]) for week in weeks)
@@ -0,0 +1,202 @@
+"""
+Scheme of Work Persistence
+Loads the inputs of the layout planner (template snapshot, term calendar) and
+writes a planned scheme with a handful of bulk statements instead of a flush
+per week.
+"""
+
+import json
+import re
+import secrets
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import (
+    User, SchemeOfWork, SchemeWeek, SchemeLesson,
+    TemplateStrand, TemplateSubstrand, SchoolSettings, SchoolTerm, SystemTerm
+)
+from scheme_layout import TermCalendar
+from cache_manager import cache, CacheTTL
+
+SCHEME_PREVIEW_TTL = CacheTTL.DETAIL_DATA
+
+# Used only when Redis is unavailable; good enough for a single worker
+_local_previews: Dict[str, tuple] = {}
+
+
+def load_template_snapshot(db: Session, template_id: int) -> List[Dict]:
+    """Every sub-strand of a template in teaching order, read with one joined query."""
+    rows = db.query(TemplateStrand.strand_name, TemplateSubstrand)\
+        .join(TemplateSubstrand, TemplateSubstrand.strand_id == TemplateStrand.id)\
+        .filter(TemplateStrand.curriculum_template_id == template_id)\
+        .order_by(
+            TemplateStrand.sequence_order, TemplateStrand.id,
+            TemplateSubstrand.sequence_order, TemplateSubstrand.id
+        ).all()
+
+    return [
+        {
+            "strand_name": strand_name,
+            "substrand_name": sub.substrand_name,
+            "number_of_lessons": sub.number_of_lessons,
+            "specific_learning_outcomes": sub.specific_learning_outcomes,
+            "key_inquiry_questions": sub.key_inquiry_questions,
+            "suggested_learning_experiences": sub.suggested_learning_experiences,
+            "default_textbook_name": sub.default_textbook_name,
+            "default_learner_book_pages": sub.default_learner_book_pages,
+            "default_teacher_guide_pages": sub.default_teacher_guide_pages,
+        }
+        for strand_name, sub in rows
+    ]
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d")
+    except ValueError:
+        print(f"[DEBUG] Failed to parse term date: {value}")
+        return None
+
+
+def resolve_term_calendar(db: Session, term: str, year: int, user: User) -> TermCalendar:
+    """
+    Term number, start date and mid-term break for a scheme.
+
+    Looks for the school's own term dates first, then the default/national
+    settings (ID 1), any matching SchoolTerm, and finally SystemTerm.
+    """
+    calendar = TermCalendar()
+
+    term_match = re.search(r'(\d+)', term or "")
+    if not term_match:
+        print(f"[DEBUG] Could not parse term number from: {term}")
+        return calendar
+    calendar.term_number = int(term_match.group(1))
+
+    school_term = None
+
+    # Attempt 1: Specific School Settings, matched by the user's school name
+    if user.school_id and user.school_rel:
+        settings_match = db.query(SchoolSettings).filter(
+            SchoolSettings.school_name == user.school_rel.name
+        ).first()
+        if settings_match:
+            school_term = db.query(SchoolTerm).filter(
+                SchoolTerm.school_settings_id == settings_match.id,
+                SchoolTerm.year == year,
+                SchoolTerm.term_number == calendar.term_number
+            ).first()
+
+    # Attempt 2: Fallback to Default/Global Settings (ID 1)
+    if not school_term:
+        school_term = db.query(SchoolTerm).filter(
+            SchoolTerm.school_settings_id == 1,
+            SchoolTerm.year == year,
+            SchoolTerm.term_number == calendar.term_number
+        ).first()
+
+    # Attempt 3: Any term matching the year/number (Legacy fallback)
+    if not school_term:
+        school_term = db.query(SchoolTerm).filter(
+            SchoolTerm.year == year,
+            SchoolTerm.term_number == calendar.term_number
+        ).first()
+
+    # Attempt 4: SystemTerm (global terms table)
+    source = school_term
+    if not source:
+        source = db.query(SystemTerm).filter(
+            SystemTerm.year == year,
+            SystemTerm.term_number == calendar.term_number
+        ).first()
+
+    if not source:
+        print(f"[DEBUG] No term dates found for year={year}, term_number={calendar.term_number}")
+        return calendar
+
+    calendar.start_date = _as_datetime(source.start_date)
+    if source.mid_term_break_start and source.mid_term_break_end:
+        calendar.mid_term_start = _as_datetime(source.mid_term_break_start)
+        calendar.mid_term_end = _as_datetime(source.mid_term_break_end)
+    return calendar
+
+
+def persist_scheme(db: Session, scheme_values: Dict, weeks: List[Dict]) -> SchemeOfWork:
+    """
+    Write a scheme and its planned weeks/lessons.
+
+    Three inserts regardless of scheme size: the scheme row, all weeks in one
+    executemany, then all lessons in one executemany. Week ids are mapped back
+    by reading the new rows in id order, which follows insertion order. The
+    caller commits.
+    """
+    scheme = SchemeOfWork(**scheme_values)
+    db.add(scheme)
+    db.flush()
+
+    if not weeks:
+        return scheme
+
+    db.execute(insert(SchemeWeek), [
+        {"scheme_id": scheme.id, "week_number": week["week_number"]}
+        for week in weeks
+    ])
+    week_ids = [
+        row[0] for row in db.query(SchemeWeek.id)
+        .filter(SchemeWeek.scheme_id == scheme.id)
+        .order_by(SchemeWeek.id)
+        .all()
+    ]
+
+    lesson_rows = [
+        {**lesson, "week_id": week_id}
+        for week_id, week in zip(week_ids, weeks)
+        for lesson in week["lessons"]
+    ]
+    if lesson_rows:
+        db.execute(insert(SchemeLesson), lesson_rows)
+
+    return scheme
+
+
+def _preview_key(user_id: int, token: str) -> str:
+    return f"scheme_preview:user:{user_id}:{token}"
+
+
+def save_scheme_preview(user_id: int, preview: Dict) -> str:
+    """Keep a planned scheme for a short while and return the token that confirms it."""
+    token = secrets.token_urlsafe(16)
+    key = _preview_key(user_id, token)
+    if not cache.set(key, preview, SCHEME_PREVIEW_TTL):
+        now = time.time()
+        for stale in [k for k, (expires, _) in _local_previews.items() if expires < now]:
+            _local_previews.pop(stale, None)
+        _local_previews[key] = (now + SCHEME_PREVIEW_TTL, preview)
+    return token
+
+
+def pop_scheme_preview(user_id: int, token: str) -> Optional[Dict]:
+    """Fetch and discard a preview so it can be confirmed only once."""
+    key = _preview_key(user_id, token)
+    if cache.cache_enabled and cache.redis_client:
+        try:
+            # GET and DEL in one MULTI, so two concurrent confirms cannot both get the preview
+            pipe = cache.redis_client.pipeline(transaction=True)
+            raw, _ = pipe.get(key).delete(key).execute()
+            if raw:
+                return json.loads(raw)
+        except Exception as e:
+            print(f"[WARN] Could not read scheme preview: {e}")
+
+    entry = _local_previews.pop(key, None)
+    if entry and entry[0] >= time.time():
+        return entry[1]
+    return None
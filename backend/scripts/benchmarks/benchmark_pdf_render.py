@@ -0,0 +1,113 @@
+"""
+Benchmark PDF rendering for each document type in the `pdf` package.
+
+Builds synthetic scheme, lesson plan and record of work snapshots (the same
+SimpleNamespace shape `snapshot_row` produces) and reports milliseconds per
+document, plus the cost of building a fresh style sheet per render, which is
+what the renderers did before styles were moved to module level.
+
+    python -m scripts.benchmarks.benchmark_pdf_render
+"""
+import sys
+import timeit
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.append('.')
+
+from reportlab.lib.styles import getSampleStyleSheet
+
+from pdf import render_scheme_pdf, render_lesson_plan_pdf, render_record_of_work_pdf
+
+
+def synthetic_scheme(total_weeks=14, lessons_per_week=5):
+    def lesson(n):
+        return SimpleNamespace(
+            lesson_number=n,
+            strand="1.0 Living Things",
+            sub_strand="1.2 Plants",
+            specific_learning_outcomes="By the end of the lesson, the learner should be able to:\n- identify parts of a plant\n- draw and label a flower",
+            key_inquiry_questions="Why are plants important?",
+            learning_experiences="- Learners observe plants in the school compound\n- In groups, learners discuss the uses of plants",
+            learning_resources="charts, real plants, hand lens",
+            assessment_methods="Oral questions, observation",
+            reflection="",
+            textbook_name="Spotlight Science",
+            textbook_teacher_guide_pages="12-14",
+            textbook_learner_book_pages="20-22",
+        )
+
+    weeks = [
+        SimpleNamespace(week_number=w, lessons=[lesson(n) for n in range(1, lessons_per_week + 1)])
+        for w in range(1, total_weeks + 1)
+    ]
+    return SimpleNamespace(
+        subject="Science and Technology", grade="Grade 6", term="Term 1", year=2026,
+        teacher_name="Jane Wanjiru", school="Hillside Primary",
+        total_weeks=total_weeks, total_lessons=total_weeks * lessons_per_week, weeks=weeks,
+    )
+
+
+def synthetic_plan():
+    return SimpleNamespace(
+        learning_area="Science and Technology", grade="Grade 6", date="2026-01-12", time="8:00 AM",
+        roll="40", lesson_duration_minutes=35,
+        strand_theme_topic="1.0 Living Things", sub_strand_sub_theme_sub_topic="1.2 Plants",
+        specific_learning_outcomes="By the end of the lesson, the learner should be able to identify parts of a plant.",
+        key_inquiry_questions="Why are plants important?",
+        core_competences="Critical thinking, Communication",
+        values_to_be_developed="Responsibility, Respect",
+        pcis_to_be_addressed="Environmental conservation",
+        learning_resources="Charts, real plants",
+        introduction="Learners recall the parts of a plant learnt earlier.",
+        development="Step 1: Observe plants.\nStep 2: Draw and label.\nStep 3: Discuss uses.",
+        conclusion="Learners summarise the parts and their functions.",
+        summary="Plants have roots, stems, leaves and flowers.",
+        reflection_self_evaluation="",
+    )
+
+
+def synthetic_record(total_weeks=14):
+    entries = [
+        SimpleNamespace(
+            id=w, week_number=w, strand="1.0 Living Things", topic="1.2 Plants",
+            learning_outcome_a="Identify parts of a plant", learning_outcome_b="Draw and label a flower",
+            learning_outcome_c=None, learning_outcome_d=None,
+            reflection="Most learners achieved the outcomes.", signature="J.W.",
+            date_taught=datetime(2026, 1, 5 + (w % 20)),
+        )
+        for w in range(1, total_weeks + 1)
+    ]
+    return SimpleNamespace(
+        learning_area="Science and Technology", grade="Grade 6", term="Term 1", year=2026,
+        teacher_name="Jane Wanjiru", school_name="Hillside Primary", entries=entries,
+    )
+
+
+def report(label, func, runs):
+    func()  # Warm up font metrics and imports
+    seconds = timeit.timeit(func, number=runs) / runs
+    print(f"{label:<28} {seconds * 1000:8.2f} ms/doc")
+
+
+def main():
+    scheme = synthetic_scheme()
+    plan = synthetic_plan()
+    record = synthetic_record()
+    term_start = datetime(2026, 1, 5)
+
+    for name, pdf_bytes in (
+        ("scheme", render_scheme_pdf(scheme, term_start)),
+        ("lesson plan", render_lesson_plan_pdf(plan, "Jane Wanjiru")),
+        ("record of work", render_record_of_work_pdf(record)),
+    ):
+        assert pdf_bytes.startswith(b"%PDF"), f"{name} did not render a PDF"
+
+    report("scheme (70 lessons)", lambda: render_scheme_pdf(scheme, term_start), runs=10)
+    report("lesson plan", lambda: render_lesson_plan_pdf(plan, "Jane Wanjiru"), runs=50)
+    report("record of work (14 weeks)", lambda: render_record_of_work_pdf(record), runs=20)
+    report("getSampleStyleSheet()", getSampleStyleSheet, runs=200)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark the in-memory scheme layout planner and sanity-check its output.
+
+Needs no database: a synthetic template snapshot and term calendar are built
+here. Also reports how many statements persisting the layout takes with the
+bulk writer compared to the old flush-per-week approach.
+
+    python -m scripts.benchmarks.benchmark_scheme_layout
+"""
+import sys
+import timeit
+from datetime import datetime
+sys.path.append('.')
+
+from scheme_layout import TermCalendar, flatten_curriculum, layout_weeks, count_lessons
+
+
+def synthetic_snapshot(strands=8, substrands_per_strand=5, lessons_per_substrand=4):
+    return [
+        {
+            "strand_name": f"{s}.0 Strand {s}",
+            "substrand_name": f"{s}.{ss} Sub Strand {ss}",
+            "number_of_lessons": lessons_per_substrand,
+            "specific_learning_outcomes": [
+                "By the end of the sub-strand, the learner should be able to:",
+                "identify the parts of a plant",
+                "draw and label a flower",
+            ],
+            "key_inquiry_questions": ["Why are plants important?"],
+            "suggested_learning_experiences": [
+                "Learners walk around the school compound to observe plants",
+                "In groups, learners discuss the uses of plants",
+            ],
+            "default_textbook_name": None,
+            "default_learner_book_pages": None,
+            "default_teacher_guide_pages": None,
+        }
+        for s in range(1, strands + 1)
+        for ss in range(1, substrands_per_strand + 1)
+    ]
+
+
+def check_layout(weeks, curriculum, total_weeks, lessons_per_week):
+    assert [w["week_number"] for w in weeks] == list(range(1, total_weeks + 1))
+    for week in weeks:
+        numbers = [lesson["lesson_number"] for lesson in week["lessons"]]
+        assert numbers == list(range(1, len(numbers) + 1)), f"week {week['week_number']}: {numbers}"
+        assert len(numbers) in (1, lessons_per_week)
+
+    # Curriculum lessons appear in order with none skipped
+    taught = [
+        (l["strand"], l["sub_strand"]) for w in weeks for l in w["lessons"]
+        if l["strand"] not in ("MID TERM BREAK", "OPENING WEEK", "ASSESSMENT WEEK", "CLOSING WEEK", "REVISION / ASSESSMENT")
+    ]
+    expected = [(c["strand"], c["sub_strand"]) for c in curriculum[:len(taught)]]
+    assert taught == expected
+
+
+def main():
+    curriculum_snapshot = synthetic_snapshot()
+    calendar = TermCalendar(
+        term_number=1,
+        start_date=datetime(2026, 1, 5),
+        mid_term_start=datetime(2026, 2, 25),
+        mid_term_end=datetime(2026, 3, 8),
+    )
+    total_weeks, lessons_per_week = 14, 5
+
+    curriculum = flatten_curriculum(curriculum_snapshot)
+    weeks = layout_weeks(curriculum, calendar, total_weeks, lessons_per_week, include_special_weeks=True)
+    check_layout(weeks, curriculum, total_weeks, lessons_per_week)
+
+    breaks = sum(1 for w in weeks for l in w["lessons"] if l["strand"] == "MID TERM BREAK")
+    print(f"Curriculum lessons: {len(curriculum)}, planned lessons: {count_lessons(weeks)}, break slots: {breaks}")
+
+    runs = 200
+    flatten_s = timeit.timeit(lambda: flatten_curriculum(curriculum_snapshot), number=runs) / runs
+    layout_s = timeit.timeit(
+        lambda: layout_weeks(curriculum, calendar, total_weeks, lessons_per_week, include_special_weeks=True),
+        number=runs
+    ) / runs
+    print(f"flatten_curriculum: {flatten_s * 1000:.3f} ms/run")
+    print(f"layout_weeks:       {layout_s * 1000:.3f} ms/run")
+
+    # Statement counts for persisting this layout (template reads + writes)
+    strands = len({s["strand_name"] for s in curriculum_snapshot})
+    old_statements = 1 + strands + 1 + total_weeks + 1  # strands, substrands per strand, scheme, week flushes, lesson flush
+    new_statements = 1 + 1 + 1 + 1 + 1  # snapshot, scheme, weeks, week ids, lessons
+    print(f"Statements per generation: flush-per-week ~{old_statements}, bulk {new_statements}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+-- Indexes the analytics rollup job reads its watermarks through.
+-- The rollup tables themselves are created at startup by create_all.
+CREATE INDEX ix_users_updated_at ON users (updated_at);
+CREATE INDEX ix_subjects_updated_at ON subjects (updated_at);
+CREATE INDEX ix_progress_logs_created_at ON progress_logs (created_at);
@@ -0,0 +1,2 @@
+-- Lets the weekly growth trend read only the users created in its window
+CREATE INDEX ix_users_created_at ON users (created_at);
@@ -0,0 +1,12 @@
+-- Keyset pagination and full-text search for the admin user, payment and
+-- school lists (admin_listing.py). users.created_at is indexed by 008.
+-- The n-gram parser lets searches match inside emails, names and codes.
+-- Stopwords must be off while the indexes are built: the ngram parser drops
+-- every token containing a stopword ("a", "i", "in", "is", "to", ...), which
+-- would make searches for ordinary names and emails miss rows.
+SET SESSION innodb_ft_enable_stopword = OFF;
+CREATE INDEX ix_payments_created_at ON payments (created_at);
+CREATE INDEX ix_schools_created_at ON schools (created_at);
+CREATE FULLTEXT INDEX ft_users_search ON users (email, full_name, phone) WITH PARSER ngram;
+CREATE FULLTEXT INDEX ft_payments_search ON payments (phone_number, transaction_code, checkout_request_id) WITH PARSER ngram;
+CREATE FULLTEXT INDEX ft_schools_search ON schools (name) WITH PARSER ngram;
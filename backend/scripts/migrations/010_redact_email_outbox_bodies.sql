@@ -0,0 +1,6 @@
+-- Outbox bodies carry temporary passwords and one-time links; the worker now
+-- clears them once a message is finished (email_outbox.py). Clear the bodies of
+-- messages finished before that change.
+UPDATE email_outbox
+SET html_content = '', text_content = NULL
+WHERE status IN ('sent', 'failed', 'skipped') AND html_content <> '';
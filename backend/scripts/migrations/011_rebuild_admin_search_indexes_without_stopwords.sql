@@ -0,0 +1,14 @@
+-- Rebuild the admin search indexes from 009 without the InnoDB stopword list.
+-- A FULLTEXT index keeps the stopword setting of the session that built it, and
+-- with stopwords on the ngram parser drops every token containing a stopword
+-- ("a", "i", "in", "at", "is", "to", ...), so searches silently missed rows.
+-- The application's connections also set this (database.py), so indexes built
+-- by create_all or table rebuilds stay stopword-free.
+-- Check afterwards with: python check_admin_search.py
+SET SESSION innodb_ft_enable_stopword = OFF;
+ALTER TABLE users DROP INDEX ft_users_search;
+ALTER TABLE payments DROP INDEX ft_payments_search;
+ALTER TABLE schools DROP INDEX ft_schools_search;
+CREATE FULLTEXT INDEX ft_users_search ON users (email, full_name, phone) WITH PARSER ngram;
+CREATE FULLTEXT INDEX ft_payments_search ON payments (phone_number, transaction_code, checkout_request_id) WITH PARSER ngram;
+CREATE FULLTEXT INDEX ft_schools_search ON schools (name) WITH PARSER ngram;
@@ -0,0 +1,140 @@
+"""
+Teacher Invitations
+Bulk onboarding for school admins. A CSV upload or JSON list of teachers is
+checked against existing accounts with one query, temporary passwords are
+hashed in the bounded hashing pool, new accounts are inserted with a single
+statement and the invitation emails go to the outbox with the same commit.
+Every input row gets an entry in the returned report.
+"""
+
+import csv
+import io
+import secrets
+from collections import Counter
+from typing import Dict, List
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from auth import hash_passwords
+from email_utils import queue_invitation_email
+from live_counters import track_signup
+from models import User, UserRole
+
+_email_adapter = TypeAdapter(EmailStr)
+
+
+def parse_invite_csv(content: bytes) -> List[Dict]:
+    """
+    Rows of an uploaded CSV. Needs an `email` column; `full_name` (or `name`)
+    is optional. Raises ValueError for a file that cannot be used.
+    """
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    columns = {name.strip().lower(): name for name in reader.fieldnames or [] if name}
+    if "email" not in columns:
+        raise ValueError("The CSV file needs a header row with an 'email' column")
+
+    email_column = columns["email"]
+    name_column = columns.get("full_name") or columns.get("name")
+    return [
+        {
+            "email": (row.get(email_column) or "").strip(),
+            "full_name": (row.get(name_column) or "").strip() or None if name_column else None,
+        }
+        for row in reader
+    ]
+
+
+def _check_rows(rows: List[Dict]):
+    """Validate addresses and drop repeats. Returns (report, {email: row index})."""
+    report = []
+    accepted = {}
+    seen = {}
+    for index, row in enumerate(rows):
+        email = (row.get("email") or "").strip()
+        entry = {"row": index + 1, "email": email}
+        report.append(entry)
+        try:
+            _email_adapter.validate_python(email)
+        except ValidationError:
+            entry.update(status="invalid", detail="Not a valid email address")
+            continue
+
+        key = email.lower()
+        if key in seen:
+            entry.update(status="duplicate", detail=f"Same email as row {seen[key] + 1}")
+            continue
+        seen[key] = index
+        accepted[email] = index
+    return report, accepted
+
+
+async def invite_teachers(db: Session, admin: User, rows: List[Dict]) -> Dict:
+    """
+    Invite teachers to the admin's school. Existing accounts without a school
+    are linked (as a single invite does); everyone else gets a new account
+    and an invitation email. Commits once; the caller then calls
+    `notify_outbox`.
+    """
+    report, accepted = _check_rows(rows)
+
+    existing = {}
+    if accepted:
+        # Email comparison follows the column collation (case-insensitive on MySQL)
+        existing = {
+            user.email.lower(): user
+            for user in db.query(User).filter(User.email.in_(list(accepted))).all()
+        }
+
+    to_link = []
+    to_create = []
+    for email, index in accepted.items():
+        entry = report[index]
+        user = existing.get(email.lower())
+        if user is None:
+            to_create.append((email, rows[index].get("full_name")))
+        elif user.school_id == admin.school_id:
+            entry.update(status="already_member", user_id=user.id)
+        elif user.school_id:
+            entry.update(status="in_other_school", detail="User is already linked to a school")
+        else:
+            to_link.append(user.id)
+            entry.update(status="linked", user_id=user.id)
+
+    if to_link:
+        db.query(User).filter(User.id.in_(to_link), User.school_id.is_(None)).update(
+            {User.school_id: admin.school_id}, synchronize_session=False
+        )
+
+    if to_create:
+        passwords = [secrets.token_urlsafe(8) for _ in to_create]
+        hashes = await hash_passwords(passwords)
+        db.execute(insert(User), [
+            {
+                "email": email,
+                "full_name": full_name or email.split("@")[0],  # Placeholder name
+                "password_hash": password_hash,
+                "role": UserRole.TEACHER,
+                "school_id": admin.school_id,
+                "is_active": True,
+                "auth_provider": "local",
+            }
+            for (email, full_name), password_hash in zip(to_create, hashes)
+        ])
+        new_ids = dict(
+            db.query(User.email, User.id).filter(User.email.in_([email for email, _ in to_create])).all()
+        )
+
+        school_name = admin.school_rel.name if admin.school_rel else "your school"
+        for (email, _), password in zip(to_create, passwords):
+            queue_invitation_email(db, email, school_name, password)
+            report[accepted[email]].update(status="invited", user_id=new_ids.get(email))
+
+    db.commit()
+    track_signup(UserRole.TEACHER, count=len(to_create))
+    return {
+        "total": len(rows),
+        "summary": dict(Counter(entry["status"] for entry in report)),
+        "results": report,
+    }
@@ -349,87 +349,72 @@ export default function DashboardPage() {
       try {
         const config = { withCredentials: true };
 
-        // 1. Curriculum Progress
-        if (forceRefresh || !getCachedData(CACHE_KEYS.CURRICULUM_PROGRESS)) {
-          const progressRes = await axios.get(
-            `${API_BASE_URL}/dashboard/curriculum-progress`,
-            config
-          );
-          const subjectsList = Array.isArray(progressRes.data)
-            ? progressRes.data
-            : progressRes.data.subjects || [];
-
-          const progressData = subjectsList.map((s: any) => ({
-            id: s.id,
-            subjectName: s.subject_name,
-            grade: s.grade,
-            completedLessons: s.completed_lessons,
-            totalLessons: s.total_lessons,
-            progressPercentage: s.progress_percentage,
-            estimatedCompletionDate: new Date(
-              new Date().setDate(new Date().getDate() + 30)
-            ),
-            status:
-              s.progress_percentage > 50
-                ? "ahead"
-                : s.progress_percentage > 20
-                ? "on-track"
-                : "behind",
-          }));
-          setSubjectProgress(progressData);
-          setCachedData(CACHE_KEYS.CURRICULUM_PROGRESS, progressData);
+        const cacheKeys = [
+          CACHE_KEYS.CURRICULUM_PROGRESS,
+          CACHE_KEYS.DASHBOARD_STATS,
+          CACHE_KEYS.DASHBOARD_INSIGHTS,
+          CACHE_KEYS.DASHBOARD_DEADLINES,
+          CACHE_KEYS.DASHBOARD_RESOURCES,
+        ];
+        if (!forceRefresh && cacheKeys.every((key) => getCachedData(key))) {
+          return;
         }
 
+        // Every widget comes from one snapshot request
+        const snapshotRes = await axios.get(
+          `${API_BASE_URL}/dashboard/snapshot`,
+          config
+        );
+        const snapshot = snapshotRes.data;
+
+        // 1. Curriculum Progress
+        const subjectsList = snapshot.curriculumProgress?.subjects || [];
+        const progressData = subjectsList.map((s: any) => ({
+          id: s.id,
+          subjectName: s.subject_name,
+          grade: s.grade,
+          completedLessons: s.completed_lessons,
+          totalLessons: s.total_lessons,
+          progressPercentage: s.progress_percentage,
+          estimatedCompletionDate: new Date(
+            new Date().setDate(new Date().getDate() + 30)
+          ),
+          status:
+            s.progress_percentage > 50
+              ? "ahead"
+              : s.progress_percentage > 20
+              ? "on-track"
+              : "behind",
+        }));
+        setSubjectProgress(progressData);
+        setCachedData(CACHE_KEYS.CURRICULUM_PROGRESS, progressData);
+
         // 2. Stats / Performance Summary
-        if (forceRefresh || !getCachedData(CACHE_KEYS.DASHBOARD_STATS)) {
-          const statsRes = await axios.get(
-            `${API_BASE_URL}/dashboard/stats`,
-            config
-          );
-          setPerformanceSummary(statsRes.data);
-          setCachedData(CACHE_KEYS.DASHBOARD_STATS, statsRes.data);
-        }
+        setPerformanceSummary(snapshot.stats);
+        setCachedData(CACHE_KEYS.DASHBOARD_STATS, snapshot.stats);
 
         // 3. Teaching Insights
-        if (forceRefresh || !getCachedData(CACHE_KEYS.DASHBOARD_INSIGHTS)) {
-          const insightsRes = await axios.get(
-            `${API_BASE_URL}/dashboard/insights`,
-            config
-          );
-          setTeachingInsights(insightsRes.data);
-          if (insightsRes.data.weeklyComparison) {
-            setTrendData(insightsRes.data.weeklyComparison);
-          }
-          setCachedData(CACHE_KEYS.DASHBOARD_INSIGHTS, insightsRes.data);
+        setTeachingInsights(snapshot.insights);
+        if (snapshot.insights.weeklyComparison) {
+          setTrendData(snapshot.insights.weeklyComparison);
         }
+        setCachedData(CACHE_KEYS.DASHBOARD_INSIGHTS, snapshot.insights);
 
         // 4. Upcoming Deadlines
-        if (forceRefresh || !getCachedData(CACHE_KEYS.DASHBOARD_DEADLINES)) {
-          const deadlinesRes = await axios.get(
-            `${API_BASE_URL}/dashboard/deadlines`,
-            config
-          );
-          const deadlinesData = deadlinesRes.data.map((d: any) => ({
-            ...d,
-            date: new Date(d.date),
-          }));
-          setDeadlines(deadlinesData);
-          setCachedData(CACHE_KEYS.DASHBOARD_DEADLINES, deadlinesData);
-        }
+        const deadlinesData = snapshot.deadlines.map((d: any) => ({
+          ...d,
+          date: new Date(d.date),
+        }));
+        setDeadlines(deadlinesData);
+        setCachedData(CACHE_KEYS.DASHBOARD_DEADLINES, deadlinesData);
 
         // 5. Resources
-        if (forceRefresh || !getCachedData(CACHE_KEYS.DASHBOARD_RESOURCES)) {
-          const resourcesRes = await axios.get(
-            `${API_BASE_URL}/dashboard/resources`,
-            config
-          );
-          const resourcesData = resourcesRes.data.map((r: any) => ({
-            ...r,
-            lastAccessed: new Date(r.lastAccessed),
-          }));
-          setResources(resourcesData);
-          setCachedData(CACHE_KEYS.DASHBOARD_RESOURCES, resourcesData);
-        }
+        const resourcesData = snapshot.resources.map((r: any) => ({
+          ...r,
+          lastAccessed: new Date(r.lastAccessed),
+        }));
+        setResources(resourcesData);
+        setCachedData(CACHE_KEYS.DASHBOARD_RESOURCES, resourcesData);
       } catch (error) {
         if (axios.isAxiosError(error) && error.response?.status === 401) {
           console.warn(
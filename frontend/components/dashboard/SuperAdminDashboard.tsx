@@ -281,28 +281,11 @@ export default function SuperAdminDashboard() {
           search: userSearchTerm || undefined,
           role: userRoleFilter !== "all" ? userRoleFilter : undefined,
         },
+        responseType: "blob",
       });
 
-      // Convert JSON to CSV
-      const items = res.data;
-      if (items.length === 0) {
-        toast("No users to export");
-        return;
-      }
-      const replacer = (key: string, value: any) =>
-        value === null ? "" : value;
-      const header = Object.keys(items[0]);
-      const csv = [
-        header.join(","),
-        ...items.map((row: any) =>
-          header
-            .map((fieldName) => JSON.stringify(row[fieldName], replacer))
-            .join(",")
-        ),
-      ].join("\r\n");
-
-      // Download
-      const blob = new Blob([csv], { type: "text/csv" });
+      // The server streams the CSV; download it as-is
+      const blob = new Blob([res.data], { type: "text/csv" });
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement("a");
       a.setAttribute("hidden", "");